@@ -0,0 +1,3 @@
+"""
+Benchmarks for peepingtom, run as scripts e.g. `python -m benchmarks.bench_memory`
+"""
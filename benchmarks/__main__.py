@@ -0,0 +1,59 @@
+"""
+Command line interface to the benchmark suite
+
+python -m benchmarks run --scales small medium --output results.json
+python -m benchmarks compare baseline.json results.json --threshold 1.2
+"""
+import argparse
+import sys
+
+from benchmarks import harness
+# importing benchmark modules registers their benchmarks
+from benchmarks import bench_io, bench_analysis, bench_display, bench_import  # noqa: F401
+
+
+def _run(args):
+    names = [name for name, bench in harness.BENCHMARKS.items()
+             if args.group is None or bench.group in args.group]
+    records = harness.run(names, scales=args.scales, repeat=args.repeat)
+    for r in records:
+        if 'error' in r:
+            print(f"{r['benchmark']:<50} {r['scale']:<8} {r['error']}")
+        else:
+            print(f"{r['benchmark']:<50} {r['scale']:<8} {r['time_s'] * 1e3:>10.2f} ms "
+                  f"{r['peak_bytes'] / 1e6:>10.2f} MB")
+    if args.output:
+        harness.save(records, args.output)
+
+
+def _compare(args):
+    regressions = harness.compare(harness.load(args.baseline), harness.load(args.current), args.threshold)
+    for benchmark, scale, metric, old, new, ratio in regressions:
+        print(f'{benchmark:<50} {scale:<8} {metric:<12} {old:.4g} -> {new:.4g} ({ratio:.2f}x)')
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('--scales', nargs='+', default=['small'], choices=list(harness.SCALES))
+    run_parser.add_argument('--group', nargs='+', help='only run benchmarks from these groups')
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--output', '-o', help='json file to write results to')
+    run_parser.set_defaults(func=_run)
+
+    compare_parser = subparsers.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=1.2,
+                                help='ratio above which a metric counts as a regression')
+    compare_parser.set_defaults(func=_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
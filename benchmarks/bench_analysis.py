@@ -0,0 +1,72 @@
+"""
+Benchmarks for analysis and orientation handling
+"""
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import benchmark
+from peepingtom.base import DataCrate, Particles, OrientationBlock, TiltSeriesBlock
+from peepingtom.analysis.classification import classify
+from peepingtom.analysis.peak_picking import pick_peaks
+from peepingtom.analysis.deduplication import deduplicate
+from peepingtom.analysis.subtomograms import extract_subtomograms
+
+
+@benchmark('classify', group='analysis')
+def setup_classify(scale, directory):
+    # classify builds a dense distance matrix per volume, so it is run on a tenth of the particles
+    rng = np.random.default_rng(0)
+    n_per_volume = max(scale['n_particles'] // (10 * scale['n_volumes']), 10)
+    crates = []
+    for _ in range(scale['n_volumes']):
+        positions = rng.uniform(0, scale['volume_shape'][0], (n_per_volume, 3))
+        orientations = np.tile(np.eye(3), (n_per_volume, 1, 1))
+        crates.append(DataCrate([Particles(positions, orientations)]))
+    return lambda: classify(crates, n_classes=3)
+
+
+@benchmark('pick_peaks', group='analysis')
+def setup_pick_peaks(scale, directory):
+    rng = np.random.default_rng(0)
+    volume = rng.normal(size=scale['volume_shape']).astype(np.float32)
+    return lambda: pick_peaks(volume, min_distance=4, threshold=2, chunk_shape=32)
+
+
+@benchmark('deduplicate', group='analysis')
+def setup_deduplicate(scale, directory):
+    rng = np.random.default_rng(0)
+    n = scale['n_particles']
+    positions = rng.uniform(0, scale['volume_shape'][0], (n, 3))
+    orientations = np.tile(np.eye(3), (n, 1, 1))
+    particles = Particles(positions, orientations, properties=pd.DataFrame({'score': rng.random(n)}))
+    return lambda: deduplicate(particles, min_distance=2)
+
+
+@benchmark('extract_subtomograms', group='analysis')
+def setup_extract_subtomograms(scale, directory):
+    rng = np.random.default_rng(0)
+    shape = scale['volume_shape']
+    volume = rng.normal(size=shape).astype(np.float32)
+    n = scale['n_particles'] // 10
+    positions = rng.uniform(0, shape[0], (n, 3))
+    orientations = np.tile(np.eye(3), (n, 1, 1))
+    particles = Particles(positions, orientations)
+    return lambda: extract_subtomograms(volume, particles, 16, max_workers=1)
+
+
+@benchmark('TiltSeriesBlock.project', group='analysis')
+def setup_project_tilt_series(scale, directory):
+    rng = np.random.default_rng(0)
+    shape = scale['volume_shape']
+    tilt_series = TiltSeriesBlock(None, tilt_angles=np.arange(-60, 61, 3), loader=lambda: None,
+                                  shape=(41, shape[1], shape[2]))
+    positions = rng.uniform(0, shape[0], (scale['n_particles'], 3))
+    return lambda: tilt_series.project(positions, shape)
+
+
+@benchmark('OrientationBlock.from_euler_angles', group='analysis')
+def setup_from_euler_angles(scale, directory):
+    rng = np.random.default_rng(0)
+    euler_angles = rng.uniform(-180, 180, (scale['n_particles'], 3))
+    return lambda: OrientationBlock.from_euler_angles(euler_angles, axes='zyz', intrinsic=True, positive_ccw=True,
+                                                      invert_matrix=False)
@@ -0,0 +1,55 @@
+"""
+Benchmarks for preparing data for display in napari
+"""
+import numpy as np
+
+from benchmarks.harness import benchmark
+from peepingtom.base import DataCrate, Particles, ImageBlock
+
+
+def _volume_viewer(scale):
+    from peepingtom.visualisation.viewable import VolumeViewer
+
+    rng = np.random.default_rng(0)
+    n = scale['n_particles']
+    positions = rng.uniform(0, scale['volume_shape'][0], (n, 3))
+    orientations = np.tile(np.eye(3), (n, 1, 1))
+    image = rng.normal(size=scale['volume_shape']).astype(np.float32)
+    crate = DataCrate([ImageBlock(image, ndim_spatial=3), Particles(positions, orientations)])
+    return VolumeViewer(crate)
+
+
+@benchmark('VolumeViewer.particle_positions', group='display')
+def setup_particle_positions(scale, directory):
+    viewer = _volume_viewer(scale)
+    return lambda: viewer.particle_positions
+
+
+@benchmark('VolumeViewer.particle_vectors_napari', group='display')
+def setup_particle_vectors_napari(scale, directory):
+    viewer = _volume_viewer(scale)
+    return lambda: viewer.particle_vectors_napari
+
+
+@benchmark('ParticleStack', group='display')
+def setup_particle_stack(scale, directory):
+    from peepingtom.base import ParticleStack
+
+    rng = np.random.default_rng(0)
+    n = scale['n_particles'] // 4
+    crates = [DataCrate([Particles(rng.uniform(0, 100, (n, 3)), np.tile(np.eye(3), (n, 1, 1)))]) for _ in range(4)]
+    return lambda: ParticleStack(crates, share=False)
+
+
+@benchmark('ImageBlock.statistics', group='display')
+def setup_image_statistics(scale, directory):
+    # memory-mapped volume, statistics are recalculated on every run
+    rng = np.random.default_rng(0)
+    path = directory / 'volume.npy'
+    np.save(path, rng.normal(size=scale['volume_shape']).astype(np.float32))
+    block = ImageBlock(np.load(path, mmap_mode='r'), ndim_spatial=3)
+
+    def run():
+        block._statistics = None
+        return block.statistics()
+    return run
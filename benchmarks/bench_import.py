@@ -0,0 +1,35 @@
+"""
+Benchmarks for the time taken to import the package in a fresh interpreter
+"""
+import subprocess
+import sys
+
+from benchmarks.harness import benchmark
+
+# the data, io and analysis layers, which should never import napari, magicgui or Qt
+_headless = {
+    'peepingtom': 'peepingtom',
+    'peepingtom.base': 'peepingtom.base',
+    'peepingtom._io.read': 'peepingtom._io.read',
+    'peepingtom.analysis': 'peepingtom.analysis.classification, peepingtom.analysis.peak_picking',
+}
+
+
+def _import(modules):
+    subprocess.run([sys.executable, '-c', f'import {modules}'], check=True)
+
+
+def _setup(modules):
+    def setup(scale, directory):
+        return lambda: _import(modules)
+    return setup
+
+
+for _name, _modules in _headless.items():
+    benchmark(f'import {_name}', group='import')(_setup(_modules))
+
+
+@benchmark('import python', group='import')
+def setup_import_python(scale, directory):
+    # interpreter startup, to subtract from the other import times
+    return lambda: _import('sys')
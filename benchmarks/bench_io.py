@@ -0,0 +1,78 @@
+"""
+Benchmarks for reading and writing data and converting DataFrames
+"""
+import numpy as np
+
+from benchmarks.harness import benchmark
+from benchmarks.synthetic import particle_dataframe, dynamo_table_dataframe, write_starfile, write_volumes
+from peepingtom._io.read import read_starfiles, read_images, zip_data_to_blocks, read_movies
+from peepingtom._io.write import write_star
+from peepingtom.base import Particles
+from peepingtom.base.multiframe import get_frame_sum_cache
+from peepingtom.analysis.frame_sums import sum_movies
+from peepingtom.utils.helpers import dataframe_helper
+
+
+@benchmark('read_starfiles', group='io')
+def setup_read_starfiles(scale, directory):
+    star = write_starfile(directory / 'particles.star', scale['n_particles'], scale['n_volumes'],
+                          scale['volume_shape'])
+    return lambda: read_starfiles(str(star))
+
+
+@benchmark('read_images', group='io')
+def setup_read_images(scale, directory):
+    mrcs = write_volumes(directory, scale['n_volumes'], scale['volume_shape'])
+    return lambda: read_images([str(p) for p in mrcs])
+
+
+@benchmark('zip_data_to_blocks', group='io')
+def setup_zip_data_to_blocks(scale, directory):
+    star = write_starfile(directory / 'particles.star', scale['n_particles'], scale['n_volumes'],
+                          scale['volume_shape'])
+    mrcs = write_volumes(directory, scale['n_volumes'], scale['volume_shape'])
+    return lambda: zip_data_to_blocks([str(p) for p in mrcs], str(star))
+
+
+@benchmark('sum_movies', group='io')
+def setup_sum_movies(scale, directory):
+    # volumes stand in for movies, frames along z
+    mrcs = write_volumes(directory, scale['n_volumes'], scale['volume_shape'])
+    movies = read_movies([str(p) for p in mrcs])
+
+    def run():
+        get_frame_sum_cache().clear()
+        return sum_movies(movies, max_workers=1)
+    return run
+
+
+@benchmark('write_star', group='io')
+def setup_write_star(scale, directory):
+    rng = np.random.default_rng(0)
+    n = scale['n_particles']
+    particles = Particles(rng.uniform(0, 100, (n, 3)), np.tile(np.eye(3), (n, 1, 1)))
+    return lambda: write_star(particles, directory / 'written.star', overwrite=True)
+
+
+@benchmark('dataframe_helper.df_to_xyz[relion]', group='io')
+def setup_df_to_xyz_relion(scale, directory):
+    df = particle_dataframe(scale['n_particles'], scale['n_volumes'], scale['volume_shape'])
+    return lambda: dataframe_helper.df_to_xyz(df, 'relion')
+
+
+@benchmark('dataframe_helper.df_to_xyz[dynamo]', group='io')
+def setup_df_to_xyz_dynamo(scale, directory):
+    df = dynamo_table_dataframe(scale['n_particles'], scale['n_volumes'], scale['volume_shape'])
+    return lambda: dataframe_helper.df_to_xyz(df, 'dynamo')
+
+
+@benchmark('dataframe_helper.df_to_rotation_matrices[relion]', group='io')
+def setup_df_to_rotation_matrices_relion(scale, directory):
+    df = particle_dataframe(scale['n_particles'], scale['n_volumes'], scale['volume_shape'])
+    return lambda: dataframe_helper.df_to_rotation_matrices(df, 'relion')
+
+
+@benchmark('dataframe_helper.df_to_rotation_matrices[dynamo]', group='io')
+def setup_df_to_rotation_matrices_dynamo(scale, directory):
+    df = dynamo_table_dataframe(scale['n_particles'], scale['n_volumes'], scale['volume_shape'])
+    return lambda: dataframe_helper.df_to_rotation_matrices(df, 'dynamo')
@@ -0,0 +1,55 @@
+"""
+Peak memory of zip_data_to_blocks at different floating point precisions
+
+run with `python -m benchmarks.bench_memory`
+"""
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from peepingtom._io.read import zip_data_to_blocks
+from benchmarks.synthetic import write_starfile, write_volumes
+
+
+def peak_memory(func, *args, **kwargs):
+    """
+    call func and return its result and the peak memory allocated during the call in bytes
+    """
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def particle_nbytes(crates):
+    """
+    bytes held by particle positions and orientations in a list of DataCrates
+    """
+    nbytes = 0
+    for crate in crates:
+        for block in crate:
+            if hasattr(block, 'orientations'):
+                nbytes += block.positions.data.nbytes + block.orientations.data.nbytes
+    return nbytes
+
+
+def bench_zip_data_to_blocks(n_particles=100_000, n_volumes=4, volume_shape=(64, 64, 64)):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        star = write_starfile(Path(tmp) / 'particles.star', n_particles, n_volumes, volume_shape)
+        mrcs = write_volumes(tmp, n_volumes, volume_shape)
+        for dtype in (np.float64, np.float32):
+            crates, peak = peak_memory(zip_data_to_blocks, [str(p) for p in mrcs], str(star), dtype=dtype)
+            results[np.dtype(dtype).name] = {'peak_bytes': peak, 'particle_bytes': particle_nbytes(crates)}
+    return results
+
+
+if __name__ == '__main__':
+    for dtype, result in bench_zip_data_to_blocks().items():
+        print(f"{dtype}: peak {result['peak_bytes'] / 1e6:.1f} MB, "
+              f"particle data {result['particle_bytes'] / 1e6:.1f} MB")
@@ -0,0 +1,140 @@
+"""
+Minimal benchmark harness recording wall time and peak memory at several dataset scales
+
+Benchmarks are registered with the `benchmark` decorator on a setup function which takes a scale (dict of
+parameters) and a temporary directory and returns a zero argument callable to be measured
+"""
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+SCALES = {
+    'small': {'n_particles': 1_000, 'n_volumes': 2, 'volume_shape': (32, 32, 32)},
+    'medium': {'n_particles': 10_000, 'n_volumes': 4, 'volume_shape': (64, 64, 64)},
+    'large': {'n_particles': 100_000, 'n_volumes': 8, 'volume_shape': (128, 128, 128)},
+}
+
+RESULTS_VERSION = 1
+
+BENCHMARKS = {}
+
+
+class Benchmark:
+    def __init__(self, name, setup, group):
+        self.name = name
+        self.setup = setup
+        self.group = group
+
+
+def benchmark(name, group):
+    """
+    register a setup function as a benchmark
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = Benchmark(name, setup, group)
+        return setup
+    return decorator
+
+
+def measure(func, repeat=3):
+    """
+    measure the best wall time over repeat calls of func and the peak memory allocated during one call
+    memory is measured in a separate call as tracing allocations slows down execution
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'time_s': min(times), 'peak_bytes': peak}
+
+
+def run(names=None, scales=('small',), repeat=3):
+    """
+    run benchmarks at the given scales and return a list of result records
+    benchmarks which raise during setup or measurement are recorded with the error rather than aborting the run
+    """
+    if names is None:
+        names = list(BENCHMARKS)
+    records = []
+    for scale_name in scales:
+        scale = SCALES[scale_name]
+        for name in names:
+            bench = BENCHMARKS[name]
+            record = {'benchmark': name, 'group': bench.group, 'scale': scale_name}
+            with tempfile.TemporaryDirectory() as tmp:
+                try:
+                    func = bench.setup(scale, Path(tmp))
+                    record.update(measure(func, repeat=repeat))
+                except Exception as e:
+                    record['error'] = f'{type(e).__name__}: {e}'
+            records.append(record)
+    return records
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def metadata():
+    """
+    information about the environment the benchmarks were run in
+    """
+    return {
+        'version': RESULTS_VERSION,
+        'revision': _git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+    }
+
+
+def save(records, path):
+    with open(path, 'w') as f:
+        json.dump({'metadata': metadata(), 'results': records}, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=1.2):
+    """
+    compare two sets of results (as returned by load) and return a list of
+    (benchmark, scale, metric, baseline, current, ratio) for every metric which got worse by more than threshold
+    """
+    baseline = {(r['benchmark'], r['scale']): r for r in baseline['results']}
+    regressions = []
+    for record in current['results']:
+        key = (record['benchmark'], record['scale'])
+        if key not in baseline:
+            continue
+        for metric in ('time_s', 'peak_bytes'):
+            old, new = baseline[key].get(metric), record.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            if ratio > threshold:
+                regressions.append((*key, metric, old, new, ratio))
+    return regressions
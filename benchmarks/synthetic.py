@@ -0,0 +1,72 @@
+"""
+Generators for synthetic data used in benchmarks
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import mrcfile
+import starfile
+
+
+def particle_dataframe(n_particles, n_volumes=1, volume_shape=(100, 100, 100), seed=0):
+    """
+    generate a RELION format particle DataFrame with n_particles spread over n_volumes
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'rlnMicrographName': [f'TS_{i % n_volumes + 1:02d}.mrc' for i in range(n_particles)],
+    })
+    for axis, size in zip('XYZ', volume_shape[::-1]):
+        df[f'rlnCoordinate{axis}'] = rng.uniform(0, size, n_particles)
+    for axis in 'XYZ':
+        df[f'rlnOrigin{axis}'] = rng.normal(0, 1, n_particles)
+    df['rlnAngleRot'] = rng.uniform(-180, 180, n_particles)
+    df['rlnAngleTilt'] = rng.uniform(0, 180, n_particles)
+    df['rlnAnglePsi'] = rng.uniform(-180, 180, n_particles)
+    df['rlnMaxValueProbDistribution'] = rng.uniform(0, 1, n_particles)
+    return df
+
+
+def dynamo_table_dataframe(n_particles, n_volumes=1, volume_shape=(100, 100, 100), seed=0):
+    """
+    generate a Dynamo format particle table as a DataFrame with n_particles spread over n_volumes
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'tag': np.arange(1, n_particles + 1),
+        'tomo': np.arange(n_particles) % n_volumes + 1,
+    })
+    for axis, size in zip('xyz', volume_shape[::-1]):
+        df[axis] = rng.uniform(0, size, n_particles)
+    for axis in 'xyz':
+        df[f'd{axis}'] = rng.normal(0, 1, n_particles)
+    df['tdrot'] = rng.uniform(-180, 180, n_particles)
+    df['tilt'] = rng.uniform(0, 180, n_particles)
+    df['narot'] = rng.uniform(-180, 180, n_particles)
+    df['cc'] = rng.uniform(0, 1, n_particles)
+    return df
+
+
+def write_starfile(path, n_particles, n_volumes=1, volume_shape=(100, 100, 100), seed=0):
+    """
+    write a synthetic RELION particle star file
+    """
+    df = particle_dataframe(n_particles, n_volumes, volume_shape, seed)
+    starfile.write(df, path, overwrite=True)
+    return Path(path)
+
+
+def write_volumes(directory, n_volumes=1, volume_shape=(100, 100, 100), dtype=np.float32, seed=0):
+    """
+    write n_volumes synthetic mrc volumes named to match the micrograph names of particle_dataframe
+    """
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(n_volumes):
+        path = Path(directory) / f'TS_{i + 1:02d}.mrc'
+        data = rng.normal(size=volume_shape).astype(dtype)
+        with mrcfile.new(path, overwrite=True) as mrc:
+            mrc.set_data(data)
+        paths.append(path)
+    return paths
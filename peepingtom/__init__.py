@@ -0,0 +1,34 @@
+"""
+peepingtom, visualisation and analysis of particles in tomograms
+
+Public names are imported from their modules on first access (PEP 562), so `import peepingtom` is fast and
+headless analysis never imports napari, magicgui or Qt, which are only loaded when something is displayed
+"""
+import importlib
+
+_lazy_names = {
+    'peepingtom.base': ['DataCrate', 'PointBlock', 'LineBlock', 'OrientationBlock', 'ImageBlock', 'Particles',
+                        'TiltSeriesBlock', 'MultiFrameBlock', 'ParticleStack'],
+    'peepingtom._io.read': ['read_images', 'read_starfiles', 'read_movies', 'read_tilt_series', 'lazy_images',
+                            'zip_data_to_blocks', 'star_to_blocks'],
+    'peepingtom._io.write': ['write_star', 'write_dynamo_table'],
+    'peepingtom._io.session': ['save_session', 'load_session'],
+    'peepingtom._io.topeep': ['zip2peep', 'session2peep'],
+    'peepingtom.visualisation.peeper': ['Peeper'],
+}
+_modules = {name: module for module, names in _lazy_names.items() for name in names}
+
+__all__ = list(_modules)
+
+
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f"module 'peepingtom' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_modules[name]), name)
+    # cache in the module namespace, __getattr__ is only called for missing attributes
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_modules))
@@ -0,0 +1,177 @@
+"""
+Process-wide cache of image data read from disk, shared by all readers and lazy ImageBlocks
+
+Images are keyed by resolved path, modification time and file size so files changed on disk are reread.
+Cached arrays are shared between all users and are therefore read-only, readers return these arrays
+unchanged, so code modifying image data in place must copy it (np.array(data)) or read with cache=False.
+
+The byte budget defaults to 4 GiB and can be set with the environment variable PEEPINGTOM_IMAGE_CACHE_BYTES
+or configure_image_cache
+"""
+import os
+import threading
+import weakref
+from concurrent.futures import Future
+
+from peepingtom.utils.caching import LRUCache, LFUCache
+from peepingtom._io.utils import _path
+
+_default_max_bytes = 4 * 2 ** 30
+
+_policies = {
+    'lru': LRUCache,
+    'lfu': LFUCache,
+}
+
+
+class ImageCache:
+    """
+    Cache of image arrays keyed by file, bounded by a byte budget
+
+    Arrays evicted from the cache but still referenced elsewhere (e.g. by an ImageBlock) are found through weak
+    references, so the same file is never held in memory twice. Code which bounds its own memory use (e.g.
+    VolumeNavigator) drops its images from the cache with evict, so they are freed once unreferenced
+    """
+    def __init__(self, max_bytes=_default_max_bytes, policy='lru', enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._alive = weakref.WeakValueDictionary()
+        self._weak_hits = 0
+        self.configure(max_bytes=max_bytes, policy=policy)
+
+    def configure(self, max_bytes=None, policy=None):
+        """
+        change the byte budget and/or eviction policy ('lru' or 'lfu'), cached entries are kept
+        """
+        old = getattr(self, '_cache', None)
+        if policy is None:
+            policy = self.policy
+        if max_bytes is None:
+            max_bytes = old.max_bytes
+        if policy not in _policies:
+            raise ValueError(f'policy must be one of {list(_policies)}, got {policy}')
+        cache = _policies[policy](max_bytes=max_bytes)
+        if old is not None:
+            for key, value, nbytes in old.items():
+                cache.put(key, value, nbytes)
+        self._cache = cache
+        self.policy = policy
+
+    @property
+    def max_bytes(self):
+        return self._cache.max_bytes
+
+    @staticmethod
+    def key(path):
+        """
+        cache key of a file: (resolved path, modification time, size)
+        """
+        path = _path(path)
+        stat = path.stat()
+        return str(path), stat.st_mtime_ns, stat.st_size
+
+    def get(self, path, loader):
+        """
+        Get the image data for path, calling loader(path) on a miss
+
+        Concurrent requests for the same file wait for a single load
+
+        Returns read-only ndarray
+        -------
+
+        """
+        if not self.enabled:
+            return loader(path)
+
+        key = self.key(path)
+        with self._lock:
+            data = self._cache.get(key)
+            if data is None:
+                data = self._alive.get(key)
+                if data is not None:
+                    # evicted but still alive elsewhere, put it back
+                    self._weak_hits += 1
+                    self._cache.put(key, data, data.nbytes)
+            if data is not None:
+                return data
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            data = loader(path)
+            data.flags.writeable = False
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        # cached before the load is forgotten, so no request in between starts a second load
+        with self._lock:
+            self._cache.put(key, data, data.nbytes)
+            self._alive[key] = data
+            self._loading.pop(key, None)
+        future.set_result(data)
+        return data
+
+    def evict(self, path):
+        """
+        drop the image data of path from the cache, including the weak reference to it
+        the data is freed once it is not referenced elsewhere, files which do not exist are ignored
+        """
+        try:
+            key = self.key(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._cache.pop(key)
+            self._alive.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._alive.clear()
+
+    def stats(self):
+        """
+        dict of cache statistics, hits include arrays recovered after eviction
+        """
+        stats = self._cache.stats()
+        stats['hits'] += self._weak_hits
+        stats['misses'] -= self._weak_hits
+        n_requests = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / n_requests if n_requests else 0.0
+        stats['max_bytes'] = self.max_bytes
+        stats['policy'] = self.policy
+        return stats
+
+
+_image_cache = ImageCache(max_bytes=int(os.environ.get('PEEPINGTOM_IMAGE_CACHE_BYTES', _default_max_bytes)))
+
+
+def get_image_cache():
+    """
+    get the process-wide ImageCache
+    """
+    return _image_cache
+
+
+def configure_image_cache(max_bytes=None, policy=None, enabled=None):
+    """
+    configure the process-wide ImageCache
+
+    Parameters
+    ----------
+    max_bytes : int, byte budget of the cache
+    policy : str, eviction policy 'lru' or 'lfu'
+    enabled : bool, if False images are always read from disk
+    """
+    _image_cache.configure(max_bytes=max_bytes, policy=policy)
+    if enabled is not None:
+        _image_cache.enabled = enabled
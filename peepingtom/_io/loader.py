@@ -0,0 +1,122 @@
+"""
+Background loading of lazy ImageBlock data on a pool of worker threads
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoader:
+    """
+    Load the data of lazy ImageBlock objects on a pool of worker threads
+
+    Callbacks registered with add_done_callback are called from worker threads with each ImageBlock
+    as soon as it is loaded, as_completed can be used to consume loaded blocks from a single thread instead.
+    A block which fails to load does not stop the others, failures are logged and reported by errors
+    """
+    def __init__(self, image_blocks, max_workers=4, start=True):
+        """
+
+        Parameters
+        ----------
+        image_blocks : list of ImageBlock objects, blocks which are already loaded are skipped
+        max_workers : int, number of worker threads
+        start : bool, start loading immediately
+        """
+        self.image_blocks = [block for block in image_blocks if not block.is_loaded]
+        self.max_workers = max_workers
+        self._callbacks = []
+        self._futures = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        if start:
+            self.start()
+
+    def start(self):
+        """
+        submit all blocks for loading
+        """
+        if self._executor is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='peepingtom-loader')
+        for block in self.image_blocks:
+            future = self._executor.submit(block.load)
+            self._futures[future] = block
+            future.add_done_callback(self._on_done)
+        # worker threads exit once all submitted blocks are loaded
+        self._executor.shutdown(wait=False)
+
+    def add_done_callback(self, callback):
+        """
+        register callback(image_block) to be called from a worker thread when a block is loaded
+        blocks which were already loaded are passed to callback immediately
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+            loaded = [block for future, block in self._futures.items() if self._succeeded(future)]
+        for block in loaded:
+            callback(block)
+
+    @staticmethod
+    def _succeeded(future):
+        return future.done() and not future.cancelled() and future.exception() is None
+
+    def _on_done(self, future):
+        if not self._succeeded(future):
+            return
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback(self._futures[future])
+
+    def as_completed(self):
+        """
+        yield ImageBlock objects as they finish loading, skipping cancelled ones and ones which failed to load
+        failures are logged and collected in errors
+        """
+        for future in as_completed(list(self._futures)):
+            if future.cancelled():
+                continue
+            block = self._futures[future]
+            error = future.exception()
+            if error is not None:
+                logger.warning('failed to load %s: %r', getattr(block, 'source', None) or block, error)
+                continue
+            yield block
+
+    def cancel(self):
+        """
+        cancel loading of all blocks which have not started loading yet
+        """
+        for future in self._futures:
+            future.cancel()
+
+    def wait(self):
+        """
+        block until all blocks are loaded, cancelled or failed to load
+        """
+        for _ in self.as_completed():
+            pass
+
+    @property
+    def progress(self):
+        """
+        tuple of (number of finished blocks, total number of blocks)
+        """
+        n_done = sum(future.done() for future in self._futures)
+        return n_done, len(self._futures)
+
+    @property
+    def done(self):
+        n_done, n_total = self.progress
+        return n_done == n_total
+
+    @property
+    def errors(self):
+        """
+        dict of {image_block: exception} for blocks which failed to load
+        """
+        return {block: future.exception() for future, block in self._futures.items()
+                if future.done() and not future.cancelled() and future.exception() is not None}
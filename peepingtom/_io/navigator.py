@@ -0,0 +1,148 @@
+"""
+Navigation through a list of volumes with read-ahead of lazy images and bounded residency
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from peepingtom.base import ImageBlock
+from peepingtom.utils.caching import LRUCache
+from peepingtom._io.image_cache import get_image_cache
+
+
+class VolumeNavigator:
+    """
+    Step through a list of DataCrates one volume at a time
+
+    The lazy images of the next and previous `prefetch` volumes are loaded on background threads while the
+    current volume is in use. Loaded volumes are kept in an LRU cache bounded by max_bytes and/or max_resident,
+    images of evicted volumes are unloaded and dropped from the image cache, so memory use does not grow with the
+    number of volumes.
+    The current volume is never evicted.
+    """
+    def __init__(self, crates, prefetch=2, max_bytes=None, max_resident=None, max_workers=2, wrap=True):
+        """
+
+        Parameters
+        ----------
+        crates : list of DataCrate objects
+        prefetch : int, number of volumes on either side of the current one to load ahead
+        max_bytes : int, maximum number of bytes of image data kept in memory
+        max_resident : int, maximum number of volumes kept in memory, defaults to 2 * prefetch + 1
+        max_workers : int, number of threads used for prefetching
+        wrap : bool, wrap around at the ends of the list
+        """
+        self.crates = list(crates)
+        self.prefetch = prefetch
+        self.wrap = wrap
+        if max_resident is None:
+            max_resident = 2 * prefetch + 1
+        self.resident = LRUCache(max_bytes=max_bytes, max_items=max_resident, on_evict=self._on_evict)
+        self.index = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='peepingtom-prefetch')
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.crates)
+
+    @staticmethod
+    def _images(crate):
+        return [block for block in crate if isinstance(block, ImageBlock)]
+
+    def _load(self, index):
+        """
+        load all images of a volume and register it as resident
+        """
+        crate = self.crates[index]
+        nbytes = sum(image.load().nbytes for image in self._images(crate))
+        self.resident.put(index, crate, nbytes)
+        return crate
+
+    def _on_evict(self, index, crate):
+        for image in self._images(crate):
+            if image.loader is not None:
+                image.unload()
+                # images read through the image cache would otherwise stay in memory beyond max_bytes
+                if image.source is not None:
+                    get_image_cache().evict(image.source)
+
+    def _wrap_index(self, index):
+        if self.wrap:
+            return index % len(self)
+        if not 0 <= index < len(self):
+            return None
+        return index
+
+    def go_to(self, index):
+        """
+        make volume index the current volume, loading it if necessary, and prefetch its neighbours
+
+        Returns the DataCrate of the current volume
+        -------
+
+        """
+        index = self._wrap_index(index)
+        if index is None:
+            raise IndexError('volume index out of range')
+
+        previous = self.index
+        self.index = index
+        self.resident.pin(index)
+        if previous is not None and previous != index:
+            self.resident.unpin(previous)
+
+        with self._lock:
+            future = self._futures.pop(index, None)
+        if future is not None and not future.cancel():
+            # already being prefetched, wait for it
+            future.result()
+        # pinned, so it cannot be evicted between checking and getting it
+        if index in self.resident:
+            crate = self.resident.get(index)
+        else:
+            crate = self._load(index)
+
+        self._schedule_prefetch()
+        return crate
+
+    def next(self):
+        return self.go_to(0 if self.index is None else self.index + 1)
+
+    def previous(self):
+        return self.go_to(0 if self.index is None else self.index - 1)
+
+    @property
+    def current(self):
+        return None if self.index is None else self.crates[self.index]
+
+    def _prefetch_window(self):
+        window = []
+        for offset in range(1, self.prefetch + 1):
+            for index in (self.index + offset, self.index - offset):
+                index = self._wrap_index(index)
+                if index is not None and index != self.index and index not in window:
+                    window.append(index)
+        return window
+
+    def _schedule_prefetch(self):
+        window = self._prefetch_window()
+        with self._lock:
+            # forget finished prefetches and cancel those of volumes no longer close to the current one
+            for index in list(self._futures):
+                if self._futures[index].done() or index not in window:
+                    self._futures.pop(index).cancel()
+            for index in window:
+                if index in self.resident or index in self._futures:
+                    continue
+                self._futures[index] = self._executor.submit(self._load, index)
+
+    def close(self):
+        """
+        stop prefetching and unload all resident volumes
+        """
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        self._executor.shutdown(wait=True)
+        self.resident.clear()
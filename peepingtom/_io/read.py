@@ -1,18 +1,26 @@
 from typing import Union, List
 from pathlib import Path
+from functools import partial
 
 import numpy as np
 import mrcfile
-import starfile
-from eulerangles import euler2matrix
 
-from peepingtom.components.data import Particles, Image, DataBlock
-from peepingtom._io.utils import _path, guess_name
+from peepingtom.base import DataCrate, Particles, ImageBlock, TiltSeriesBlock, MultiFrameBlock, Scale
+from peepingtom.utils.helpers import dataframe_helper
+from peepingtom.utils.constants import relion_coordinate_headings_3d, relion_shift_headings_3d, \
+    relion_euler_angle_headings
+from peepingtom._io.star import read_star_table
+from peepingtom._io.utils import _path, guess_name, pair_by_name
+from peepingtom._io.image_cache import get_image_cache
+from peepingtom.utils.instrumentation import instrument, count
 
 
-def read_images(image_paths, sort=True):
+@instrument()
+def read_images(image_paths, sort=True, cache=True):
     """
     read any number of mrc files and return the data as list of numpy arrays
+    if cache, data is shared through the process-wide image cache (see image_cache) and is read-only,
+    copy it (np.array(data)) or pass cache=False to modify it in place
     """
     data = []
     if not isinstance(image_paths, list):
@@ -20,16 +28,148 @@ def read_images(image_paths, sort=True):
     if sort:
         image_paths = sorted(image_paths)
     for image in image_paths:
-        data.append(mrcfile.open(_path(image)).data)
+        data.append(read_image(image, cache=cache))
     return data
 
 
-def _read_starfile(star_path):
+def _read_mrc_data(image_path):
+    with mrcfile.open(_path(image_path)) as mrc:
+        count('mrc_files_read')
+        return mrc.data
+
+
+def read_image(image_path, cache=True):
+    """
+    read a single mrc file and return the data as a numpy array
+    if cache, data is shared through the process-wide image cache (see image_cache) and is read-only,
+    copy it (np.array(data)) or pass cache=False to modify it in place
+    """
+    if cache:
+        return get_image_cache().get(image_path, _read_mrc_data)
+    return _read_mrc_data(image_path)
+
+
+def _mmap_mrc_data(image_path):
+    # read-only memory map, data is only read from disk when it is indexed
+    with mrcfile.mmap(_path(image_path), mode='r') as mrc:
+        count('mrc_files_mapped')
+        return mrc.data
+
+
+def mmap_image(image_path):
+    """
+    memory-map the data of a single mrc file read-only, data is only read from disk when it is indexed
+    """
+    return _mmap_mrc_data(image_path)
+
+
+def read_image_header(image_path):
+    """
+    read the shape (zyx) of the data and the pixel size in an mrc file from its header only
+    the pixel size is None if it is not set in the header
+    """
+    with mrcfile.open(_path(image_path), header_only=True, permissive=True) as mrc:
+        header = mrc.header
+        shape = int(header.nz), int(header.ny), int(header.nx)
+        pixel_size = float(mrc.voxel_size.x)
+    return shape, pixel_size if pixel_size > 0 else None
+
+
+def read_image_shape(image_path):
+    """
+    read the shape (zyx) of the data in an mrc file from its header only
+    """
+    return read_image_header(image_path)[0]
+
+
+def lazy_images(image_paths, sort=True):
+    """
+    create lazy ImageBlocks for any number of mrc files, only headers are read
+    data is read on first access to ImageBlock.data or by ImageBlock.load
+    """
+    if not isinstance(image_paths, list):
+        image_paths = [image_paths]
+    if sort:
+        image_paths = sorted(image_paths)
+    blocks = []
+    for path in image_paths:
+        shape, pixel_size = read_image_header(path)
+        blocks.append(ImageBlock(None, ndim_spatial=3, pixel_size=pixel_size, loader=partial(read_image, path),
+                                 shape=shape, source=str(_path(path))))
+    return blocks
+
+
+def read_movies(movie_paths, sort=True):
+    """
+    create lazy MultiFrameBlocks for any number of multi-frame mrc files, only headers are read
+    stacks are memory-mapped on first access, so frames and frame sums are read without reading whole movies
+    """
+    if not isinstance(movie_paths, list):
+        movie_paths = [movie_paths]
+    if sort:
+        movie_paths = sorted(movie_paths)
+    movies = []
+    for path in movie_paths:
+        shape, pixel_size = read_image_header(path)
+        movies.append(MultiFrameBlock(None, pixel_size=pixel_size, loader=partial(_mmap_mrc_data, path),
+                                      shape=shape, source=str(_path(path))))
+    return movies
+
+
+def _read_per_tilt(values, image_path, suffixes):
+    """
+    per-tilt values given as an array, a path to a text file with one value per line or None to look for a file
+    next to the image with one of suffixes
+    """
+    if values is None:
+        candidates = [_path(image_path).with_suffix(suffix) for suffix in suffixes]
+        values = next((path for path in candidates if path.exists()), None)
+        if values is None:
+            return None
+    if isinstance(values, (str, Path)):
+        return np.loadtxt(_path(values), ndmin=1)
+    return np.asarray(values, dtype=float)
+
+
+@instrument()
+def read_tilt_series(image_path, tilt_angles=None, dose=None, tilt_axis_angle=0):
+    """
+    create a lazy TiltSeriesBlock for a tilt series stack in an mrc file, only the header is read
+    the stack is memory-mapped on first access, so single tilts are read without reading the whole stack
+
+    tilt_angles: array of tilt angles or path of a text file with one angle per line,
+    by default a .tlt or .rawtlt file next to the stack
+    dose: array of the dose accumulated at each tilt or path of a text file with one value per line,
+    None for unknown
+    """
+    angles = _read_per_tilt(tilt_angles, image_path, ['.tlt', '.rawtlt'])
+    if angles is None:
+        raise FileNotFoundError(f'no tilt angles given and no .tlt or .rawtlt file found for {image_path}')
+    if dose is not None:
+        dose = _read_per_tilt(dose, image_path, [])
+    shape, pixel_size = read_image_header(image_path)
+    return TiltSeriesBlock(None, tilt_angles=angles, dose=dose, tilt_axis_angle=tilt_axis_angle,
+                           pixel_size=pixel_size, loader=partial(_mmap_mrc_data, image_path), shape=shape,
+                           source=str(_path(image_path)))
+
+
+def _star_columns(data_columns=None):
+    """
+    columns of a RELION star file needed to build Particles with the given additional data columns
+    """
+    columns = relion_coordinate_headings_3d + relion_shift_headings_3d + relion_euler_angle_headings
+    columns = columns + ['rlnMicrographName']
+    return columns + [col for col in data_columns or [] if col not in columns]
+
+
+@instrument()
+def _read_starfile(star_path, columns=None, volumes=None, query=None, cache_dir=None):
     """
     read a single star file and return a list containing each dataset
     found in the file, as a separate (name, dataframe) tuple
+    only columns are parsed and rows are filtered by volumes and query while reading (see star.read_star_table)
     """
-    df = starfile.read(_path(star_path))
+    df = read_star_table(star_path, columns=columns, volumes=volumes, query=query, cache_dir=cache_dir)
     if 'rlnMicrographName' in df.columns:
         groups = df.groupby('rlnMicrographName')
         return [(name, sub_df) for name, sub_df in groups]
@@ -37,85 +177,146 @@ def _read_starfile(star_path):
         return [(star_path, df)]
 
 
-def read_starfiles(starfile_paths, sort=True, data_columns=None):
+def _dataset_to_tuple(raw_name, star_df, data_columns=None, dtype=None):
+    """
+    convert a single dataset from a star file into a tuple of
+    (name, particle coordinates (xyz), orientations, additional data)
+    """
+    # guess a name for the data
+    name = guess_name(raw_name)
+    # get coordinates from dataframe in xyz order
+    coords = dataframe_helper.df_to_xyz(star_df, 'relion', dtype=dtype)
+
+    # get orientations as euler angles and transform it into rotation matrices
+    orient_matrices = dataframe_helper.df_to_rotation_matrices(star_df, 'relion')
+
+    if data_columns is None:
+        data_columns = []
+    columns = [col for col in data_columns if col in star_df.columns]
+    properties = star_df[columns]
+
+    count('particles_read', len(coords))
+    return name, coords, orient_matrices, properties
+
+
+@instrument()
+def read_starfiles(starfile_paths, sort=True, data_columns=None, dtype=None, volumes=None, query=None,
+                   cache_dir=None):
     """
     read a number of star files and return a list of each dataset found
-    as particle coordinates, orientations and additional data
+    as particle coordinates (xyz), orientations and additional data
+    coordinates and orientations are cast to dtype (see array_helper.get_float_dtype)
+
+    only the columns needed for particles and data_columns are parsed
+    volumes: regex on rlnMicrographName selecting the volumes to read, e.g. 'TS_0[1-5]'
+    query: pandas query string selecting the particles to read, e.g. 'rlnMaxValueProbDistribution > 0.1'
+    cache_dir: directory for a columnar cache which makes repeated reads of the same files faster
     """
     dataframes = []
     if not isinstance(starfile_paths, list):
         starfile_paths = [starfile_paths]
     if sort:
         starfile_paths = sorted(starfile_paths)
+    columns = _star_columns(data_columns)
     for star in starfile_paths:
-        dataframes.extend(_read_starfile(star))
+        dataframes.extend(_read_starfile(star, columns, volumes, query, cache_dir))
 
-    data = []
-    for raw_name, star_df in dataframes:
-        # guess a name for the data
-        name = guess_name(raw_name)
-        # get coordinates from dataframe in zyx order
-        coords = []
-        for axis in 'ZYX':
-            ax = np.array(star_df[f'rlnCoordinate{axis}'] + star_df.get(f'rlnOrigin{axis}', 0))
-            coords.append(ax)
-        coords = np.stack(coords, axis=1)
-
-        # get orientations as euler angles and transform it into rotation matrices
-        orient_euler = star_df[['rlnAngleRot', 'rlnAngleTilt', 'rlnAnglePsi']].to_numpy()
-        orient_matrices = euler2matrix(orient_euler, axes='ZYZ', intrinsic=True, positive_ccw=True)
-
-        if data_columns is None:
-            data_columns = []
-        columns = [col for col in data_columns if col in star_df.columns]
-        properties = star_df[columns]
-
-        data.append((name, coords, orient_matrices, properties))
-    return data
+    return [_dataset_to_tuple(raw_name, star_df, data_columns, dtype) for raw_name, star_df in dataframes]
 
 
-def zip_data_to_blocks(mrc_paths=[], star_paths=[], sort=True, data_columns=None):
+@instrument()
+def zip_data_to_blocks(mrc_paths=[], star_paths=[], sort=True, data_columns=None, dtype=None, lazy=False,
+                       names=None, volumes=None, query=None, cache_dir=None, pixel_size=None, normalized=False):
     """
-    reads n mrc files and starfiles assuming they contain data relating to the same 3D volumes
-    returns n data_blocks
+    reads mrc files and starfiles containing data relating to the same 3D volumes
+    returns one DataCrate per dataset in the star files
+
+    datasets are paired with mrc files by name (file stems or names like TS_01, see pair_by_name) using
+    only star file contents and mrc headers, so bad pairings fail before any image data is read
+    if no names match and the numbers of images and datasets are equal they are paired in sorted order
+
+    names: list of names (as given by guess_name, e.g. 'TS_01') of the volumes to load, None for all
+    if lazy, only mrc headers are read and image data is loaded on first access (see lazy_images)
+    volumes, query and cache_dir select the particles read from the star files (see read_starfiles)
+
+    coordinates are stored as read, conversions are attached to the positions as transforms (see transforms)
+    and applied when coordinates are requested, e.g. by PointBlock.in_image
+    pixel_size: pixel size of the coordinates in the star files, used to convert them to the pixel size of
+    each image (from the mrc header), e.g. for particles picked at a different binning
+    normalized: coordinates are fractions of the image size and are scaled by the image shape, the scaled
+    coordinates are in pixels of each image so normalized cannot be combined with pixel_size
     """
-    star_dfs = read_starfiles(star_paths, sort, data_columns)
-    # this check must be done after loading starfiles, but better before images
+    if normalized and pixel_size is not None:
+        raise ValueError('normalized coordinates are scaled to pixels of each image, pixel_size cannot be given')
+    if not isinstance(star_paths, list):
+        star_paths = [star_paths]
     if not isinstance(mrc_paths, list):
-        # needed for length check
         mrc_paths = [mrc_paths]
-    if len(mrc_paths) != len(star_dfs):
-        raise ValueError(f'number of images ({len(mrc_paths)}) is different from starfile datasets ({len(star_dfs)})')
-    images = read_images(mrc_paths, sort)
+    if sort:
+        star_paths = sorted(star_paths)
+        mrc_paths = sorted(mrc_paths)
 
-    blocks = []
-    # loop through everything
-    for image, (name, coords, ori_matrix, properties) in zip(images, star_dfs):
-        data_block = DataBlock()
-        data_block.append(Image(image))
-        # denormalize if necessary (not index column) by multiplying by the shape of images
-        if coords.max() <= 1:
-            coords *= image.shape
-        data_block.append(Particles(coords, ori_matrix, properties=properties))
-        blocks.append(data_block)
+    datasets = []
+    columns = _star_columns(data_columns)
+    for star in star_paths:
+        datasets.extend(_read_starfile(star, columns, volumes, query, cache_dir))
 
-    return blocks
+    # only the requested volumes have to pair with an image, pairing happens before converting anything
+    if names is not None:
+        datasets = [(raw_name, star_df) for raw_name, star_df in datasets if guess_name(raw_name) in names]
+    pairs = pair_by_name(mrc_paths, [raw_name for raw_name, _ in datasets])
+
+    # shapes and pixel sizes of all images come from their headers, read before any image data,
+    # so a missing or corrupt file fails before earlier volumes are read
+    headers = [read_image_header(mrc_paths[image_idx]) for image_idx, _ in pairs]
+
+    crates = []
+    for (image_idx, dataset_idx), (shape, image_pixel_size) in zip(pairs, headers):
+        image_path = mrc_paths[image_idx]
+        raw_name, star_df = datasets[dataset_idx]
+        name, coords, ori_matrix, properties = _dataset_to_tuple(raw_name, star_df, data_columns, dtype)
+
+        if lazy:
+            image = ImageBlock(None, ndim_spatial=3, pixel_size=image_pixel_size,
+                               loader=partial(read_image, image_path), shape=shape, source=str(_path(image_path)))
+        else:
+            image = ImageBlock(read_image(image_path), ndim_spatial=3, pixel_size=image_pixel_size,
+                               source=str(_path(image_path)))
+
+        particles = Particles(coords, ori_matrix, properties=properties, dtype=dtype)
+        # normalized coordinates are scaled by the shape of the image (zyx, coords are xyz) when requested
+        if normalized:
+            particles.positions.transform = Scale(shape[::-1])
+            particles.positions.pixel_size = image_pixel_size
+        elif pixel_size is not None:
+            particles.positions.pixel_size = pixel_size
 
+        crate = DataCrate()
+        crate.append(image)
+        crate.append(particles)
+        crates.append(crate)
 
-def star_to_blocks(star_files: Union[Path, str, list], data_columns: List[str] = None):
+    return crates
+
+
+@instrument()
+def star_to_blocks(star_files: Union[Path, str, list], data_columns: List[str] = None, dtype=None,
+                   volumes: str = None, query: str = None, cache_dir=None):
     """
     Reads an arbitrary number of star files
-    Returns a list of DataBlocks
+    volumes, query and cache_dir select the particles to read (see read_starfiles)
+    Returns a list of DataCrates
     """
     # Get tuples
-    data_tuples = read_starfiles(starfile_paths=star_files, data_columns=data_columns)
+    data_tuples = read_starfiles(starfile_paths=star_files, data_columns=data_columns, dtype=dtype,
+                                 volumes=volumes, query=query, cache_dir=cache_dir)
 
-    # Make blocks from data tuples
-    blocks = []
+    # Make crates from data tuples
+    crates = []
     for name, coordinates, orientation_matrices, properties in data_tuples:
-        block = DataBlock()
-        particles = Particles(coordinates, orientation_matrices, properties)
-        block.append(particles)
-        blocks.append(block)
+        crate = DataCrate()
+        particles = Particles(coordinates, orientation_matrices, properties, dtype=dtype)
+        crate.append(particles)
+        crates.append(crate)
 
-    return blocks
+    return crates
@@ -0,0 +1,216 @@
+"""
+Saving and loading of lists of DataCrates as a directory of raw arrays and a manifest
+
+Arrays are stored as .npy files and memory-mapped on loading, so a session opens without parsing any data.
+Images read from files are stored as references to those files and reopened lazily
+"""
+import json
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from peepingtom.base import DataCrate, Particles, PointBlock, LineBlock, OrientationBlock, ImageBlock, \
+    TiltSeriesBlock, MultiFrameBlock, Affine
+from peepingtom.base.datablock import SphereBlock
+from peepingtom.utils.mode_enums import ImageType
+from peepingtom._io.utils import _path
+from peepingtom._io.read import read_image, mmap_image
+from peepingtom.utils.instrumentation import instrument, count
+
+SESSION_VERSION = 1
+MANIFEST = 'manifest.json'
+ARRAYS = 'arrays'
+
+
+class _ArrayWriter:
+    """
+    saves arrays under unique names in the arrays directory of a session
+    """
+    def __init__(self, directory):
+        self.directory = directory / ARRAYS
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._n = 0
+
+    def save(self, array):
+        array = np.asarray(array)
+        if array.dtype == object:
+            array = array.astype(str)
+        name = f'{self._n}.npy'
+        self._n += 1
+        np.save(self.directory / name, array, allow_pickle=False)
+        return name
+
+
+def _save_properties(properties, arrays):
+    if properties is None:
+        return None
+    return {str(col): arrays.save(properties[col].to_numpy()) for col in properties.columns}
+
+
+def _save_units(points):
+    # pixel size and attached transform of a PointBlock, the transform as its combined parameters
+    transform = None
+    if points.transform is not None:
+        linear, offset = points.transform.parameters
+        transform = [linear.tolist(), offset.tolist()]
+    return {'pixel_size': points.pixel_size, 'transform': transform}
+
+
+def _save_block(block, arrays, copy_images):
+    if isinstance(block, Particles):
+        return {'type': 'Particles',
+                'positions': arrays.save(block.positions.data),
+                'orientations': arrays.save(block.orientations.data),
+                'properties': _save_properties(block.properties, arrays),
+                **_save_units(block.positions)}
+    if isinstance(block, PointBlock):
+        return {'type': type(block).__name__, 'data': arrays.save(block.data), **_save_units(block)}
+    if isinstance(block, OrientationBlock):
+        return {'type': 'OrientationBlock', 'data': arrays.save(block.data)}
+    if isinstance(block, SphereBlock):
+        return {'type': 'SphereBlock', 'center': block.center.tolist(), 'radius': block.radius}
+    if isinstance(block, TiltSeriesBlock):
+        entry = {'type': 'TiltSeriesBlock', 'pixel_size': block.pixel_size, 'source': block.source,
+                 'shape': None if block.shape is None else list(block.shape),
+                 'tilt_axis_angle': block.tilt_axis_angle,
+                 'tilts': _save_properties(block.properties, arrays)}
+        if copy_images or block.source is None:
+            entry['data'] = arrays.save(block.data)
+        return entry
+    if isinstance(block, MultiFrameBlock):
+        entry = {'type': 'MultiFrameBlock', 'pixel_size': block.pixel_size, 'source': block.source,
+                 'shape': None if block.shape is None else list(block.shape)}
+        if copy_images or block.source is None:
+            entry['data'] = arrays.save(block.data)
+        return entry
+    if isinstance(block, ImageBlock):
+        entry = {'type': 'ImageBlock', 'ndim_spatial': block.ndim_spatial, 'pixel_size': block.pixel_size,
+                 'image_type': block.image_type.name, 'source': block.source,
+                 'shape': None if block.shape is None else list(block.shape)}
+        if copy_images or block.source is None:
+            entry['data'] = arrays.save(block.data)
+        return entry
+    raise TypeError(f'cannot save blocks of type {type(block)} in a session')
+
+
+@instrument()
+def save_session(crates, directory, copy_images=False, overwrite=False):
+    """
+    Save a list of DataCrates to a session directory
+
+    Parameters
+    ----------
+    crates : list of DataCrate objects
+    directory : path of the session directory, created if necessary
+    copy_images : bool, store the data of images read from files in the session instead of references to the files
+    overwrite : bool, replace an existing session in directory
+
+    Returns path of the session directory
+    -------
+
+    """
+    directory = _path(directory)
+    if (directory / MANIFEST).exists():
+        if not overwrite:
+            raise FileExistsError(f'a session already exists in {directory}, use overwrite=True to replace it')
+        # the old manifest goes first, so a save failing part way leaves an incomplete session, not a wrong one
+        (directory / MANIFEST).unlink()
+        for old in (directory / ARRAYS).glob('*.npy'):
+            old.unlink()
+    arrays = _ArrayWriter(directory)
+    manifest = {'version': SESSION_VERSION,
+                'crates': [[_save_block(block, arrays, copy_images) for block in crate] for crate in crates]}
+    # the manifest is written last, a directory without one is not a complete session
+    with open(directory / MANIFEST, 'w') as f:
+        json.dump(manifest, f)
+    count('session_arrays_saved', arrays._n)
+    return directory
+
+
+class _ArrayReader:
+    def __init__(self, directory, mmap_mode):
+        self.directory = directory / ARRAYS
+        self.mmap_mode = mmap_mode
+
+    def load(self, name):
+        return np.load(self.directory / name, mmap_mode=self.mmap_mode, allow_pickle=False)
+
+
+def _load_units(entry):
+    transform = entry.get('transform')
+    if transform is not None:
+        transform = Affine(np.array(transform[0]), np.array(transform[1]))
+    return {'pixel_size': entry.get('pixel_size'), 'transform': transform}
+
+
+def _load_block(entry, arrays):
+    block_type = entry['type']
+    if block_type == 'Particles':
+        positions = arrays.load(entry['positions'])
+        positions = PointBlock(positions, dtype=positions.dtype, **_load_units(entry))
+        properties = entry['properties']
+        if properties is not None:
+            properties = pd.DataFrame({col: arrays.load(name) for col, name in properties.items()})
+        return Particles(positions, arrays.load(entry['orientations']), properties=properties,
+                         dtype=positions.data.dtype)
+    if block_type in ('PointBlock', 'LineBlock'):
+        data = arrays.load(entry['data'])
+        cls = {'PointBlock': PointBlock, 'LineBlock': LineBlock}[block_type]
+        return cls(data, dtype=data.dtype, **_load_units(entry))
+    if block_type == 'OrientationBlock':
+        data = arrays.load(entry['data'])
+        return OrientationBlock(data, dtype=data.dtype)
+    if block_type == 'SphereBlock':
+        return SphereBlock(np.array(entry['center']), entry['radius'])
+    if block_type == 'TiltSeriesBlock':
+        tilts = {col: arrays.load(name) for col, name in entry['tilts'].items()}
+        kwargs = {'tilt_angles': tilts['tilt_angle'], 'dose': tilts['dose'],
+                  'shifts': np.stack([tilts['shift_x'], tilts['shift_y']], axis=1),
+                  'tilt_axis_angle': entry['tilt_axis_angle'], 'pixel_size': entry['pixel_size'],
+                  'source': entry['source']}
+        if 'data' in entry:
+            return TiltSeriesBlock(arrays.load(entry['data']), **kwargs)
+        shape = None if entry['shape'] is None else tuple(entry['shape'])
+        return TiltSeriesBlock(None, loader=partial(mmap_image, entry['source']), shape=shape, **kwargs)
+    if block_type == 'MultiFrameBlock':
+        kwargs = {'pixel_size': entry['pixel_size'], 'source': entry['source']}
+        if 'data' in entry:
+            return MultiFrameBlock(arrays.load(entry['data']), **kwargs)
+        shape = None if entry['shape'] is None else tuple(entry['shape'])
+        return MultiFrameBlock(None, loader=partial(mmap_image, entry['source']), shape=shape, **kwargs)
+    if block_type == 'ImageBlock':
+        kwargs = {'ndim_spatial': entry['ndim_spatial'], 'pixel_size': entry['pixel_size'],
+                  'image_type': ImageType[entry['image_type']], 'source': entry['source']}
+        if 'data' in entry:
+            return ImageBlock(arrays.load(entry['data']), **kwargs)
+        # lazy, the file is only opened when the data is first needed
+        shape = None if entry['shape'] is None else tuple(entry['shape'])
+        return ImageBlock(None, loader=partial(read_image, entry['source']), shape=shape, **kwargs)
+    raise ValueError(f'unknown block type {block_type} in session')
+
+
+@instrument()
+def load_session(directory, mmap_mode='c'):
+    """
+    Load a list of DataCrates from a session directory written by save_session
+
+    Arrays are memory-mapped rather than read, images stored as references to files are loaded lazily
+
+    Parameters
+    ----------
+    directory : path of the session directory
+    mmap_mode : memory-map mode passed to np.load, 'c' (copy-on-write) allows changes in memory which are
+                not written back, 'r' for read-only data, None to read all arrays into memory
+
+    Returns list of DataCrate objects
+    -------
+
+    """
+    directory = _path(directory)
+    with open(directory / MANIFEST) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != SESSION_VERSION:
+        raise ValueError(f"unsupported session version {manifest.get('version')}")
+    arrays = _ArrayReader(directory, mmap_mode)
+    return [DataCrate([_load_block(entry, arrays) for entry in crate]) for crate in manifest['crates']]
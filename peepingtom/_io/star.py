@@ -0,0 +1,307 @@
+"""
+Streaming reader for STAR file loop blocks with projection and predicate pushdown
+
+Only the requested columns are converted and rows are filtered chunk by chunk while parsing, so a small subset
+of a large particle table can be read without materialising the rest of it.
+Parsed columns can optionally be kept in an on-disk columnar cache of .npy files, from which later reads
+load only the needed columns (memory-mapped) and rows.
+"""
+import hashlib
+import io
+import mmap
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from peepingtom._io.utils import _path
+from peepingtom.utils.instrumentation import instrument, count
+
+# a loop ends at the next data block, loop or key (a line starting with '_')
+_loop_end = re.compile(rb'\n[ \t]*(?:data_|loop_|_)')
+# STAR values are whitespace separated, single or double quoted values end at a quote followed by whitespace
+_token = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""")
+
+
+class _BoundedReader(io.RawIOBase):
+    """
+    read-only file-like object exposing bytes start to end of a file
+    """
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        n = self._file.readinto(memoryview(buffer)[:size])
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def star_loop_blocks(star_path):
+    """
+    Scan a STAR file for loop blocks without parsing their data
+
+    Only header lines are read, data of each loop is skipped with a byte search for the end of the loop,
+    which is the next data block, loop or key
+
+    Parameters
+    ----------
+    star_path : path to a STAR file
+
+    Returns list of (block_name, columns, data_start, data_end) tuples, data_start and data_end are byte offsets
+    -------
+
+    """
+    star_path = _path(star_path)
+    size = os.path.getsize(star_path)
+    blocks = []
+    if size == 0:
+        return blocks
+    with open(star_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        block = ''
+        columns = None
+        while True:
+            offset = f.tell()
+            line = f.readline()
+            if not line:
+                if columns is not None:
+                    blocks.append((block, columns, offset, offset))
+                break
+            stripped = line.strip()
+            if stripped.startswith(b'data_'):
+                if columns is not None:
+                    # loop without data
+                    blocks.append((block, columns, offset, offset))
+                    columns = None
+                block = stripped[5:].decode()
+            elif stripped == b'loop_':
+                if columns is not None:
+                    # loop without data
+                    blocks.append((block, columns, offset, offset))
+                columns = []
+            elif columns is not None:
+                if stripped.startswith(b'_'):
+                    columns.append(stripped.split()[0][1:].decode())
+                elif stripped and not stripped.startswith(b'#'):
+                    # first line of data, skip to the end of the loop
+                    match = _loop_end.search(mm, offset)
+                    end = size if match is None else match.start() + 1
+                    blocks.append((block, columns, offset, end))
+                    columns = None
+                    f.seek(end)
+    return blocks
+
+
+def _select_block(blocks, block_name=None):
+    if not blocks:
+        raise ValueError('no loop blocks found in star file')
+    if block_name is None:
+        # RELION 3.1 files keep particles next to optics groups
+        names = [block[0] for block in blocks]
+        block_name = 'particles' if 'particles' in names else names[0]
+    for block in blocks:
+        if block[0] == block_name:
+            return block
+    raise ValueError(f'no loop block named {block_name} in star file')
+
+
+def _query_columns(query, columns):
+    """
+    columns referred to by a pandas query string
+    """
+    if query is None:
+        return []
+    return [col for col in columns if re.search(rf'(?<![\w.]){re.escape(col)}(?!\w)', query)]
+
+
+def _filter(df, volumes=None, query=None):
+    """
+    apply the volume regex on rlnMicrographName and the query string to a DataFrame
+    """
+    if volumes is not None:
+        df = df[df['rlnMicrographName'].astype(str).str.contains(volumes, regex=True)]
+    if query is not None:
+        df = df.query(query)
+    return df
+
+
+def _projection(all_columns, columns, volumes, query):
+    """
+    columns which have to be parsed and columns which are returned, in file order
+    """
+    if columns is None:
+        output = list(all_columns)
+    else:
+        output = [col for col in all_columns if col in columns]
+    needed = set(output) | set(_query_columns(query, all_columns))
+    if volumes is not None:
+        if 'rlnMicrographName' not in all_columns:
+            raise ValueError("filtering on volumes needs a 'rlnMicrographName' column")
+        needed.add('rlnMicrographName')
+    return [col for col in all_columns if col in needed], output
+
+
+def _has_single_quotes(star_path, start, end):
+    with open(star_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm.find(b"'", start, end) != -1
+
+
+def _tokens(line):
+    return [m.group(1) if m.group(1) is not None else m.group(2) if m.group(2) is not None else m.group(3)
+            for m in _token.finditer(line)]
+
+
+def _parse_quoted(star_path, block, usecols, chunksize):
+    """
+    quote-aware parsing of a loop block line by line, for blocks which pandas can't split (single quotes)
+    """
+    _, columns, start, end = block
+    indices = [columns.index(col) for col in usecols]
+
+    def to_frame(rows):
+        df = pd.DataFrame(rows, columns=usecols)
+        for col in usecols:
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                pass
+        return df
+
+    rows = []
+    n_chunks = 0
+    with io.TextIOWrapper(_BoundedReader(star_path, start, end)) as lines:
+        for line in lines:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#'):
+                continue
+            values = _tokens(stripped)
+            if len(values) != len(columns):
+                raise ValueError(f'expected {len(columns)} values, got {len(values)} in line {stripped!r}')
+            rows.append([values[idx] for idx in indices])
+            if len(rows) == chunksize:
+                yield to_frame(rows)
+                n_chunks += 1
+                rows = []
+    if rows or not n_chunks:
+        yield to_frame(rows)
+
+
+def _parse_block(star_path, block, usecols, chunksize):
+    """
+    iterate over DataFrames of chunksize rows of the given columns of a loop block
+    """
+    _, columns, start, end = block
+    if start == end:
+        yield pd.DataFrame({col: [] for col in usecols})
+        return
+    if _has_single_quotes(star_path, start, end):
+        # pandas only understands double quotes
+        yield from _parse_quoted(star_path, block, usecols, chunksize)
+        return
+    reader = io.BufferedReader(_BoundedReader(star_path, start, end))
+    try:
+        yield from pd.read_csv(reader, sep=r'\s+', header=None, names=columns, usecols=usecols, comment='#',
+                               chunksize=chunksize, engine='c')
+    finally:
+        reader.close()
+
+
+class _ColumnCache:
+    """
+    on-disk cache of the columns of one loop block of one version of a STAR file, one .npy file per column
+    """
+    def __init__(self, cache_dir, star_path, block_name):
+        stat = os.stat(star_path)
+        key = f'{star_path}:{stat.st_mtime_ns}:{stat.st_size}:{block_name}'
+        self.directory = os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest())
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _file(self, column):
+        return os.path.join(self.directory, f'{column}.npy')
+
+    def __contains__(self, column):
+        return os.path.exists(self._file(column))
+
+    def load(self, column):
+        return np.load(self._file(column), mmap_mode='r')
+
+    def save(self, column, values):
+        values = np.asarray(values)
+        if values.dtype == object:
+            values = values.astype(str)
+        # write to a temporary file first so readers never see partial files
+        tmp = self._file(column) + f'.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp, self._file(column))
+
+
+def _read_cached(star_path, block, parse, output, volumes, query, chunksize, cache_dir):
+    cache = _ColumnCache(cache_dir, star_path, block[0])
+    missing = [col for col in parse if col not in cache]
+    if missing:
+        df = pd.concat(list(_parse_block(star_path, block, missing, chunksize)), ignore_index=True)
+        for col in missing:
+            cache.save(col, df[col].to_numpy())
+        del df
+    count('star_columns_parsed', len(missing))
+
+    # evaluate predicates on their columns only, then gather the selected rows of each output column
+    mask = None
+    if volumes is not None or query is not None:
+        predicate_columns = _query_columns(query, parse)
+        if volumes is not None:
+            predicate_columns.append('rlnMicrographName')
+        predicate_df = pd.DataFrame({col: cache.load(col) for col in set(predicate_columns)})
+        mask = _filter(predicate_df, volumes, query).index.to_numpy()
+    data = {}
+    for col in output:
+        values = cache.load(col)
+        data[col] = np.array(values if mask is None else values[mask])
+    return pd.DataFrame(data, columns=output)
+
+
+@instrument()
+def read_star_table(star_path, columns=None, volumes=None, query=None, block_name=None, chunksize=100_000,
+                    cache_dir=None):
+    """
+    Read a loop block of a STAR file, materialising only the requested columns and rows
+
+    Parameters
+    ----------
+    star_path : path to a STAR file
+    columns : list of columns to return, columns not present in the file are ignored, None for all columns
+    volumes : regular expression, only rows whose rlnMicrographName contains a match are kept e.g. 'TS_0[1-5]'
+    query : pandas query string, only rows satisfying it are kept e.g. 'rlnMaxValueProbDistribution > 0.1'
+    block_name : name of the loop block to read (without 'data_'), defaults to 'particles' if present
+                 or the first loop block otherwise
+    chunksize : number of rows parsed at a time
+    cache_dir : directory for a columnar cache of parsed columns, None for no cache
+
+    Returns DataFrame
+    -------
+
+    """
+    star_path = _path(star_path)
+    block = _select_block(star_loop_blocks(star_path), block_name)
+    parse, output = _projection(block[1], columns, volumes, query)
+
+    if cache_dir is not None:
+        df = _read_cached(star_path, block, parse, output, volumes, query, chunksize, cache_dir)
+    else:
+        chunks = [_filter(chunk, volumes, query)[output] for chunk in _parse_block(star_path, block, parse, chunksize)]
+        df = pd.concat(chunks, ignore_index=True)
+    count('star_rows_read', len(df))
+    return df
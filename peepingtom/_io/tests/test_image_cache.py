@@ -0,0 +1,115 @@
+import os
+import threading
+
+import numpy as np
+import mrcfile
+import pytest
+
+from ..image_cache import ImageCache, get_image_cache
+from ..read import read_image, read_images
+
+
+def _write(path, value, shape=(10, 10, 10)):
+    mrcfile.write(path, np.full(shape, value, dtype=np.float32), overwrite=True)
+    return str(path)
+
+
+def test_image_cache(tmp_path):
+    paths = [_write(tmp_path / f'{i}.mrc', i) for i in range(3)]
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        with mrcfile.open(path) as mrc:
+            return mrc.data
+
+    # each image is 4000 bytes, only two fit
+    cache = ImageCache(max_bytes=8000)
+    a = cache.get(paths[0], loader)
+    assert cache.get(paths[0], loader) is a
+    assert len(calls) == 1
+    assert not a.flags.writeable
+
+    cache.get(paths[1], loader)
+    cache.get(paths[2], loader)
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= 8000
+
+    # evicted but still referenced, so not reread
+    assert cache.get(paths[0], loader) is a
+    assert len(calls) == 3
+    assert cache.stats()['hits'] == 2
+
+    # changed files are reread
+    _write(paths[0], 5)
+    os.utime(paths[0], ns=(0, 10 ** 9))
+    assert cache.get(paths[0], loader).mean() == 5
+    assert len(calls) == 4
+
+
+def test_image_cache_policy(tmp_path):
+    paths = [_write(tmp_path / f'{i}.mrc', i) for i in range(3)]
+    loader = lambda path: np.array(mrcfile.read(path))
+    cache = ImageCache(max_bytes=8000, policy='lfu')
+    for _ in range(3):
+        cache.get(paths[0], loader)
+    cache.get(paths[1], loader)
+    cache.get(paths[2], loader)
+    # least frequently used entry is evicted, not the least recently used
+    assert cache.stats()['entries'] == 2
+    assert cache.key(paths[0]) in cache._cache
+
+    with pytest.raises(ValueError):
+        cache.configure(policy='fifo')
+
+
+def test_image_cache_concurrent(tmp_path):
+    path = _write(tmp_path / 'image.mrc', 1)
+    release = threading.Event()
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        release.wait(5)
+        return np.array(mrcfile.read(path))
+
+    cache = ImageCache()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(path, loader))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_image_cache_evict(tmp_path):
+    path = _write(tmp_path / 'image.mrc', 1)
+    cache = ImageCache()
+    loader = lambda path: np.array(mrcfile.read(path))
+    data = cache.get(path, loader)
+    cache.evict(path)
+    assert cache.stats()['entries'] == 0
+    # not found through the weak reference either
+    assert cache.get(path, loader) is not data
+    cache.evict(tmp_path / 'missing.mrc')
+
+    def failing(path):
+        raise OSError('unreadable')
+
+    cache.clear()
+    with pytest.raises(OSError):
+        cache.get(path, failing)
+    assert cache.get(path, loader).mean() == 1
+
+
+def test_read_image_cached(tmp_path):
+    path = _write(tmp_path / 'image.mrc', 1)
+    get_image_cache().clear()
+    assert read_image(path) is read_images([path])[0]
+    assert read_image(path, cache=False) is not read_image(path)
+    get_image_cache().clear()
@@ -0,0 +1,165 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+import mrcfile
+import starfile
+
+from .. import read, topeep
+from ..loader import BackgroundLoader
+from ..read import lazy_images, read_image_header, read_tilt_series, zip_data_to_blocks
+from ...base import ImageBlock
+
+
+def test_lazy_images(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'TS_{i:02d}.mrc'
+        mrcfile.write(path, np.full((4, 5, 6), i, dtype=np.float32))
+        paths.append(str(path))
+
+    images = lazy_images(paths)
+    assert all(not image.is_loaded for image in images)
+    assert all(image.shape == (4, 5, 6) for image in images)
+    assert images[2].data.mean() == 2
+
+
+def test_image_pixel_size(tmp_path):
+    path = tmp_path / 'TS_01.mrc'
+    with mrcfile.new(path) as mrc:
+        mrc.set_data(np.zeros((4, 5, 6), dtype=np.float32))
+        mrc.voxel_size = 8
+    assert read_image_header(path) == ((4, 5, 6), 8)
+    image = lazy_images(str(path))[0]
+    assert image.pixel_size == 8 and not image.is_loaded
+
+    # unset pixel sizes are unknown rather than 0
+    mrcfile.write(tmp_path / 'TS_02.mrc', np.zeros((4, 5, 6), dtype=np.float32))
+    assert read_image_header(tmp_path / 'TS_02.mrc')[1] is None
+
+
+def test_zip_data_to_blocks_normalized_pixel_size():
+    # the arguments are checked before any file is read
+    with pytest.raises(ValueError):
+        zip_data_to_blocks([], [], pixel_size=2, normalized=True)
+
+
+def _tomogram_star(path, names):
+    df = pd.DataFrame({'rlnMicrographName': np.repeat(names, 2)})
+    for axis in 'XYZ':
+        df[f'rlnCoordinate{axis}'] = 1.0
+    for angle in ('Rot', 'Tilt', 'Psi'):
+        df[f'rlnAngle{angle}'] = 0.0
+    starfile.write(df, path, overwrite=True)
+    return str(path)
+
+
+def test_zip_data_to_blocks_selection(tmp_path, monkeypatch):
+    star = _tomogram_star(tmp_path / 'particles.star', ['TS_01', 'TS_02'])
+    mrcfile.write(tmp_path / 'TS_01.mrc', np.zeros((4, 5, 6), dtype=np.float32))
+    image = str(tmp_path / 'TS_01.mrc')
+    # orientations are not under test here
+    monkeypatch.setattr(read, '_dataset_to_tuple', lambda raw_name, df, *args: (
+        raw_name, df[['rlnCoordinateX', 'rlnCoordinateY', 'rlnCoordinateZ']].to_numpy(),
+        np.tile(np.eye(3), (len(df), 1, 1)), None))
+    images_read = []
+    monkeypatch.setattr(read, 'read_image', lambda path: images_read.append(path) or np.zeros((4, 5, 6)))
+
+    # volumes which are not requested don't need an image
+    crates = zip_data_to_blocks([image], [star], names=['TS_01'])
+    assert len(crates) == 1 and crates[0][0].shape == (4, 5, 6)
+    images_read.clear()
+
+    # the missing image of the last volume fails before any image data is read
+    with pytest.raises(FileNotFoundError):
+        zip_data_to_blocks([image, str(tmp_path / 'TS_02.mrc')], [star])
+    assert images_read == []
+
+
+def test_zip2peep_forwards_units(monkeypatch):
+    calls = []
+    monkeypatch.setattr(topeep, 'zip_data_to_blocks', lambda *args, **kwargs: calls.append(kwargs) or [])
+    monkeypatch.setattr(topeep, '_peeper', lambda blocks, **kwargs: blocks)
+    topeep.zip2peep(['TS_01.mrc'], ['particles.star'], normalized=True)
+    topeep.zip2peep(['TS_01.mrc'], ['particles.star'], pixel_size=4)
+    assert (calls[0]['normalized'], calls[0]['pixel_size']) == (True, None)
+    assert (calls[1]['normalized'], calls[1]['pixel_size']) == (False, 4)
+
+
+def test_read_tilt_series(tmp_path):
+    path = tmp_path / 'TS_01.mrc'
+    stack = np.random.random((3, 8, 10)).astype(np.float32)
+    mrcfile.write(path, stack)
+    np.savetxt(tmp_path / 'TS_01.tlt', [-3, 0, 3])
+
+    tilt_series = read_tilt_series(path, dose=[2, 0, 4])
+    assert not tilt_series.is_loaded
+    assert tilt_series.shape == (3, 8, 10)
+    assert list(tilt_series.tilt_angles) == [-3, 0, 3]
+    assert list(tilt_series.tilt_order()) == [1, 0, 2]
+    # the stack is memory-mapped, not read
+    assert isinstance(tilt_series.data, np.memmap)
+    np.testing.assert_allclose(tilt_series.tilt(1), stack[1])
+
+    (tmp_path / 'TS_01.tlt').unlink()
+    with pytest.raises(FileNotFoundError):
+        read_tilt_series(path)
+
+
+def test_background_loader():
+    release = threading.Event()
+
+    def make_loader(value):
+        def loader():
+            release.wait(5)
+            return np.full((2, 2), value)
+        return loader
+
+    images = [ImageBlock(None, ndim_spatial=2, loader=make_loader(i)) for i in range(4)]
+    loaded = []
+    loader = BackgroundLoader(images, max_workers=2)
+    loader.add_done_callback(loaded.append)
+    assert loader.progress == (0, 4)
+
+    release.set()
+    completed = list(loader.as_completed())
+    assert loader.done
+    assert sorted(id(image) for image in completed) == sorted(id(image) for image in images)
+    assert len(loaded) == 4
+    assert all(image.is_loaded for image in images)
+    assert not loader.errors
+
+
+def test_background_loader_failure(caplog):
+    def failing():
+        raise OSError('unreadable')
+
+    images = [ImageBlock(None, ndim_spatial=2, loader=lambda: np.zeros((2, 2))),
+              ImageBlock(None, ndim_spatial=2, loader=failing),
+              ImageBlock(None, ndim_spatial=2, loader=lambda: np.ones((2, 2)))]
+    loader = BackgroundLoader(images, max_workers=1)
+    # the failed block is logged and skipped, the others are still yielded
+    completed = list(loader.as_completed())
+    assert sorted(id(image) for image in completed) == sorted([id(images[0]), id(images[2])])
+    assert list(loader.errors) == [images[1]]
+    assert isinstance(loader.errors[images[1]], OSError)
+    assert 'unreadable' in caplog.text
+
+
+def test_background_loader_cancel():
+    release = threading.Event()
+
+    def loader():
+        release.wait(5)
+        return np.zeros((2, 2))
+
+    images = [ImageBlock(None, ndim_spatial=2, loader=loader) for i in range(4)]
+    background_loader = BackgroundLoader(images, max_workers=1)
+    background_loader.cancel()
+    release.set()
+    background_loader.wait()
+
+    # at most the block already being loaded finishes
+    assert sum(image.is_loaded for image in images) <= 1
+    assert background_loader.done
@@ -0,0 +1,68 @@
+import numpy as np
+import mrcfile
+
+from ..navigator import VolumeNavigator
+from ..image_cache import get_image_cache
+from ..read import lazy_images
+from ...base import DataCrate, ImageBlock
+
+
+def _lazy_crates(n):
+    crates = []
+    for i in range(n):
+        image = ImageBlock(None, ndim_spatial=3, loader=lambda i=i: np.full((10, 10, 10), i, dtype=np.float32))
+        crates.append(DataCrate([image]))
+    return crates
+
+
+def _n_loaded(crates):
+    return sum(crate[0].is_loaded for crate in crates)
+
+
+def test_volume_navigator():
+    crates = _lazy_crates(10)
+    navigator = VolumeNavigator(crates, prefetch=1, max_resident=3)
+
+    crate = navigator.go_to(0)
+    assert crate is crates[0]
+    assert crate[0].data.mean() == 0
+
+    # step through all volumes, residency stays bounded
+    for i in range(1, 15):
+        crate = navigator.next()
+        assert crate is crates[i % 10]
+        assert crate[0].is_loaded
+        assert len(navigator.resident) <= 3
+        assert _n_loaded(crates) <= 3 + 1
+
+    crate = navigator.previous()
+    assert crate is crates[3]
+    navigator.close()
+    assert _n_loaded(crates) == 0
+
+
+def test_volume_navigator_byte_budget():
+    crates = _lazy_crates(5)
+    # each volume is 4000 bytes, so only two fit in the budget
+    navigator = VolumeNavigator(crates, prefetch=2, max_bytes=8000, max_resident=10, wrap=False)
+    for i in range(5):
+        navigator.go_to(i)
+        assert navigator.resident.total_bytes <= 8000 or len(navigator.resident) == 1
+        assert crates[i][0].is_loaded
+    navigator.close()
+
+
+def test_volume_navigator_image_cache(tmp_path):
+    paths = []
+    for i in range(4):
+        paths.append(str(tmp_path / f'{i}.mrc'))
+        mrcfile.write(paths[-1], np.full((10, 10, 10), i, dtype=np.float32))
+    get_image_cache().clear()
+    crates = [DataCrate([image]) for image in lazy_images(paths)]
+    navigator = VolumeNavigator(crates, prefetch=0, max_resident=1, wrap=False)
+    for i in range(4):
+        navigator.go_to(i)
+    # images of evicted volumes are not kept by the image cache
+    assert get_image_cache().stats()['entries'] == 1
+    navigator.close()
+    assert get_image_cache().stats()['entries'] == 0
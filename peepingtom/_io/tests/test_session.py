@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import mrcfile
+import pytest
+from numpy.testing import assert_array_equal
+
+from ...base import DataCrate, Particles, LineBlock, ImageBlock
+from ...base.datablock import SphereBlock
+from ...utils.mode_enums import ImageType
+from ..read import lazy_images, read_tilt_series
+from ..session import save_session, load_session
+
+
+def test_session(tmp_path):
+    mrc_path = tmp_path / 'TS_01.mrc'
+    mrcfile.write(mrc_path, np.ones((4, 5, 6), dtype=np.float32))
+    positions = np.random.random((10, 3))
+    properties = pd.DataFrame({'score': np.arange(10.), 'name': list('abcdefghij')})
+    crate = DataCrate([Particles(positions, np.tile(np.eye(3), (10, 1, 1)), properties=properties),
+                       LineBlock(np.random.random((5, 3))),
+                       SphereBlock(np.array([1, 2, 3]), 4),
+                       ImageBlock(np.zeros((3, 3, 3)), ndim_spatial=3, image_type=ImageType.cross_correlation_volume),
+                       lazy_images(str(mrc_path))[0]])
+
+    directory = save_session([crate, DataCrate()], tmp_path / 'session')
+    with pytest.raises(FileExistsError):
+        save_session([crate], directory)
+
+    loaded = load_session(directory)
+    assert len(loaded) == 2 and len(loaded[1]) == 0
+    particles, line, sphere, cc, image = loaded[0]
+    assert_array_equal(particles.positions.data, positions)
+    # memory-mapped, not read
+    assert not particles.positions.data.flags.owndata
+    assert list(particles.properties['name']) == list('abcdefghij')
+    assert isinstance(line, LineBlock)
+    assert_array_equal(line.data, crate[1].data)
+    assert sphere.radius == 4
+    assert cc.image_type is ImageType.cross_correlation_volume
+    # images read from files are references, reopened lazily
+    assert not image.is_loaded
+    assert image.shape == (4, 5, 6)
+    assert image.data.sum() == 120
+
+    # copy-on-write, the session on disk is unchanged
+    particles.positions.data[0] = -1
+    assert_array_equal(load_session(directory)[0][0].positions.data, positions)
+
+
+def test_session_failed_overwrite(tmp_path):
+    particles = Particles(np.random.random((4, 3)), np.tile(np.eye(3), (4, 1, 1)))
+    directory = save_session([DataCrate([particles])], tmp_path / 'session')
+    # the second block can't be saved, after the arrays of the first were written
+    with pytest.raises(TypeError):
+        save_session([DataCrate([particles, object()])], directory, overwrite=True)
+    # no manifest is left pointing at the replaced arrays
+    with pytest.raises(FileNotFoundError):
+        load_session(directory)
+
+
+def test_session_tilt_series(tmp_path):
+    path = tmp_path / 'TS_01.mrc'
+    mrcfile.write(path, np.ones((3, 4, 5), dtype=np.float32))
+    tilt_series = read_tilt_series(path, tilt_angles=[-3, 0, 3], dose=[3, 0, 6])
+    directory = save_session([DataCrate([tilt_series])], tmp_path / 'session')
+
+    loaded = load_session(directory)[0][0]
+    assert not loaded.is_loaded
+    assert list(loaded.tilt_angles) == [-3, 0, 3]
+    assert list(loaded.dose) == [3, 0, 6]
+    assert loaded.tilt(2).sum() == 20
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import starfile
+
+from ..star import read_star_table, star_loop_blocks
+
+
+def _write_star(path, n=1000):
+    particles = pd.DataFrame({
+        'rlnCoordinateX': np.arange(n, dtype=float),
+        'rlnCoordinateY': np.arange(n, dtype=float) * 2,
+        'rlnCoordinateZ': np.zeros(n),
+        'rlnMicrographName': [f'TS_{i % 4:02d}.tomostar' for i in range(n)],
+        'rlnMaxValueProbDistribution': np.linspace(0, 1, n),
+    })
+    optics = pd.DataFrame({'rlnOpticsGroup': [1], 'rlnVoltage': [300.0]})
+    starfile.write({'optics': optics, 'particles': particles}, path, overwrite=True)
+    return particles
+
+
+def test_star_loop_blocks(tmp_path):
+    path = tmp_path / 'particles.star'
+    _write_star(path)
+    blocks = star_loop_blocks(path)
+    assert [block[0] for block in blocks] == ['optics', 'particles']
+    assert blocks[1][1][-1] == 'rlnMaxValueProbDistribution'
+
+
+def test_read_star_table(tmp_path):
+    path = tmp_path / 'particles.star'
+    particles = _write_star(path)
+
+    # defaults to the particles block
+    df = read_star_table(path, chunksize=300)
+    assert df.shape == particles.shape
+    np.testing.assert_allclose(df['rlnCoordinateY'], particles['rlnCoordinateY'])
+
+    # projection, missing columns are ignored
+    df = read_star_table(path, columns=['rlnCoordinateX', 'rlnNotThere'])
+    assert list(df.columns) == ['rlnCoordinateX']
+
+    # predicates on columns which are not returned
+    expected = particles[particles['rlnMicrographName'].str.contains('TS_0[12]')
+                         & (particles['rlnMaxValueProbDistribution'] > 0.5)]
+    df = read_star_table(path, columns=['rlnCoordinateX'], volumes='TS_0[12]',
+                         query='rlnMaxValueProbDistribution > 0.5', chunksize=100)
+    assert list(df.columns) == ['rlnCoordinateX']
+    np.testing.assert_array_equal(df['rlnCoordinateX'], expected['rlnCoordinateX'])
+
+    optics = read_star_table(path, block_name='optics')
+    assert optics['rlnVoltage'][0] == 300
+
+
+def test_read_star_table_cache(tmp_path):
+    path = tmp_path / 'particles.star'
+    particles = _write_star(path)
+    cache_dir = tmp_path / 'cache'
+
+    kwargs = dict(columns=['rlnCoordinateX', 'rlnMicrographName'], query='rlnCoordinateX < 10', cache_dir=cache_dir)
+    first = read_star_table(path, **kwargs)
+    second = read_star_table(path, **kwargs)
+    pd.testing.assert_frame_equal(first, second)
+    assert len(first) == 10
+    assert set(first['rlnMicrographName']) == set(particles['rlnMicrographName'])
+
+    uncached = read_star_table(path, volumes='TS_03')
+    cached = read_star_table(path, volumes='TS_03', cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(uncached, cached)
+
+
+def test_read_star_table_quoted(tmp_path):
+    path = tmp_path / 'quoted.star'
+    path.write_text("""
+data_particles
+
+loop_
+_rlnMicrographName #1
+_rlnCoordinateX #2
+_rlnAngleRot #3
+'TS 01' 1 0
+"TS 02" 2.5 10
+TS_03 3 20
+""")
+    df = read_star_table(path, chunksize=2)
+    assert df['rlnMicrographName'].tolist() == ['TS 01', 'TS 02', 'TS_03']
+    np.testing.assert_allclose(df['rlnCoordinateX'], [1, 2.5, 3])
+    np.testing.assert_allclose(df['rlnAngleRot'], [0, 10, 20])
+    # projection and predicates work on quoted blocks
+    df = read_star_table(path, columns=['rlnAngleRot'], query='rlnCoordinateX > 2')
+    np.testing.assert_allclose(df['rlnAngleRot'], [10, 20])
+
+
+def test_star_loops_in_one_block(tmp_path):
+    path = tmp_path / 'loops.star'
+    path.write_text("""
+data_model
+
+loop_
+_rlnA #1
+1
+2
+
+_rlnKey 5
+
+loop_
+_rlnB #1
+_rlnC #2
+3 4
+""")
+    blocks = star_loop_blocks(path)
+    assert [block[1] for block in blocks] == [['rlnA'], ['rlnB', 'rlnC']]
+    assert read_star_table(path)['rlnA'].tolist() == [1, 2]
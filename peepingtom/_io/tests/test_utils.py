@@ -0,0 +1,31 @@
+import pytest
+
+from ..utils import guess_name, pair_by_name
+
+
+def test_guess_name():
+    assert guess_name('/data/TS_01.mrc') == 'TS_01'
+    assert guess_name('/data/tomogram.mrc') == 'NoName'
+
+
+def test_pair_by_name():
+    images = ['/data/TS_03.mrc', '/data/TS_01_bin4.mrc', '/data/TS_02.mrc']
+    datasets = ['TS_01.mrc', 'TS_02.mrc', 'TS_03']
+    assert pair_by_name(images, datasets) == [(1, 0), (2, 1), (0, 2)]
+
+    # subsets of images are fine
+    assert pair_by_name(images, ['TS_02.mrc']) == [(2, 0)]
+
+    # missing and ambiguous images fail
+    with pytest.raises(ValueError):
+        pair_by_name(images, ['TS_04.mrc'])
+    with pytest.raises(ValueError):
+        pair_by_name(['TS_01_bin2.mrc', 'TS_01_bin4.mrc'], ['TS_01'])
+    # several datasets paired with one image fail too
+    with pytest.raises(ValueError):
+        pair_by_name(images, ['TS_01.star', 'TS_01_bin4.star'])
+
+    # fall back to position if nothing can be matched by name
+    assert pair_by_name(['a.mrc', 'b.mrc'], ['x.star', 'y.star']) == [(0, 0), (1, 1)]
+    with pytest.raises(ValueError):
+        pair_by_name(['a.mrc'], ['x.star', 'y.star'])
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_allclose
+
+from ...base import DataCrate, Particles
+from ...utils.helpers.dataframe_helper import rotation_matrices_to_euler_angles
+from ..star import read_star_table
+from ..write import write_star, write_dynamo_table, _format_fixed
+
+
+def _rz(angles):
+    t = np.deg2rad(angles)
+    c, s, o, i = np.cos(t), np.sin(t), np.zeros_like(t), np.ones_like(t)
+    return np.stack([c, -s, o, s, c, o, o, o, i], axis=-1).reshape(-1, 3, 3)
+
+
+def _ry(angles):
+    t = np.deg2rad(angles)
+    c, s, o, i = np.cos(t), np.sin(t), np.zeros_like(t), np.ones_like(t)
+    return np.stack([c, o, s, o, i, o, -s, o, c], axis=-1).reshape(-1, 3, 3)
+
+
+def _rx(angles):
+    t = np.deg2rad(angles)
+    c, s, o, i = np.cos(t), np.sin(t), np.zeros_like(t), np.ones_like(t)
+    return np.stack([i, o, o, o, c, -s, o, s, c], axis=-1).reshape(-1, 3, 3)
+
+
+def _euler_to_matrices(angles, mode):
+    # explicit intrinsic zyz (relion) or zxz (dynamo) rotations
+    second = _ry if mode == 'relion' else _rx
+    return _rz(angles[:, 0]) @ second(angles[:, 1]) @ _rz(angles[:, 2])
+
+
+def _random_angles(n, rng):
+    angles = rng.uniform(-180, 180, (n, 3))
+    angles[:, 1] = np.abs(angles[:, 1])
+    # gimbal lock
+    angles[:2, 1] = [0, 180]
+    return angles
+
+
+@pytest.mark.parametrize('mode', ['relion', 'dynamo'])
+def test_rotation_matrices_to_euler_angles(mode):
+    matrices = _euler_to_matrices(_random_angles(1000, np.random.default_rng(0)), mode)
+    angles = rotation_matrices_to_euler_angles(matrices, mode)
+    assert_allclose(_euler_to_matrices(angles, mode), matrices, atol=1e-12)
+    assert np.all((angles[:, 1] >= 0) & (angles[:, 1] <= 180))
+
+
+def _fields(chars):
+    return [row.tobytes().decode().strip() for row in chars]
+
+
+def test_format_fixed():
+    values = np.array([0, 1.5, -12.25, 123456.789, -0.5, 9.9999999])
+    assert _fields(_format_fixed(values, 3)) == [f'{value:.3f}' for value in values]
+    assert _fields(_format_fixed([-3, 42], 0)) == ['-3', '42']
+    # no negative zero
+    assert _fields(_format_fixed([-0.0000001], 3)) == ['0.000']
+    assert _fields(_format_fixed([np.nan, 1], 1)) == ['nan', '1.0']
+
+
+def _crates(rng, n=(50, 30)):
+    crates = []
+    for idx, size in enumerate(n):
+        positions = rng.uniform(-10, 1000, (size, 3))
+        matrices = _euler_to_matrices(_random_angles(size, rng), 'relion')
+        properties = pd.DataFrame({'score': rng.random(size), 'class': rng.integers(0, 3, size)})
+        crates.append(DataCrate([Particles(positions, matrices, properties=properties)]))
+    return crates
+
+
+def test_write_star(tmp_path):
+    crates = _crates(np.random.default_rng(0))
+    path = tmp_path / 'particles.star'
+    write_star(crates, path, names=['TS_01', 'TS_02'], chunksize=16)
+    with pytest.raises(FileExistsError):
+        write_star(crates, path)
+
+    df = read_star_table(path)
+    assert len(df) == 80
+    assert list(df.columns[-3:]) == ['rlnMicrographName', 'score', 'class']
+    particles = [crate[0] for crate in crates]
+    assert_allclose(df[['rlnCoordinateX', 'rlnCoordinateY', 'rlnCoordinateZ']],
+                    np.concatenate([p.positions.data for p in particles]), atol=1e-6)
+    matrices = _euler_to_matrices(df[['rlnAngleRot', 'rlnAngleTilt', 'rlnAnglePsi']].to_numpy(), 'relion')
+    assert_allclose(matrices, np.concatenate([p.orientations.data for p in particles]), atol=1e-6)
+    assert list(df['rlnMicrographName'].unique()) == ['TS_01', 'TS_02']
+    assert_allclose(df['class'], np.concatenate([p.properties['class'] for p in particles]))
+
+
+def test_write_star_quoted(tmp_path):
+    crates = _crates(np.random.default_rng(0))
+    path = tmp_path / 'particles.star'
+    write_star(crates, path, names=['tomogram 1', 'TS_02'])
+    # names with whitespace are quoted and read back as a single field
+    df = read_star_table(path)
+    assert list(df['rlnMicrographName'].unique()) == ['tomogram 1', 'TS_02']
+    assert_allclose(df['class'], np.concatenate([crate[0].properties['class'] for crate in crates]))
+
+    with pytest.raises(ValueError):
+        write_star(crates, path, names=['two\nlines', 'TS_02'], overwrite=True)
+    with pytest.raises(ValueError):
+        write_star(crates, path, names=['a "quoted" name', 'TS_02'], overwrite=True)
+
+
+def test_write_dynamo_table(tmp_path):
+    crates = _crates(np.random.default_rng(1))
+    path = tmp_path / 'particles.tbl'
+    write_dynamo_table(crates, path, tomograms=[3, 7], chunksize=16)
+
+    table = np.loadtxt(path)
+    assert table.shape == (80, 26)
+    assert_allclose(table[:, 0], np.arange(1, 81))
+    assert_allclose(table[:50, 19], 3)
+    particles = [crate[0] for crate in crates]
+    assert_allclose(table[:, 23:26], np.concatenate([p.positions.data for p in particles]), atol=1e-6)
+    assert_allclose(table[:, 9], np.concatenate([p.properties['score'] for p in particles]), atol=1e-6)
+    matrices = _euler_to_matrices(table[:, 6:9], 'dynamo')
+    assert_allclose(matrices, np.concatenate([p.orientations.data for p in particles]), atol=1e-6)
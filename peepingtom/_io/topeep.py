@@ -1,10 +1,31 @@
 from peepingtom._io.read import zip_data_to_blocks
-from peepingtom.visualisation.peeper import Peeper
+from peepingtom._io.session import load_session
 
 
-def zip2peep(mrc_paths=[], star_paths=[], sort=True, data_columns=None):
+def _peeper(*args, **kwargs):
+    # the visualisation stack (napari, Qt) is only imported when a Peeper is created
+    from peepingtom.visualisation.peeper import Peeper
+    return Peeper(*args, **kwargs)
+
+
+def zip2peep(mrc_paths=[], star_paths=[], sort=True, data_columns=None, background=False, max_workers=4, names=None,
+             pixel_size=None, normalized=False):
     """
     Creates a Peeper with n volumes each containing 1 image and 1 particles
+    if background, the Peeper is created from star files and mrc headers only and image data
+    is loaded on max_workers background threads, image layers are added as each volume finishes loading
+    names selects a subset of volumes to load
+    pixel_size is the pixel size of the coordinates in the star files and normalized is True for coordinates
+    given as fractions of the image size (see zip_data_to_blocks)
+    """
+    blocks = zip_data_to_blocks(mrc_paths, star_paths, sort, data_columns, lazy=background, names=names,
+                                pixel_size=pixel_size, normalized=normalized)
+    return _peeper(blocks, background=background, max_workers=max_workers)
+
+
+def session2peep(directory, background=False, max_workers=4):
+    """
+    Creates a Peeper from a session directory written by save_session or Peeper.save_session
+    arrays are memory-mapped and images stored as references are loaded lazily, or in the background if background
     """
-    blocks = zip_data_to_blocks(mrc_paths, star_paths, sort, data_columns)
-    return Peeper(blocks)
+    return _peeper(load_session(directory), background=background, max_workers=max_workers)
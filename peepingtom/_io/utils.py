@@ -1,6 +1,7 @@
 from pathlib import Path
 import re
 
+
 def _path(path):
     """
     clean up a path
@@ -16,6 +17,54 @@ def guess_name(thing):
     name = 'NoName'
     if isinstance(thing, list):
         raise NotImplementedError('no way to guess a name from a list yet')
-    elif match := re.search('TS_\d+', str(thing)):
+    elif match := re.search(r'TS_\d+', str(thing)):
         name = match.group(0)
     return name
+
+
+def pair_by_name(image_paths, dataset_names):
+    """
+    match images to datasets by name, first by file stem then by guess_name
+
+    if no dataset can be matched by name and the numbers are equal, images and datasets are paired by position
+
+    image_paths: list of paths
+    dataset_names: list of names of datasets, e.g. rlnMicrographName values or star file paths
+    returns list of (image_index, dataset_index) tuples, one for each dataset
+    raises ValueError if any dataset matches no image or several images,
+    or if several datasets match the same image
+    """
+    stems = {}
+    guessed = {}
+    for image_idx, path in enumerate(image_paths):
+        stems.setdefault(Path(str(path)).stem, set()).add(image_idx)
+        guessed.setdefault(guess_name(path), set()).add(image_idx)
+    # unnamed images can't be matched by guessed name
+    guessed.pop('NoName', None)
+
+    pairs = []
+    unmatched = []
+    ambiguous = []
+    for dataset_idx, name in enumerate(dataset_names):
+        candidates = stems.get(Path(str(name)).stem) or guessed.get(guess_name(name), set())
+        if len(candidates) == 1:
+            pairs.append((next(iter(candidates)), dataset_idx))
+        elif not candidates:
+            unmatched.append(name)
+        else:
+            ambiguous.append(name)
+
+    if not pairs and not ambiguous and len(image_paths) == len(dataset_names):
+        return [(idx, idx) for idx in range(len(dataset_names))]
+    if unmatched or ambiguous:
+        raise ValueError(f'could not pair datasets with images by name; '
+                         f'no matching image for {unmatched}, several matching images for {ambiguous}')
+    # e.g. TS_01.star and TS_01_bin4.star both guessed as TS_01
+    datasets_per_image = {}
+    for image_idx, dataset_idx in pairs:
+        datasets_per_image.setdefault(image_idx, []).append(dataset_names[dataset_idx])
+    shared = {str(image_paths[idx]): names for idx, names in datasets_per_image.items() if len(names) > 1}
+    if shared:
+        raise ValueError(f'could not pair datasets with images by name; '
+                         f'several datasets match the same image: {shared}')
+    return pairs
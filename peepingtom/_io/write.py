@@ -0,0 +1,245 @@
+"""
+Writing of particles to RELION STAR files and Dynamo tables
+
+Rows are formatted as text with vectorised numpy operations and written in chunks, so large particle sets
+are never converted to Python objects or held in memory as text all at once
+"""
+import numpy as np
+
+from peepingtom.base import DataCrate, Particles
+from peepingtom.base.datablock import DataBlock
+from peepingtom.utils.helpers.dataframe_helper import rotation_matrices_to_euler_angles
+from peepingtom.utils.constants import relion_coordinate_headings_3d, relion_euler_angle_headings, \
+    dynamo_table_coordinate_headings, dynamo_euler_angle_headings, dynamo_table_column_headings
+from peepingtom._io.utils import _path
+from peepingtom.utils.instrumentation import instrument, count
+
+# largest magnitude which can be formatted in fixed point through int64
+_max_fixed = 2 ** 62
+
+
+def _format_text(values):
+    """
+    format values as left-aligned ASCII text, returns (n, width) uint8 array of characters
+    """
+    encoded = np.char.encode(np.asarray(values).astype(str), 'utf-8')
+    width = max(encoded.dtype.itemsize, 1)
+    chars = np.frombuffer(encoded.astype(f'S{width}').tobytes(), dtype=np.uint8).reshape(len(encoded), width).copy()
+    chars[chars == 0] = ord(' ')
+    return chars
+
+
+def _quote(values):
+    """
+    double-quote string values which contain spaces or tabs or are empty, so they are read back as one field
+    values which can't be written as one field (with line breaks, or quotes and whitespace) raise a ValueError
+    """
+    text = np.asarray(values).astype(str)
+    if np.any(np.char.find(text, '\n') >= 0) | np.any(np.char.find(text, '\r') >= 0):
+        raise ValueError('string values containing line breaks cannot be written')
+    needs_quotes = (np.char.str_len(text) == 0) | (np.char.find(text, ' ') >= 0) | (np.char.find(text, '\t') >= 0)
+    if not np.any(needs_quotes):
+        return text
+    if np.any(np.char.find(text[needs_quotes], '"') >= 0):
+        raise ValueError('string values containing both whitespace and double quotes cannot be written')
+    return np.where(needs_quotes, np.char.add(np.char.add('"', text), '"'), text)
+
+
+def _format_fixed(values, decimals=6):
+    """
+    format numbers as right-aligned fixed point ASCII text in one vectorised pass
+
+    Returns (n, width) uint8 array of characters
+    -------
+
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.empty((0, 1), dtype=np.uint8)
+    scale = 10 ** decimals
+    if not np.all(np.isfinite(values)) or np.abs(values).max() * scale >= _max_fixed:
+        return _format_text([f'{value:.{decimals}f}' for value in values.tolist()])
+
+    quantised = np.rint(np.abs(values) * scale).astype(np.int64)
+    integer, fraction = np.divmod(quantised, scale)
+    # no sign for values which round to zero
+    negative = (values < 0) & (quantised > 0)
+    powers = 10 ** np.arange(1, 19, dtype=np.int64)
+    n_digits = 1 + np.searchsorted(powers, integer, side='right')
+    n_int = int((n_digits + negative).max())
+    width = n_int + (decimals + 1 if decimals else 0)
+
+    chars = np.full((len(values), width), ord(' '), dtype=np.uint8)
+    for k in range(int(n_digits.max())):
+        show = k < n_digits
+        chars[show, n_int - 1 - k] = ord('0') + (integer[show] // 10 ** k) % 10
+    rows = np.flatnonzero(negative)
+    chars[rows, n_int - 1 - n_digits[rows]] = ord('-')
+    if decimals:
+        chars[:, n_int] = ord('.')
+        for j in range(decimals):
+            chars[:, n_int + 1 + j] = ord('0') + (fraction // 10 ** (decimals - 1 - j)) % 10
+    return chars
+
+
+def _format_column(values, decimals=6):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        return _format_fixed(values, decimals)
+    if values.dtype.kind in 'iub':
+        return _format_fixed(values, 0)
+    return _format_text(_quote(values))
+
+
+def _format_rows(columns, decimals=6):
+    """
+    format equal length columns as lines of whitespace separated fields
+    """
+    fields = [_format_column(column, decimals) for column in columns]
+    n = len(fields[0])
+    space = np.full((n, 1), ord(' '), dtype=np.uint8)
+    newline = np.full((n, 1), ord('\n'), dtype=np.uint8)
+    parts = []
+    for field in fields:
+        parts.extend([field, space])
+    parts[-1] = newline
+    return np.concatenate(parts, axis=1).tobytes()
+
+
+def _particles_per_volume(data):
+    """
+    list of lists of Particles, one per volume, from Particles, a DataCrate or a list of DataCrates
+    """
+    if isinstance(data, Particles):
+        return [[data]]
+    if isinstance(data, DataCrate) or all(isinstance(item, DataBlock) for item in data):
+        data = [data]
+    return [[volume] if isinstance(volume, Particles) else [block for block in volume if isinstance(block, Particles)]
+            for volume in data]
+
+
+def _chunks(particles, chunksize):
+    n = len(particles.positions.data)
+    for start in range(0, n, chunksize):
+        yield slice(start, min(start + chunksize, n))
+
+
+def _open(path, overwrite):
+    path = _path(path)
+    if path.exists() and not overwrite:
+        raise FileExistsError(f'{path} already exists, use overwrite=True to replace it')
+    return open(path, 'wb')
+
+
+@instrument()
+def write_star(data, star_path, names=None, data_columns=None, decimals=6, chunksize=100_000, overwrite=False):
+    """
+    Write particles to a RELION STAR file with a single 'particles' loop block
+
+    Positions are written as rlnCoordinateX/Y/Z (any shifts are already included) and orientations as
+    rlnAngleRot/Tilt/Psi, computed from the rotation matrices of all particles in a chunk at once
+
+    Parameters
+    ----------
+    data : Particles, DataCrate or list of DataCrates, one per volume
+    star_path : path of the output file
+    names : list of names for the volumes written as rlnMicrographName, defaults to the volume number
+    data_columns : list of properties to write as additional columns, defaults to properties all Particles have
+    decimals : int, number of decimals of floating point values
+    chunksize : int, number of particles formatted at a time
+    overwrite : bool, overwrite an existing file
+
+    Returns path of the written file
+    -------
+
+    """
+    volumes = _particles_per_volume(data)
+    if names is None:
+        names = [str(idx + 1) for idx in range(len(volumes))]
+    if len(names) != len(volumes):
+        raise ValueError(f'got {len(names)} names for {len(volumes)} volumes')
+    # names which can't be written fail before the file is opened
+    _quote(names)
+
+    all_particles = [p for volume in volumes for p in volume]
+    if data_columns is None:
+        data_columns = []
+        if all_particles and all(p.properties is not None for p in all_particles):
+            data_columns = [col for col in all_particles[0].properties.columns
+                            if all(col in p.properties.columns for p in all_particles)]
+    standard_columns = relion_coordinate_headings_3d + relion_euler_angle_headings + ['rlnMicrographName']
+    data_columns = [col for col in data_columns if col not in standard_columns]
+    columns = standard_columns + data_columns
+
+    with _open(star_path, overwrite) as f:
+        header = '\ndata_particles\n\nloop_\n' + ''.join(f'_{col} #{idx + 1}\n' for idx, col in enumerate(columns))
+        f.write(header.encode())
+        for name, volume in zip(names, volumes):
+            for particles in volume:
+                for chunk in _chunks(particles, chunksize):
+                    positions = particles.positions.data[chunk]
+                    angles = rotation_matrices_to_euler_angles(particles.orientations.data[chunk], 'relion')
+                    values = [*positions.T, *angles.T, np.full(len(positions), name)]
+                    values += [particles.properties[col].to_numpy()[chunk] for col in data_columns]
+                    f.write(_format_rows(values, decimals))
+                    count('particles_written', len(positions))
+    return _path(star_path)
+
+
+def _property_or(particles, names, chunk, default):
+    # first of names found in the properties of particles, default otherwise
+    if particles.properties is not None:
+        for name in names:
+            if name in particles.properties.columns:
+                return particles.properties[name].to_numpy()[chunk]
+    return np.full(chunk.stop - chunk.start, default)
+
+
+@instrument()
+def write_dynamo_table(data, table_path, tomograms=None, decimals=6, chunksize=100_000, overwrite=False):
+    """
+    Write particles to a Dynamo table with the first 26 standard columns
+
+    Positions are written as x, y, z with zero shifts and orientations as tdrot, tilt, narot, computed from the
+    rotation matrices of all particles in a chunk at once. cc is taken from a 'cc' or 'score' property and class
+    from a 'class' property if present, tags are numbered from 1 over all particles
+
+    Parameters
+    ----------
+    data : Particles, DataCrate or list of DataCrates, one per volume
+    table_path : path of the output file
+    tomograms : list of integer tomogram numbers for the volumes, defaults to numbering the volumes from 1
+    decimals : int, number of decimals of floating point values
+    chunksize : int, number of particles formatted at a time
+    overwrite : bool, overwrite an existing file
+
+    Returns path of the written file
+    -------
+
+    """
+    volumes = _particles_per_volume(data)
+    if tomograms is None:
+        tomograms = range(1, len(volumes) + 1)
+    if len(tomograms) != len(volumes):
+        raise ValueError(f'got {len(tomograms)} tomogram numbers for {len(volumes)} volumes')
+
+    tag = 1
+    with _open(table_path, overwrite) as f:
+        for tomogram, volume in zip(tomograms, volumes):
+            for particles in volume:
+                for chunk in _chunks(particles, chunksize):
+                    positions = particles.positions.data[chunk]
+                    n = len(positions)
+                    angles = rotation_matrices_to_euler_angles(particles.orientations.data[chunk], 'dynamo')
+                    columns = {heading: np.zeros(n, dtype=int) for heading in dynamo_table_column_headings}
+                    columns['tag'] = np.arange(tag, tag + n)
+                    columns['aligned_value'] = columns['averaged_value'] = np.ones(n, dtype=int)
+                    columns['tomo'] = np.full(n, int(tomogram))
+                    columns['cc'] = _property_or(particles, ['cc', 'score'], chunk, 0.)
+                    columns['class'] = _property_or(particles, ['class'], chunk, 0)
+                    columns.update(zip(dynamo_euler_angle_headings, angles.T))
+                    columns.update(zip(dynamo_table_coordinate_headings, positions.T))
+                    f.write(_format_rows(list(columns.values()), decimals))
+                    tag += n
+                    count('particles_written', n)
+    return _path(table_path)
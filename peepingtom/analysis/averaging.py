@@ -0,0 +1,135 @@
+"""
+Streaming averaging of subtomograms
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from peepingtom.base import Particles, ImageBlock, share_block, attach_block
+from peepingtom.analysis.subtomograms import sample_subtomograms, spatial_chunks
+from peepingtom.utils.instrumentation import instrument, count
+
+
+def _sum_chunk(image, positions, orientations, labels, box_shape, order):
+    """
+    sum the boxes of one chunk of particles per label
+
+    Returns dict of {label: (sum of boxes, number of boxes)}
+    -------
+
+    """
+    if not isinstance(image, np.ndarray):
+        # shared block spec, attached in worker processes
+        image = attach_block(image).data
+    boxes = sample_subtomograms(image, positions, orientations, box_shape, order, cval=0)
+    sums = {}
+    for label in np.unique(labels):
+        selected = boxes[labels == label]
+        sums[label] = (selected.sum(axis=0, dtype=np.float64), len(selected))
+    return sums
+
+
+def _accumulate(totals, partial_sums):
+    for label, (box_sum, n) in partial_sums.items():
+        if label in totals:
+            totals[label][0] += box_sum
+            totals[label][1] += n
+        else:
+            totals[label] = [box_sum, n]
+
+
+def _crate_labels(crates, classes):
+    """
+    one array of labels for each crate with an image and particles
+    """
+    particles = [[block for block in crate if isinstance(block, Particles)] for crate in crates]
+    sizes = [sum(len(p.positions.data) for p in volume) for volume in particles]
+    if classes is None:
+        return [np.zeros(size, dtype=int) for size in sizes]
+    if isinstance(classes, str):
+        return [np.concatenate([p.properties[classes].to_numpy() for p in volume]) if volume else np.empty(0)
+                for volume in particles]
+    classes = np.asarray(classes)
+    if len(classes) != sum(sizes):
+        raise ValueError(f'got {len(classes)} class labels for {sum(sizes)} particles')
+    return np.split(classes, np.cumsum(sizes)[:-1])
+
+
+@instrument()
+def average_subtomograms(crates, box_size, classes=None, rotate=True, order=1, max_bytes=256 * 2 ** 20,
+                         max_workers=None):
+    """
+    Average the subvolumes around all particles in a list of DataCrates, optionally per class
+
+    Subvolumes are extracted as in subtomograms.extract_subtomograms, in spatially compact chunks of at most
+    max_bytes including the region of the volume they read (see subtomograms.spatial_chunks), and added
+    to running sums straight away, so the subvolumes of all particles are never held in memory at once.
+    Chunks are sharded across max_workers processes which share the volume of each DataCrate in turn,
+    their partial sums are reduced at the end
+
+    Parameters
+    ----------
+    crates : list of DataCrate objects, each with an ImageBlock and Particles with positions in voxels
+    box_size : int or tuple, size of the average (zyx)
+    classes : None to average all particles, the name of a property holding class labels (e.g. 'class' from
+              classify) or a sequence of labels for all particles in the order of the crates
+    rotate : bool, rotate subvolumes into the reference frame of each particle before averaging
+    order : int, order of the spline interpolation, 1 for trilinear
+    max_bytes : int, approximate memory budget of a chunk, including the region of the volume it reads
+    max_workers : int, number of worker processes, defaults to the number of cpus, 1 processes chunks in this process
+
+    Returns ImageBlock of the average if classes is None, otherwise dict of {label: ImageBlock}
+            the number of averaged particles is in the 'n_particles' column of the one row DataFrame in
+            ImageBlock.properties
+            raises ValueError if classes is None and no crate has particles to average
+    -------
+
+    """
+    box_shape = tuple(int(size) for size in np.broadcast_to(box_size, 3))
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    totals = {}
+    pixel_size = None
+    executor = ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    try:
+        for crate, labels in zip(crates, _crate_labels(crates, classes)):
+            images = [block for block in crate if isinstance(block, ImageBlock)]
+            particles = [block for block in crate if isinstance(block, Particles)]
+            if not images or not particles:
+                continue
+            image = images[0]
+            pixel_size = pixel_size or image.pixel_size
+            positions = np.concatenate([p.positions.in_image(image) for p in particles]).astype(float)
+            orientations = np.concatenate([p.orientations.data for p in particles]).astype(float) if rotate else None
+            chunks = spatial_chunks(positions, box_shape, max_bytes, rotate=rotate, order=order)
+            count('average_chunks', len(chunks))
+
+            def chunk_args(indices):
+                return (positions[indices], None if orientations is None else orientations[indices],
+                        labels[indices], box_shape, order)
+
+            if executor is None:
+                data = image.data
+                for indices in chunks:
+                    _accumulate(totals, _sum_chunk(data, *chunk_args(indices)))
+            else:
+                # one volume is shared at a time, its chunks are spread over all workers
+                with share_block(image) as shared:
+                    futures = [executor.submit(_sum_chunk, shared.spec, *chunk_args(indices)) for indices in chunks]
+                    for future in futures:
+                        _accumulate(totals, future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    averages = {label: ImageBlock((box_sum / n).astype(np.float32), ndim_spatial=3, pixel_size=pixel_size,
+                                  properties=pd.DataFrame({'n_particles': [n]}))
+                for label, (box_sum, n) in sorted(totals.items())}
+    if classes is None:
+        if 0 not in averages:
+            raise ValueError('no particles to average, crates need both an ImageBlock and Particles')
+        return averages[0]
+    return averages
@@ -2,29 +2,58 @@
 Analysis functions that operate on collections of data object
 """
 
+from functools import partial
+
 import numpy as np
 from scipy.spatial import cKDTree
 from scipy.ndimage import convolve1d
 from scipy.cluster.vq import kmeans2
-from scipy.signal.windows import gaussian
 
-from peepingtom.components.data import Particles
+from peepingtom.base import Particles
+from peepingtom.analysis.executor import map_blocks, store_result
+from peepingtom.utils.instrumentation import instrument
+
+
+def _gaussian_window(m, std):
+    # same as scipy.signal.windows.gaussian, without importing scipy.signal (and scipy.stats) at import time
+    n = np.arange(m) - (m - 1) / 2
+    return np.exp(-0.5 * (n / std) ** 2)
+
 
-def classify(data_blocks, max_r=50, n_shells=100, n_classes=5, convolve=True, cv_window=20, std=5, rerun=False):
+def _shell_counts(particles, max_r, n_shells):
+    """
+    number of neighbours of each particle in each of n_shells shells of equal thickness up to max_r
+    distances are measured in transformed coordinates (see PointBlock.transformed)
+    """
     shell_thickness = max_r / n_shells
-    binned = []
-    particles = [p for block in data_blocks for p in block if isinstance(p, Particles)]
-    for part in particles:
-        tree = cKDTree(part.coords)
-        adj_matrix = tree.sparse_distance_matrix(tree, max_r).toarray()
-        shells = [np.sum((adj_matrix > i * shell_thickness) & (adj_matrix <= (i + 1) * shell_thickness), axis=1)
-                for i in range(n_shells)]
-        binned.append(np.stack(shells, axis=1).astype(float))
+    tree = cKDTree(particles.positions.transformed)
+    adj_matrix = tree.sparse_distance_matrix(tree, max_r).toarray()
+    shells = [np.sum((adj_matrix > i * shell_thickness) & (adj_matrix <= (i + 1) * shell_thickness), axis=1)
+              for i in range(n_shells)]
+    return np.stack(shells, axis=1).astype(float)
+
+
+@instrument()
+def classify(data_blocks, max_r=50, n_shells=100, n_classes=5, convolve=True, cv_window=20, std=5, rerun=False,
+             max_workers=1, seed=None):
+    """
+    classify particles by the radial distribution of their neighbours within each volume
+    neighbours are counted serially by default, max_workers > 1 (or None for all cpus) counts them for each
+    volume on a process pool (see executor.map_blocks)
+    seed is passed to kmeans2 for reproducible classes
+    classes are stored in the 'class' property of each Particles block and returned
+    """
+    binned = map_blocks(partial(_shell_counts, max_r=max_r, n_shells=n_shells), data_blocks,
+                        max_workers=max_workers)
     binned = np.concatenate(binned)
     if convolve:
-        binned = convolve1d(binned, gaussian(n_shells//5, std))
-    centroids, classes = kmeans2(binned, n_classes, iter=100, minit='points')
+        binned = convolve1d(binned, _gaussian_window(n_shells//5, std))
+    centroids, classes = kmeans2(binned, n_classes, iter=100, minit='points', seed=seed)
 
-    # TODO: slice classes and put them in properties!
+    # slice classes back into the properties of each volume
+    particles = [p for block in data_blocks for p in block if isinstance(p, Particles)]
+    offsets = np.cumsum([0] + [len(p.positions.data) for p in particles])
+    for part, start, stop in zip(particles, offsets[:-1], offsets[1:]):
+        store_result(part, classes[start:stop], property_name='class')
 
     return classes
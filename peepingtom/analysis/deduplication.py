@@ -0,0 +1,144 @@
+"""
+Removal of duplicate particles closer than a distance threshold
+"""
+from functools import partial
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from peepingtom.base import Particles, PointBlock
+from peepingtom.analysis.executor import map_blocks
+from peepingtom.utils.instrumentation import instrument, count
+
+
+def unique_indices(positions, min_distance, scores=None, method='greedy'):
+    """
+    Indices of the points to keep such that duplicates closer than min_distance are removed
+
+    Close pairs are found with a KD-tree as a sparse list of pairs, so the cost grows with the number of close
+    pairs rather than the square of the number of points
+
+    Parameters
+    ----------
+    positions : (n, m) array of points
+    min_distance : float, points closer than this (inclusive) are duplicates
+    scores : (n,) array, higher scoring points are kept, None to prefer points in their original order
+    method : 'greedy' to keep points in order of score and remove their close neighbours, points which are
+             only close to removed points are kept
+             'connected' to keep only the highest scoring point of each cluster of points connected by close pairs
+
+    Returns sorted (k,) array of indices of the points to keep
+    -------
+
+    """
+    if method not in ('greedy', 'connected'):
+        raise ValueError(f"method must be 'greedy' or 'connected', not {method}")
+    positions = np.asarray(positions)
+    n = len(positions)
+    if n < 2 or min_distance <= 0:
+        return np.arange(n)
+    # rank points by descending score, ties keep their original order
+    order = np.arange(n) if scores is None else np.argsort(-np.asarray(scores), kind='stable')
+    rank = np.empty(n, dtype=np.intp)
+    rank[order] = np.arange(n)
+
+    pairs = cKDTree(positions).query_pairs(min_distance, output_type='ndarray')
+    count('duplicate_pairs', len(pairs))
+    if len(pairs) == 0:
+        return np.arange(n)
+
+    if method == 'connected':
+        graph = coo_matrix((np.ones(len(pairs), dtype=bool), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+        _, labels = connected_components(graph, directed=False)
+        # first point of each cluster in rank order
+        _, best = np.unique(labels[order], return_index=True)
+        return np.sort(order[best])
+
+    # greedy, orient pairs from higher to lower ranked point and walk points involved in pairs by rank
+    ranked = rank[pairs]
+    ranked.sort(axis=1)
+    ranked = ranked[np.lexsort((ranked[:, 1], ranked[:, 0]))]
+    starts = np.searchsorted(ranked[:, 0], np.arange(n + 1))
+    keep = np.ones(n, dtype=bool)
+    for r in np.unique(ranked[:, 0]):
+        if keep[r]:
+            keep[ranked[starts[r]:starts[r + 1], 1]] = False
+    return np.sort(order[keep])
+
+
+def _scores(block, score):
+    # scores given by name are properties of Particles, PointBlocks have none
+    if not isinstance(score, str):
+        return score
+    if not isinstance(block, Particles) or block.properties is None or score not in block.properties.columns:
+        return None
+    return block.properties[score].to_numpy()
+
+
+def _subset(block, indices):
+    points = block.positions if isinstance(block, Particles) else block
+    subset = type(points)(points.data[indices], dtype=points.data.dtype, pixel_size=points.pixel_size,
+                        transform=points.transform)
+    if isinstance(block, Particles):
+        properties = None if block.properties is None else block.properties.iloc[indices].reset_index(drop=True)
+        return Particles(subset, block.orientations.data[indices], properties=properties, dtype=points.data.dtype)
+    return subset
+
+
+def _unique_block_indices(block, min_distance, score, method):
+    # distances are measured in transformed coordinates (e.g. pixels rather than normalised coordinates)
+    positions = block.positions.transformed if isinstance(block, Particles) else block.transformed
+    return unique_indices(positions, min_distance, scores=_scores(block, score), method=method)
+
+
+@instrument()
+def deduplicate(block, min_distance, score='score', method='greedy'):
+    """
+    Remove particles or points closer than min_distance, keeping the highest scoring of each duplicate
+
+    Parameters
+    ----------
+    block : Particles or PointBlock
+    min_distance : float, points closer than this (inclusive) are duplicates, in the coordinates given by the
+                   transform attached to the positions (see PointBlock.transformed)
+    score : name of a property of Particles holding scores, (n,) array of scores or None to prefer points in
+            their original order, a missing property is treated as None
+    method : 'greedy' or 'connected', see unique_indices
+
+    Returns Particles or PointBlock with the kept particles in their original order
+    -------
+
+    """
+    if not isinstance(block, (Particles, PointBlock)):
+        raise TypeError(f'cannot deduplicate blocks of type {type(block)}')
+    return _subset(block, _unique_block_indices(block, min_distance, score, method))
+
+
+@instrument()
+def deduplicate_crates(crates, min_distance, score='score', method='greedy', max_workers=None):
+    """
+    Remove duplicates from every Particles in a list of DataCrates, in place, one volume per process
+
+    Parameters
+    ----------
+    crates : list of DataCrate objects
+    min_distance : float, particles closer than this (inclusive) are duplicates
+    score : name of a property holding scores or None to prefer particles in their original order
+    method : 'greedy' or 'connected', see unique_indices
+    max_workers : int, number of worker processes (see executor.map_blocks)
+
+    Returns list of arrays of the kept indices of each Particles, in order
+    -------
+
+    """
+    find = partial(_unique_block_indices, min_distance=min_distance, score=score, method=method)
+    kept = map_blocks(find, crates, block_type=Particles, max_workers=max_workers)
+    # replace blocks in the same order map_blocks visited them
+    kept_iter = iter(kept)
+    for crate in crates:
+        for idx, block in enumerate(crate):
+            if isinstance(block, Particles):
+                crate[idx] = _subset(block, next(kept_iter))
+    return kept
@@ -0,0 +1,86 @@
+"""
+Parallel execution of per-volume analysis functions over collections of DataCrates
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from peepingtom.base import Particles, ImageBlock, share_block, attach_block
+from peepingtom.utils.instrumentation import instrument
+
+
+def _run_shared(func, spec):
+    return func(attach_block(spec))
+
+
+def store_result(block, result, property_name=None):
+    """
+    Reduce a per-block result into the properties of the block
+
+    DataFrames and dicts of per-particle values are added column by column, other per-particle sequences
+    are added as property_name, anything else is left alone
+    """
+    if not isinstance(block, Particles):
+        return
+    n = len(block.positions.data)
+    if isinstance(result, pd.DataFrame):
+        columns = {name: result[name].to_numpy() for name in result.columns}
+    elif isinstance(result, dict):
+        columns = result
+    elif property_name is not None and np.ndim(result) > 0 and len(result) == n:
+        columns = {property_name: result}
+    else:
+        return
+    if block.properties is None:
+        block.properties = pd.DataFrame(index=range(n))
+    for name, values in columns.items():
+        if len(values) != n:
+            raise ValueError(f'result {name} has {len(values)} values for {n} particles')
+        block.properties[name] = np.asarray(values)
+
+
+@instrument()
+def map_blocks(func, crates, block_type=Particles, max_workers=None, property_name=None):
+    """
+    Apply func to every block of block_type in a list of DataCrates, one block per task on a process pool
+
+    The arrays of each block are shared with the workers through shared memory instead of being pickled
+    (see base.sharing), so func receives a block around read-only arrays. Results are reduced into the
+    properties of Particles blocks: DataFrames and dicts of per-particle values column by column,
+    other per-particle sequences under property_name
+
+    Parameters
+    ----------
+    func : picklable callable func(block) -> result, e.g. a module level function or a functools.partial of one
+    crates : list of DataCrate objects
+    block_type : type of the blocks to process, Particles or ImageBlock
+    max_workers : int, number of worker processes, defaults to the number of cpus,
+                  1 runs func serially in this process on the blocks themselves
+    property_name : str, name of the property in which per-particle sequences are stored
+
+    Returns list of results, one per block in order
+    -------
+
+    """
+    blocks = [block for crate in crates for block in crate if isinstance(block, block_type)]
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(blocks))
+
+    if max_workers <= 1:
+        results = [func(block) for block in blocks]
+    else:
+        shared = [share_block(block) for block in blocks]
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_run_shared, func, block.spec) for block in shared]
+                results = [future.result() for future in futures]
+        finally:
+            for block in shared:
+                block.release()
+
+    for block, result in zip(blocks, results):
+        store_result(block, result, property_name)
+    return results
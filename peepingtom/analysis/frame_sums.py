@@ -0,0 +1,50 @@
+"""
+Frame sums of many multi-frame micrographs, one movie per process
+"""
+from functools import partial
+
+from peepingtom.base import MultiFrameBlock
+from peepingtom.base.multiframe import stream_frame_sum, get_frame_sum_cache
+from peepingtom.analysis.executor import map_blocks
+from peepingtom.utils.instrumentation import instrument, count
+
+
+def _sum_block(block, frames, average, max_bytes):
+    return stream_frame_sum(block.data, frames, average, max_bytes)
+
+
+@instrument()
+def sum_movies(movies, frames=None, average=False, max_bytes=64 * 2 ** 20, max_workers=None):
+    """
+    Sum or average frames of many movies in parallel, e.g. for quick-look images for quality control
+
+    Each movie is summed in streaming chunks (see multiframe.stream_frame_sum) on one of max_workers processes.
+    Memory-mapped movies are shared with the workers by reference to their files, so no movie is copied or
+    read completely. Sums are stored in the frame sum cache and movies which already have a cached sum are
+    not summed again
+
+    Parameters
+    ----------
+    movies : list of MultiFrameBlock objects or of DataCrates containing them
+    frames : None for all frames, slice, int or sequence of frame indices
+    average : bool, return the mean instead of the sum of the frames
+    max_bytes : int, approximate size of the frames read at a time by each worker
+    max_workers : int, number of worker processes (see executor.map_blocks)
+
+    Returns list of (y, x) float32 ndarrays, one per movie in order
+    -------
+
+    """
+    blocks = [block for item in movies for block in (item if isinstance(item, list) else [item])
+              if isinstance(block, MultiFrameBlock)]
+    cache = get_frame_sum_cache()
+    sums = {id(block): cache.get(block.sum_key(frames, average)) for block in blocks}
+    pending = [block for block in blocks if sums[id(block)] is None]
+    count('movie_sums_cached', len(blocks) - len(pending))
+
+    func = partial(_sum_block, frames=frames, average=average, max_bytes=max_bytes)
+    results = map_blocks(func, [[block] for block in pending], block_type=MultiFrameBlock, max_workers=max_workers)
+    for block, result in zip(pending, results):
+        block.cache_sum(result, frames, average)
+        sums[id(block)] = result
+    return [sums[id(block)] for block in blocks]
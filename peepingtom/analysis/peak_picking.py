@@ -0,0 +1,110 @@
+"""
+Extraction of particles from peaks in cross-correlation volumes
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from scipy.ndimage import maximum_filter
+
+from peepingtom.base import Particles, ImageBlock, share_block, attach_block
+from peepingtom.analysis.deduplication import unique_indices
+from peepingtom.utils.helpers.array_helper import iter_chunks
+from peepingtom.utils.instrumentation import instrument, count
+
+
+def _shareable(block):
+    """
+    lazy images of files are memory-mapped, so workers read chunks from the file instead of a copy of the volume
+    """
+    if block.is_loaded or block.source is None:
+        return block
+    from peepingtom._io.read import mmap_image
+    return ImageBlock(mmap_image(block.source), ndim_spatial=block.ndim_spatial, pixel_size=block.pixel_size,
+                      image_type=block.image_type)
+
+
+def _chunk_peaks(image, core, padded, min_distance, threshold):
+    """
+    local maxima in the core region of a chunk of an image (zyx), using the halo in padded for context
+
+    Returns (k, ndim) array of peak indices in the whole image and (k,) array of their values
+    -------
+
+    """
+    if not isinstance(image, np.ndarray):
+        # shared block spec, attached in worker processes
+        image = attach_block(image).data
+    region = np.asarray(image[padded])
+    # no window reaches beyond the halo for voxels in the core, so results match a whole-volume filter
+    is_peak = region == maximum_filter(region, size=2 * min_distance + 1, mode='nearest')
+    if threshold is not None:
+        is_peak &= region >= threshold
+    # only keep peaks in the core so peaks in overlapping halos are found once
+    inner = tuple(slice(c.start - p.start, c.stop - p.start) for c, p in zip(core, padded))
+    indices = np.argwhere(is_peak[inner])
+    scores = region[inner][tuple(indices.T)]
+    offset = np.array([c.start for c in core])
+    return indices + offset, scores
+
+
+@instrument()
+def pick_peaks(image, min_distance=1, threshold=None, n_peaks=None, chunk_shape=128, max_workers=None):
+    """
+    Find peaks in a cross-correlation volume and return them as Particles
+
+    The volume is processed in chunks of chunk_shape with a halo of min_distance voxels, so memory use depends
+    on the chunk size rather than the volume size and memory-mapped volumes are read one chunk at a time.
+    Chunks are processed on max_workers processes. Memory-mapped volumes and lazy volumes read from files are
+    memory-mapped by the workers, other volumes are copied once into shared memory (see base.sharing), so
+    peak picking of an in-memory volume on several processes temporarily holds a second copy of it
+
+    Parameters
+    ----------
+    image : ImageBlock (e.g. of ImageType.cross_correlation_volume) or ndarray with zyx axes
+    min_distance : int, minimum distance between peaks in voxels
+    threshold : float, minimum score of a peak, None for no threshold
+    n_peaks : int, maximum number of peaks to return, the highest scoring peaks are kept
+    chunk_shape : int or tuple, shape of the chunks in which the volume is processed
+    max_workers : int, number of worker processes, defaults to the number of cpus, 1 processes chunks in
+                  this process without copying the volume
+
+    Returns Particles at the peaks with positions in xyz order, identity orientations and the peak value
+            in the 'score' property, sorted by descending score
+    -------
+
+    """
+    block = image if isinstance(image, ImageBlock) else ImageBlock(image, ndim_spatial=np.ndim(image))
+    min_distance = int(np.ceil(min_distance))
+    chunks = list(iter_chunks(block.shape, chunk_shape, halo=min_distance))
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(chunks))
+
+    if max_workers <= 1:
+        find = partial(_chunk_peaks, block.data, min_distance=min_distance, threshold=threshold)
+        results = [find(core, padded) for core, padded in chunks]
+    else:
+        with share_block(_shareable(block)) as shared, ProcessPoolExecutor(max_workers=max_workers) as executor:
+            find = partial(_chunk_peaks, shared.spec, min_distance=min_distance, threshold=threshold)
+            futures = [executor.submit(find, core, padded) for core, padded in chunks]
+            results = [future.result() for future in futures]
+    count('cc_chunks_processed', len(chunks))
+
+    ndim = len(block.shape)
+    positions = np.concatenate([peaks for peaks, _ in results]) if results else np.empty((0, ndim))
+    scores = np.concatenate([scores for _, scores in results]) if results else np.empty(0)
+    # neighbourhood maxima can only be within min_distance of each other on plateaus or across chunk edges,
+    # keep the highest scoring of those
+    keep = unique_indices(positions, min_distance, scores=scores, method='greedy')
+    order = keep[np.argsort(-scores[keep], kind='stable')]
+    positions, scores = positions[order], scores[order]
+    if n_peaks is not None:
+        positions, scores = positions[:n_peaks], scores[:n_peaks]
+
+    # indices are zyx, particles are xyz
+    positions = positions[:, ::-1]
+    orientations = np.tile(np.eye(ndim), (len(positions), 1, 1))
+    return Particles(positions, orientations, properties=pd.DataFrame({'score': scores}))
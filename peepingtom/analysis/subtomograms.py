@@ -0,0 +1,192 @@
+"""
+Batched extraction of oriented subvolumes around particles
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.ndimage import map_coordinates
+
+from peepingtom.base import ImageBlock, share_block, attach_block
+from peepingtom.utils.shared_memory import SharedArray
+from peepingtom.utils.instrumentation import instrument, count
+
+
+def _box_grid(box_shape):
+    """
+    (m, 3) xyz offsets of the voxels of a box (zyx) from its center voxel at box_shape // 2, in C order
+    """
+    axes = [np.arange(size) - size // 2 for size in box_shape]
+    grid_zyx = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(box_shape))
+    return grid_zyx[:, ::-1].astype(float)
+
+
+def spatial_chunks(positions, box_shape, max_bytes, rotate=True, order=1):
+    """
+    Split particles into spatially compact chunks whose memory use fits in max_bytes
+
+    The memory of a chunk is its sampling coordinates plus the float32 region of the volume covering its boxes,
+    chunks are split in half along their longest axis (as in a k-d tree) until they fit, so a chunk never spans
+    a whole slab of the volume. A single particle is never split
+
+    Parameters
+    ----------
+    positions : (n, 3) array of xyz positions in voxels
+    box_shape : tuple, shape of the boxes (zyx)
+    max_bytes : int, approximate memory budget of a chunk
+    rotate : bool, boxes are rotated, so they can reach as far as the corners of the box in any direction
+    order : int, order of the interpolation, which reads order extra voxels around the boxes
+
+    Returns list of arrays of particle indices, in spatial order
+    -------
+
+    """
+    positions = np.asarray(positions, dtype=float)
+    if len(positions) == 0:
+        return []
+    # sampling coordinates in float64, their zyx copy and the float32 result per particle
+    bytes_per_particle = int(np.prod(box_shape)) * (2 * 3 * 8 + 4)
+    half = np.array(box_shape[::-1], dtype=float) / 2
+    reach = (np.full(3, np.linalg.norm(half)) if rotate else half) + order + 1
+
+    def chunk_bytes(points):
+        region = np.prod(np.ptp(points, axis=0) + 2 * reach) * 4
+        return len(points) * bytes_per_particle + region
+
+    chunks = []
+    pending = [np.arange(len(positions))]
+    while pending:
+        indices = pending.pop()
+        points = positions[indices]
+        if len(indices) == 1 or chunk_bytes(points) <= max_bytes:
+            chunks.append(indices)
+            continue
+        axis = np.argmax(np.ptp(points, axis=0))
+        by_axis = indices[np.argsort(points[:, axis], kind='stable')]
+        middle = len(by_axis) // 2
+        # the lower half is popped first, so chunks come out in spatial order
+        pending.extend([by_axis[middle:], by_axis[:middle]])
+    return chunks
+
+
+def _sample_boxes(image, positions, orientations, grid, box_shape, order, cval):
+    """
+    sample boxes at positions (xyz), rotated by orientations, from the smallest region of image (zyx) containing them
+    """
+    # xyz sampling coordinates of every voxel of every box, reversed to zyx to index the image
+    offsets = grid if orientations is None else grid @ orientations.transpose(0, 2, 1)
+    coords = positions[:, np.newaxis, :] + offsets
+    coords = coords[..., ::-1].reshape(-1, 3)
+
+    # only the bounding region of this chunk is read, from memory-mapped volumes this reads a fraction of the file
+    shape = np.array(image.shape)
+    lo = np.clip(np.floor(coords.min(axis=0)).astype(int) - order, 0, shape)
+    hi = np.clip(np.ceil(coords.max(axis=0)).astype(int) + order + 1, 0, shape)
+    boxes_shape = (len(positions),) + tuple(box_shape)
+    if np.any(hi <= lo):
+        return np.full(boxes_shape, cval, dtype=np.float32)
+    region = np.asarray(image[tuple(slice(a, b) for a, b in zip(lo, hi))], dtype=np.float32)
+    coords -= lo
+    values = map_coordinates(region, coords.T, order=order, mode='constant', cval=cval, prefilter=order > 1)
+    count('subtomogram_voxels_sampled', values.size)
+    return values.reshape(boxes_shape)
+
+
+def sample_subtomograms(image, positions, orientations, box_shape, order=1, cval=0):
+    """
+    Sample boxes around positions from a volume, reading only the region of the volume which contains them
+
+    This is the sampling step of extract_subtomograms for a single chunk of particles, for use by functions
+    which process chunks themselves (e.g. averaging.average_subtomograms), see spatial_chunks to split
+    particles into chunks which fit in memory
+
+    Parameters
+    ----------
+    image : (z, y, x) array-like, e.g. a memory-mapped volume
+    positions : (n, 3) array of xyz positions in voxels of the image
+    orientations : (n, 3, 3) array of rotation matrices, None for boxes aligned with the volume
+    box_shape : tuple, shape of the boxes (zyx)
+    order : int, order of the spline interpolation, 1 for trilinear
+    cval : float, value of voxels outside the volume
+
+    Returns (n, z, y, x) float32 ndarray
+    -------
+
+    """
+    box_shape = tuple(box_shape)
+    return _sample_boxes(image, positions, orientations, _box_grid(box_shape), box_shape, order, cval)
+
+
+def _extract_chunk(image_spec, output_spec, indices, positions, orientations, box_shape, order, cval):
+    """
+    worker task, attaches to the shared image and output and fills the boxes of one chunk of particles
+    """
+    image = attach_block(image_spec).data
+    output = SharedArray.attach(output_spec, writeable=True)
+    output[indices] = sample_subtomograms(image, positions, orientations, box_shape, order, cval)
+    output.flush()
+
+
+@instrument()
+def extract_subtomograms(image, particles, box_size, rotate=True, order=1, cval=0, max_bytes=256 * 2 ** 20,
+                         max_workers=None):
+    """
+    Extract subvolumes around particles from a volume, rotated into the reference frame of each particle
+
+    Voxel v of the subvolume of a particle at position p with rotation matrix R is sampled at p + Rv by
+    interpolation, with v relative to the center voxel at box_size // 2. Particles are processed in chunks
+    of nearby particles such that the sampling coordinates of a chunk and the region of the volume it covers fit
+    in max_bytes (see spatial_chunks), and only that region is read, so memory-mapped volumes are never read
+    completely.
+    Chunks are processed on max_workers processes which share the volume and the output through shared memory
+
+    Parameters
+    ----------
+    image : ImageBlock or ndarray, 3d volume with zyx axes
+    particles : Particles with positions (xyz) in voxels of the image, converted with PointBlock.in_image
+    box_size : int or tuple, size of the subvolumes (zyx)
+    rotate : bool, rotate boxes by the orientations of the particles, False for boxes aligned with the volume
+    order : int, order of the spline interpolation, 1 for trilinear
+    cval : float, value of voxels outside the volume
+    max_bytes : int, approximate memory budget of a chunk, including the region of the volume it reads
+    max_workers : int, number of worker processes, defaults to the number of cpus, 1 processes chunks in this process
+
+    Returns ImageBlock with a (n, z, y, x) float32 stack of subvolumes in the order of the particles
+    -------
+
+    """
+    block = image if isinstance(image, ImageBlock) else ImageBlock(image, ndim_spatial=3)
+    box_shape = tuple(int(size) for size in np.broadcast_to(box_size, 3))
+    positions = particles.positions.in_image(block).astype(float)
+    orientations = particles.orientations.data.astype(float) if rotate else None
+    n = len(positions)
+    grid = _box_grid(box_shape)
+
+    # chunks are bounded in the sampling coordinates and the region of the volume they read
+    chunks = spatial_chunks(positions, box_shape, max_bytes, rotate=rotate, order=order)
+    count('subtomogram_chunks', len(chunks))
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(chunks))
+
+    if max_workers <= 1:
+        output = np.empty((n,) + box_shape, dtype=np.float32)
+        data = block.data
+        for indices in chunks:
+            output[indices] = _sample_boxes(data, positions[indices],
+                                            None if orientations is None else orientations[indices],
+                                            grid, box_shape, order, cval)
+    else:
+        shared_output = SharedArray.empty((n,) + box_shape, np.float32)
+        with share_block(block) as shared, shared_output, ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_extract_chunk, shared.spec, shared_output.spec, indices, positions[indices],
+                                       None if orientations is None else orientations[indices],
+                                       box_shape, order, cval)
+                       for indices in chunks]
+            for future in futures:
+                future.result()
+            # the mapping stays valid after the shared file is removed
+            output = np.asarray(SharedArray.attach(shared_output.spec, writeable=True))
+
+    return ImageBlock(output, ndim_spatial=3, pixel_size=block.pixel_size)
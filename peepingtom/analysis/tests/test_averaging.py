@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_allclose
+
+from ...base import DataCrate, Particles, ImageBlock
+from ..averaging import average_subtomograms
+
+
+def _crate(volume, positions, labels):
+    n = len(positions)
+    particles = Particles(positions, np.tile(np.eye(3), (n, 1, 1)), properties=pd.DataFrame({'class': labels}))
+    return DataCrate([ImageBlock(volume, ndim_spatial=3, pixel_size=3), particles])
+
+
+def test_average_subtomograms():
+    rng = np.random.default_rng(0)
+    volumes = [rng.normal(size=(20, 20, 20)).astype(np.float32) for _ in range(2)]
+    positions = np.array([[5., 5., 5.], [14., 14., 14.], [5., 14., 5.]])
+    labels = np.array([0, 1, 1])
+    crates = [_crate(volume, positions, labels) for volume in volumes]
+
+    def crop(volume, position):
+        x, y, z = position.astype(int)
+        return volume[z - 2:z + 2, y - 2:y + 2, x - 2:x + 2]
+
+    average = average_subtomograms(crates, 4, max_workers=1)
+    expected = np.mean([crop(v, p) for v in volumes for p in positions], axis=0)
+    assert_allclose(average.data, expected, rtol=1e-5)
+    assert average.properties['n_particles'].tolist() == [6]
+    assert average.pixel_size == 3
+
+    per_class = average_subtomograms(crates, 4, classes='class', max_bytes=1, max_workers=2)
+    assert sorted(per_class) == [0, 1]
+    expected = np.mean([crop(v, p) for v in volumes for p in positions[1:]], axis=0)
+    assert_allclose(per_class[1].data, expected, rtol=1e-5)
+    assert per_class[1].properties['n_particles'].tolist() == [4]
+
+    by_labels = average_subtomograms(crates, 4, classes=[0, 1, 1, 1, 1, 1], max_workers=1)
+    assert by_labels[0].properties['n_particles'].tolist() == [1]
+
+
+def test_average_no_particles():
+    volume = np.zeros((10, 10, 10), dtype=np.float32)
+    crates = [_crate(volume, np.empty((0, 3)), []), DataCrate([ImageBlock(volume, ndim_spatial=3)])]
+    with pytest.raises(ValueError):
+        average_subtomograms(crates, 4, max_workers=1)
+    assert average_subtomograms(crates, 4, classes='class', max_workers=1) == {}
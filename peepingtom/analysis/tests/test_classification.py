@@ -0,0 +1,34 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ...base import DataCrate, Particles, Scale
+from ..classification import classify, _shell_counts
+
+
+def test_shell_counts_transformed():
+    # neighbours are counted in transformed coordinates, 0.01 normalised units are 5 pixels along x
+    positions = np.array([[0, 0, 0], [0.01, 0, 0], [0.5, 0, 0]])
+    particles = Particles(positions, np.tile(np.eye(3), (3, 1, 1)))
+    particles.positions.transform = Scale([500, 500, 200])
+    counts = _shell_counts(particles, max_r=10, n_shells=2)
+    assert_array_equal(counts, [[1, 0], [1, 0], [0, 0]])
+
+
+def test_classify():
+    rng = np.random.default_rng(0)
+    # a tight cluster, whose particles have many close neighbours, and isolated particles far apart
+    cluster = rng.normal(500, 3, size=(30, 3))
+    isolated = np.stack(np.meshgrid([0, 200], [0, 200], [0, 200, 400]), axis=-1).reshape(-1, 3)
+    crates = []
+    for positions in (cluster, isolated):
+        crates.append(DataCrate([Particles(positions, np.tile(np.eye(3), (len(positions), 1, 1)))]))
+
+    classes = classify(crates, max_r=20, n_shells=20, n_classes=2, seed=0)
+    assert classes.shape == (42,)
+    cluster_classes = crates[0][0].properties['class'].to_numpy()
+    isolated_classes = crates[1][0].properties['class'].to_numpy()
+    assert_array_equal(np.concatenate([cluster_classes, isolated_classes]), classes)
+    # each group is one class, different from the other
+    assert len(set(cluster_classes)) == 1
+    assert len(set(isolated_classes)) == 1
+    assert cluster_classes[0] != isolated_classes[0]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+
+from ...base import DataCrate, Particles, PointBlock, Scale
+from ..deduplication import unique_indices, deduplicate, deduplicate_crates
+
+
+def _greedy_reference(positions, min_distance, scores):
+    # brute force greedy suppression
+    keep = []
+    for idx in np.argsort(-scores, kind='stable'):
+        if all(np.linalg.norm(positions[idx] - positions[other]) > min_distance for other in keep):
+            keep.append(idx)
+    return np.sort(keep)
+
+
+def test_unique_indices():
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(0, 50, (300, 3))
+    scores = rng.random(300)
+    assert_array_equal(unique_indices(positions, 4, scores), _greedy_reference(positions, 4, scores))
+
+    # chain a - b - c: greedy keeps a and c, connected components keep only the best of the cluster
+    chain = np.array([[0, 0, 0], [1.5, 0, 0], [3, 0, 0], [10, 0, 0]])
+    chain_scores = np.array([3, 2, 1, 0])
+    assert_array_equal(unique_indices(chain, 2, chain_scores), [0, 2, 3])
+    assert_array_equal(unique_indices(chain, 2, chain_scores, method='connected'), [0, 3])
+    assert_array_equal(unique_indices(chain, 2, chain_scores[::-1], method='connected'), [2, 3])
+    # without scores earlier points are preferred
+    assert_array_equal(unique_indices(chain, 2), [0, 2, 3])
+
+
+def _particles(positions, scores):
+    n = len(positions)
+    return Particles(positions, np.tile(np.eye(3), (n, 1, 1)), properties=pd.DataFrame({'score': scores}))
+
+
+def test_deduplicate():
+    positions = np.array([[0, 0, 0], [0.5, 0, 0], [5, 5, 5]])
+    particles = deduplicate(_particles(positions, [0.1, 0.9, 0.5]), 1)
+    assert_array_equal(particles.positions.data, positions[1:])
+    assert_array_equal(particles.properties['score'], [0.9, 0.5])
+
+    points = deduplicate(PointBlock(positions), 1)
+    assert_array_equal(points.data, positions[[0, 2]])
+
+
+def test_deduplicate_transformed():
+    # normalised coordinates, 50 to 400 pixels apart after an anisotropic scale to pixels
+    positions = np.array([[0.1, 0.1, 0.1], [0.2, 0.1, 0.1], [0.1, 0.1, 0.35], [0.1, 0.1, 0.351]])
+    particles = _particles(positions, [0.4, 0.3, 0.2, 0.1])
+    particles.positions.transform = Scale([500, 500, 200])
+    deduplicated = deduplicate(particles, 5)
+    # only the last point is within 5 pixels (0.2) of another
+    assert_array_equal(deduplicated.positions.data, positions[:3])
+    assert deduplicated.positions.transform is particles.positions.transform
+
+
+def test_deduplicate_crates():
+    rng = np.random.default_rng(1)
+    crates = []
+    for _ in range(3):
+        positions = rng.uniform(0, 30, (100, 3))
+        crates.append(DataCrate([_particles(positions, rng.random(100))]))
+    expected = [_greedy_reference(c[0].positions.data, 3, c[0].properties['score'].to_numpy()) for c in crates]
+    kept = deduplicate_crates(crates, 3, max_workers=2)
+    for crate, indices, reference in zip(crates, kept, expected):
+        assert_array_equal(indices, reference)
+        assert len(crate[0].positions.data) == len(reference)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+
+from ...base import DataCrate, Particles, ImageBlock
+from ..executor import map_blocks
+
+
+def _distance_to_origin(particles):
+    assert not particles.positions.data.flags.writeable
+    return np.linalg.norm(particles.positions.data, axis=1)
+
+
+def _neighbour_table(particles):
+    return pd.DataFrame({'x2': particles.positions.data[:, 0] * 2})
+
+
+def _image_sum(image):
+    return float(image.data.sum())
+
+
+def _crates(n_volumes=3, n=10):
+    crates = []
+    for idx in range(n_volumes):
+        positions = np.random.random((n, 3)) * (idx + 1)
+        image = ImageBlock(np.full((4, 4, 4), idx, dtype=np.float32), ndim_spatial=3)
+        crates.append(DataCrate([image, Particles(positions, np.tile(np.eye(3), (n, 1, 1)))]))
+    return crates
+
+
+def test_map_blocks():
+    crates = _crates()
+    results = map_blocks(_distance_to_origin, crates, max_workers=2, property_name='distance')
+    assert len(results) == 3
+    for crate, result in zip(crates, results):
+        particles = crate[1]
+        assert_array_equal(particles.properties['distance'], result)
+        assert_array_equal(result, np.linalg.norm(particles.positions.data, axis=1))
+
+    map_blocks(_neighbour_table, crates, max_workers=2)
+    assert_array_equal(crates[0][1].properties['x2'], crates[0][1].positions.data[:, 0] * 2)
+
+    sums = map_blocks(_image_sum, crates, block_type=ImageBlock, max_workers=2)
+    assert sums == [0, 64, 128]
+
+
+def test_map_blocks_serial():
+    crates = _crates(2)
+    results = map_blocks(_image_sum, crates, block_type=ImageBlock, max_workers=1)
+    assert results == [0, 64]
@@ -0,0 +1,26 @@
+import numpy as np
+import mrcfile
+from numpy.testing import assert_allclose
+
+from ..frame_sums import sum_movies
+from ...base import DataCrate
+from ..._io.read import read_movies
+
+
+def test_sum_movies(tmp_path):
+    stacks = [np.random.random((5, 6, 7)).astype(np.float32) for _ in range(3)]
+    paths = []
+    for i, stack in enumerate(stacks):
+        paths.append(str(tmp_path / f'movie_{i}.mrc'))
+        mrcfile.write(paths[-1], stack)
+
+    movies = read_movies(paths)
+    assert not any(movie.is_loaded for movie in movies)
+    sums = sum_movies(movies, frames=slice(1, 4), average=True, max_workers=2)
+    for movie_sum, stack in zip(sums, stacks):
+        assert_allclose(movie_sum, stack[1:4].mean(axis=0), rtol=1e-5)
+
+    # sums are cached, including for new blocks of the same files
+    movies = read_movies(paths)
+    assert sum_movies([DataCrate([movie]) for movie in movies], frames=slice(1, 4), average=True)[0] is sums[0]
+    assert not movies[0].is_loaded
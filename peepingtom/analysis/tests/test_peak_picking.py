@@ -0,0 +1,58 @@
+import mrcfile
+import numpy as np
+from numpy.testing import assert_array_equal
+from scipy.ndimage import gaussian_filter, maximum_filter
+
+from ...base import ImageBlock
+from ...utils.mode_enums import ImageType
+from ..peak_picking import pick_peaks, _shareable
+from ..._io.read import lazy_images
+
+
+def test_pick_peaks():
+    rng = np.random.default_rng(0)
+    volume = gaussian_filter(rng.normal(size=(40, 50, 60)), 2).astype(np.float32)
+    image = ImageBlock(volume, ndim_spatial=3, image_type=ImageType.cross_correlation_volume)
+
+    # whole-volume reference, zyx peak indices
+    is_peak = (volume == maximum_filter(volume, size=7, mode='nearest')) & (volume >= 0.05)
+    expected = np.argwhere(is_peak)
+    expected = expected[np.argsort(-volume[is_peak], kind='stable')]
+
+    serial = pick_peaks(image, min_distance=3, threshold=0.05, chunk_shape=16, max_workers=1)
+    assert_array_equal(serial.positions.data, expected[:, ::-1])
+    assert np.all(np.diff(serial.properties['score']) <= 0)
+    assert serial.properties['score'].min() >= 0.05
+
+    parallel = pick_peaks(image, min_distance=3, threshold=0.05, chunk_shape=(16, 20, 32), max_workers=2)
+    assert_array_equal(parallel.positions.data, serial.positions.data)
+
+    top = pick_peaks(volume, min_distance=3, n_peaks=5, max_workers=1)
+    assert_array_equal(top.positions.data, expected[:5, ::-1])
+
+
+def test_pick_peaks_plateau():
+    volume = np.zeros((20, 20, 20))
+    volume[5:8, 5:8, 5:8] = 1
+    volume[15, 15, 15] = 2
+    particles = pick_peaks(volume, min_distance=4, threshold=0.5, chunk_shape=6, max_workers=1)
+    assert_array_equal(particles.properties['score'], [2, 1])
+    assert_array_equal(particles.positions.data[0], [15, 15, 15])
+
+
+def test_pick_peaks_lazy(tmp_path):
+    rng = np.random.default_rng(1)
+    volume = gaussian_filter(rng.normal(size=(30, 30, 30)), 2).astype(np.float32)
+    path = str(tmp_path / 'cc.mrc')
+    mrcfile.write(path, volume)
+    image = lazy_images(path)[0]
+
+    # workers read the file through a memory map rather than a copy in shared memory
+    shareable = _shareable(image)
+    assert isinstance(shareable.data, np.memmap)
+    assert not image.is_loaded
+
+    parallel = pick_peaks(image, min_distance=3, chunk_shape=16, max_workers=2)
+    assert not image.is_loaded
+    serial = pick_peaks(volume, min_distance=3, chunk_shape=16, max_workers=1)
+    assert_array_equal(parallel.positions.data, serial.positions.data)
@@ -0,0 +1,69 @@
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+
+from ...base import Particles, ImageBlock
+from ..subtomograms import extract_subtomograms, sample_subtomograms, spatial_chunks
+
+
+def _rotation_z(degrees):
+    theta = np.deg2rad(degrees)
+    c, s = np.cos(theta), np.sin(theta)
+    return np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+
+
+def test_extract_subtomograms():
+    rng = np.random.default_rng(0)
+    volume = rng.normal(size=(30, 40, 50)).astype(np.float32)
+    positions = np.array([[10, 12, 8], [25, 20, 15], [40, 30, 20], [1, 1, 1]], dtype=float)
+    particles = Particles(positions, np.tile(np.eye(3), (4, 1, 1)))
+
+    boxes = extract_subtomograms(ImageBlock(volume, ndim_spatial=3, pixel_size=2), particles, 6, max_workers=1)
+    assert boxes.data.shape == (4, 6, 6, 6)
+    assert boxes.pixel_size == 2
+    # integer positions and identity orientations give exact crops, centered on box_size // 2
+    x, y, z = positions[0].astype(int)
+    assert_array_equal(boxes.data[0], volume[z - 3:z + 3, y - 3:y + 3, x - 3:x + 3])
+    # outside the volume
+    assert np.all(boxes.data[3][:2] == 0)
+
+    # small chunks on several processes
+    parallel = extract_subtomograms(volume, particles, 6, max_bytes=1, max_workers=2)
+    assert_array_equal(parallel.data, boxes.data)
+
+
+def test_extract_rotated_subtomograms():
+    volume = np.zeros((21, 21, 21), dtype=np.float32)
+    # a rod along x from the center
+    volume[10, 10, 10:15] = 1
+    rotation = _rotation_z(90)
+    particles = Particles(np.array([[10., 10., 10.]]), rotation[np.newaxis])
+    box = extract_subtomograms(volume, particles, 11, max_workers=1).data[0]
+    # rotating the sampling grid by 90 degrees around z maps the rod onto the -y axis of the box
+    assert_allclose(box[5, 5, 5], 1)
+    assert_allclose(box[5, 1:5, 5][::-1], 1, atol=1e-6)
+    assert_allclose(box[5, 5, 6:], 0, atol=1e-6)
+
+
+def test_spatial_chunks():
+    rng = np.random.default_rng(0)
+    # particles spread over a wide, thin volume, a z slab would cover the whole of x and y
+    positions = rng.uniform([0, 0, 0], [4000, 4000, 40], size=(500, 3))
+    box_shape = (16, 16, 16)
+    max_bytes = 8 * 2 ** 20
+    chunks = spatial_chunks(positions, box_shape, max_bytes)
+    assert sorted(np.concatenate(chunks).tolist()) == list(range(500))
+    reach = np.linalg.norm([8, 8, 8]) + 2
+    for indices in chunks:
+        region = np.prod(np.ptp(positions[indices], axis=0) + 2 * reach) * 4
+        assert len(indices) == 1 or region + len(indices) * 16 ** 3 * 52 <= max_bytes
+    assert spatial_chunks(np.empty((0, 3)), box_shape, max_bytes) == []
+
+
+def test_sample_subtomograms():
+    rng = np.random.default_rng(1)
+    volume = rng.normal(size=(20, 20, 20)).astype(np.float32)
+    positions = np.array([[5, 6, 7], [12, 10, 9.5]])
+    orientations = np.stack([_rotation_z(30), _rotation_z(-45)])
+    particles = Particles(positions, orientations)
+    expected = extract_subtomograms(volume, particles, 5, max_workers=1).data
+    assert_allclose(sample_subtomograms(volume, positions, orientations, (5, 5, 5)), expected)
@@ -1,3 +1,9 @@
 from .datacrate import DataCrate
 from .datablock import PointBlock, LineBlock, OrientationBlock, ImageBlock
 from .groupblock import Particles
+from .tiltseries import TiltSeriesBlock
+from .multiframe import MultiFrameBlock
+from .transforms import Transform, Affine, Identity, Scale, Shift, Binning, ComposedTransform
+from .stacking import ParticleStack
+from .sharing import SharedBlock, share_block, attach_block
+from .models import Vesicle, Filament, Surface
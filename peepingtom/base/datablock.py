@@ -1,8 +1,63 @@
+import threading
 from abc import ABC, abstractmethod
+from functools import lru_cache
 
 import numpy as np
 from eulerangles import euler2matrix
-from scipy.interpolate import splprep, splev
+
+from .transforms import Scale
+from ..utils.helpers.array_helper import as_float_array, sampled_statistics
+from ..utils.mode_enums import ImageType
+
+
+@lru_cache(maxsize=None)
+def _named_dimensions_to_spatial_index(dims: str, ndim_spatial: int):
+    """
+    Get the index along the spatial axis of the named dimension(s) 'x', 'y', 'z' or a combination thereof
+
+    Results are cached per dimension string and dimensionality
+
+    Parameters
+    ----------
+    dims : str 'x', 'y', 'z' or a combination thereof
+    ndim_spatial : int, number of spatial dimensions in the data
+
+    Returns int for a single dimension, slice for multiple dimensions evenly spaced along the spatial axis
+            or tuple of ints otherwise
+    -------
+
+    """
+    # sanitise input
+    dims = str(dims.strip().lower())
+
+    # dim to index for 3d or less
+    dim_to_index = {'x': 0,
+                    'y': 1,
+                    'z': 2}
+
+    indices = [dim_to_index[dim] for dim in dims]
+
+    # check and correct index for higher dimensionality
+    if ndim_spatial > 3:
+        indices = [-idx - 1 for idx in indices]
+
+    if len(indices) == 1:
+        return indices[0]
+
+    # use a slice where possible so that indexing returns a view
+    indices = [idx % ndim_spatial for idx in indices]
+    step = indices[1] - indices[0]
+    if step != 0 and all(b - a == step for a, b in zip(indices[:-1], indices[1:])):
+        stop = indices[-1] + step
+        return slice(indices[0], stop if stop >= 0 else None, step)
+
+    return tuple(indices)
+
+
+def _splev(*args, **kwargs):
+    # scipy.interpolate is slow to import and only needed for splines
+    from scipy.interpolate import splev
+    return splev(*args, **kwargs)
 
 
 class DataBlock(ABC):
@@ -48,15 +103,25 @@ class PointBlock(DataBlock):
     2d : (x, y)
     3d : (x. y, z)
     nd : (..., x, y, z)
+
+    data is stored as a floating point array of the given dtype, by default the dtype from
+    utils.helpers.array_helper.get_float_dtype, input which already matches is stored without copying
+
+    a Transform (see transforms) can be attached to map the stored coordinates to other coordinates, e.g. from
+    normalised coordinates to pixels, without rewriting the data. pixel_size is the size of a unit of the
+    transformed coordinates, which allows conversion to images of other pixel sizes (e.g. other binnings)
     """
 
-    def __init__(self, points, **kwargs):
+    def __init__(self, points, dtype=None, pixel_size=None, transform=None, **kwargs):
         super().__init__(**kwargs)
+        self.dtype = dtype
         self.data = points
+        self.pixel_size = pixel_size
+        self.transform = transform
 
     def _data_setter(self, points):
-        # cast as array
-        points = np.asarray(points)
+        # cast as array, without copying if the dtype already matches
+        points = as_float_array(points, dtype=self.dtype)
 
         # coerce 1d point to 2d
         if points.ndim == 1:
@@ -83,21 +148,7 @@ class PointBlock(DataBlock):
         -------
 
         """
-        # sanitise input
-        dim = str(dim.strip().lower())
-
-        # dim to index for 3d or less
-        dim_to_index = {'x': 0,
-                        'y': 1,
-                        'z': 2}
-
-        dim_idx = dim_to_index[dim]
-
-        # check and correct index for higher dimensionality
-        if self.ndim_spatial > 3:
-            dim_idx = -dim_idx - 1
-
-        return dim_idx
+        return _named_dimensions_to_spatial_index(dim, self.ndim_spatial)
 
     def _get_dim_at_spatial_index(self, idx: int):
         return self[:, idx]
@@ -107,6 +158,10 @@ class PointBlock(DataBlock):
         Get data for a named dimension or multiple named dimensions of the object
 
         as_array and as_tuple are only considered when retrieving multiple dimensions in one method call
+
+        Where possible the data is returned as a view rather than a copy: single dimensions, tuples of dimensions
+        and dimensions which are evenly spaced along m (e.g. 'xyz' or 'zyx') are views of the data,
+        other combinations are gathered into a new array in one indexing operation
         Parameters
         ----------
 
@@ -122,21 +177,15 @@ class PointBlock(DataBlock):
         if as_type not in ('array', 'tuple'):
             raise ValueError("Argument 'as_type' must be a string from 'array' or 'tuple'")
 
-        if len(dim) > 1:
-            # split dims up and get each separately
-            data = [self._get_named_dimension(_dim) for _dim in dim]
+        # index along spatial axis is cached per dimension string
+        dim_idx = _named_dimensions_to_spatial_index(dim, self.ndim_spatial)
 
-            # decide on output type and return array or tuple as requested, default to array
-            if as_type == 'array':
-                return np.column_stack(data)
-            elif as_type == 'tuple':
-                return tuple(data)
+        if len(dim) > 1 and as_type == 'tuple':
+            indices = range(self.ndim_spatial)[dim_idx] if isinstance(dim_idx, slice) else dim_idx
+            return tuple(self._get_dim_at_spatial_index(idx) for idx in indices)
 
-        else:
-            # get index of named dimension along spatial axis
-            dim_idx = self._named_dimension_to_spatial_index(dim)
-            # index into self to get data
-            return self._get_dim_at_spatial_index(dim_idx)
+        # index into self to get data
+        return self._get_dim_at_spatial_index(dim_idx)
 
     @property
     def x(self):
@@ -158,6 +207,67 @@ class PointBlock(DataBlock):
     def zyx(self):
         return self._get_named_dimension('zyx')
 
+    @property
+    def pixel_size(self):
+        return self._pixel_size
+
+    @pixel_size.setter
+    def pixel_size(self, value):
+        self._pixel_size = float(value) if value is not None else None
+
+    @property
+    def transformed(self):
+        """
+        Coordinates with the attached transform applied, the data itself if there is no transform
+        """
+        if self.transform is None:
+            return self.data
+        return self.transform(self.data)
+
+    def transform_to(self, pixel_size):
+        """
+        Transform from the stored coordinates to coordinates in pixels of size pixel_size
+
+        Parameters
+        ----------
+        pixel_size : float, target pixel size in the same units as the pixel_size of this PointBlock
+
+        Returns Transform, the attached transform followed by a scaling between pixel sizes
+        -------
+
+        """
+        if self.pixel_size is None:
+            raise ValueError('the pixel size of this PointBlock is unknown, set pixel_size first')
+        scale = Scale.between_pixel_sizes(self.pixel_size, pixel_size)
+        return scale if self.transform is None else self.transform.then(scale)
+
+    def in_pixel_size(self, pixel_size):
+        """
+        Coordinates in pixels of size pixel_size, calculated in one multiply-add from the stored data
+
+        Returns (n, m) ndarray
+        -------
+
+        """
+        if pixel_size == self.pixel_size:
+            return self.transformed
+        return self.transform_to(pixel_size)(self.data)
+
+    def in_image(self, image):
+        """
+        Coordinates in the pixels of an ImageBlock
+
+        coordinates are converted between pixel sizes if both pixel sizes are known,
+        otherwise the transformed coordinates are assumed to already be in pixels of the image
+
+        Returns (n, m) ndarray
+        -------
+
+        """
+        if self.pixel_size is None or image.pixel_size is None:
+            return self.transformed
+        return self.in_pixel_size(image.pixel_size)
+
     @property
     def center_of_mass(self):
         return np.mean(self.data, axis=0)
@@ -202,7 +312,7 @@ class LineBlock(PointBlock):
         Parameters
         ----------
         line : array-like objects of shape (n, m) representing n ordered points in m spatial dimensions
-        kwargs : kwargs are passed to DataBlock object
+        kwargs : kwargs are passed to PointBlock object
 
         """
         super().__init__(points=line, **kwargs)
@@ -210,6 +320,7 @@ class LineBlock(PointBlock):
         # initialise attributes related to spline fitting
         self.spline_smoothing_parameter = 0
         self._tck = None
+        self._arc_length_lut = None
 
     @property
     def spline_smoothing_parameter(self):
@@ -235,22 +346,120 @@ class LineBlock(PointBlock):
             self.spline_smoothing_parameter = smoothing_parameter
 
         dims_to_fit = self._get_named_dimension(dimensions, as_type='tuple')
+        from scipy.interpolate import splprep
         self._tck, _ = splprep(dims_to_fit, s=self.spline_smoothing_parameter)
 
+        # any cached arc length lookup table belongs to the previous spline
+        self._arc_length_lut = None
+
         return self._tck
 
-    def evaluate_spline(self, n_points):
-        u = np.linspace(0, 1, n_points, endpoint=True)
-        return np.asarray(splev(u, tck=self._tck))
+    def evaluate_spline(self, n_points, equidistant=False):
+        """
+        Evaluate the fitted spline at n_points
+
+        Parameters
+        ----------
+        n_points : int, number of points at which to evaluate the spline
+        equidistant : bool, if True points are evenly spaced in arc length rather than in the spline parameter u
+
+        Returns (m, n_points) ndarray of points along the spline
+        -------
+
+        """
+        if equidistant:
+            arc_lengths = np.linspace(0, self.spline_length, n_points, endpoint=True)
+            u = self._arc_length_to_u(arc_lengths)
+        else:
+            u = np.linspace(0, 1, n_points, endpoint=True)
+        return np.asarray(_splev(u, tck=self._tck))
+
+    def evaluate_spline_at_spacing(self, spacing: float, offset: float = 0):
+        """
+        Evaluate the fitted spline at points separated by a constant distance along the spline
+
+        Parameters
+        ----------
+        spacing : float, distance between consecutive points measured along the spline
+        offset : float, arc length at which the first point is placed
+
+        Returns (m, n) ndarray of points along the spline
+        -------
+
+        """
+        if spacing <= 0:
+            raise ValueError(f'spacing must be positive, got {spacing}')
+        arc_lengths = np.arange(offset, self.spline_length, spacing)
+        u = self._arc_length_to_u(arc_lengths)
+        return np.asarray(_splev(u, tck=self._tck))
+
+    @property
+    def spline_length(self):
+        """
+        Length of the fitted spline, measured along the spline
+        """
+        return self.arc_length_lut[1][-1]
+
+    @property
+    def arc_length_lut(self):
+        """
+        Lookup table of (u, arc_length) for the fitted spline, calculated once per fitted spline
+        """
+        if self._tck is None:
+            raise ValueError('no spline has been fit, call fit_spline first')
+        if self._arc_length_lut is None:
+            self._arc_length_lut = self._calculate_arc_length_lut()
+        return self._arc_length_lut
+
+    def _calculate_arc_length_lut(self, n_samples=None):
+        """
+        Calculate a lookup table mapping the spline parameter u to arc length along the spline
+
+        Arc length is calculated by trapezoidal integration of the norm of the spline derivative
+
+        Parameters
+        ----------
+        n_samples : int, number of samples of u in the table, defaults to 10 samples per point in the line
+                    with a minimum of 1000
+
+        Returns tuple of (n_samples,) ndarrays (u, arc_length)
+        -------
+
+        """
+        if n_samples is None:
+            n_samples = max(1000, 10 * len(self.data))
+        u = np.linspace(0, 1, n_samples, endpoint=True)
+        derivatives = np.asarray(_splev(u, tck=self._tck, der=1))
+        speed = np.linalg.norm(derivatives, axis=0)
+
+        # cumulative trapezoidal integration of speed over u
+        segment_lengths = (speed[1:] + speed[:-1]) / 2 * np.diff(u)
+        arc_length = np.concatenate([[0], np.cumsum(segment_lengths)])
+        return u, arc_length
+
+    def _arc_length_to_u(self, arc_lengths):
+        """
+        Invert the arc length lookup table to find the spline parameter u at given arc lengths
+
+        Parameters
+        ----------
+        arc_lengths : array-like of arc lengths along the spline
+
+        Returns ndarray of u
+        -------
+
+        """
+        u, arc_length = self.arc_length_lut
+        return np.interp(arc_lengths, arc_length, u)
 
     @property
     def smooth_backbone(self):
         return self._generate_smooth_backbone()
 
     def _generate_smooth_backbone(self, n_points=1000):
-        u = np.linspace(0, 1, n_points, endpoint=True)
-        self.fit_spline()
-        return self.evaluate_spline(n_points)
+        if self._tck is None:
+            self.fit_spline('xyz'[:self.ndim_spatial])
+        return self.evaluate_spline(n_points, equidistant=True)
 
 
 class OrientationBlock(DataBlock):
@@ -260,19 +469,25 @@ class OrientationBlock(DataBlock):
     Contains factory methods for instantiation from eulerian angles
     """
 
-    def __init__(self, rotation_matrices: np.ndarray, **kwargs):
+    def __init__(self, rotation_matrices: np.ndarray, dtype=None, **kwargs):
         """
 
         Parameters
         ----------
         rotation_matrices : (n, 2, 2) or (n, 3, 3) array of rotation matrices R
                             R should satisfy Rv = v' where v is a column vector
+        dtype : floating point dtype in which to store the matrices, defaults to the value from
+                utils.helpers.array_helper.get_float_dtype
         kwargs
         """
         super().__init__(**kwargs)
+        self.dtype = dtype
         self.data = rotation_matrices
 
     def _data_setter(self, rotation_matrices: np.ndarray):
+        # cast as C contiguous array, without copying if dtype and layout already match
+        rotation_matrices = as_float_array(rotation_matrices, dtype=self.dtype, contiguous=True)
+
         # check for single matrix case and assert dimensionality
         if not rotation_matrices.shape[-1] == rotation_matrices.shape[-2]:
             raise ValueError(
@@ -290,7 +505,7 @@ class OrientationBlock(DataBlock):
 
     @classmethod
     def from_euler_angles(cls, euler_angles: np.ndarray, axes: str, intrinsic: bool, positive_ccw: bool,
-                          invert_matrix: bool):
+                          invert_matrix: bool, dtype=None):
         """
         Factory method for creating a VectorBlock directly from a set of eulerian angles
 
@@ -305,6 +520,7 @@ class OrientationBlock(DataBlock):
         invert_matrix : bool, should the matrix be inverted?
                         this is useful if your euler angles describe the rotation of a target to a source but you would
                         like your rotation matrices to describe the rotation of a source to align it with a target
+        dtype : floating point dtype in which to store the matrices
 
         Returns
         -------
@@ -317,7 +533,7 @@ class OrientationBlock(DataBlock):
         if invert_matrix:
             rotation_matrices = rotation_matrices.transpose((-1, -2))
 
-        return cls(rotation_matrices)
+        return cls(rotation_matrices, dtype=dtype)
 
     def _calculate_matrix_product(self, vector: np.ndarray):
         """
@@ -374,36 +590,133 @@ class ImageBlock(DataBlock):
     n-dimensional image block
     data can be interpreted as n-dimensional images or stacks of n-dimensional images,
     this is controlled by the ndim_spatial attribute
+
+    ImageBlock objects can be lazy: if data is None and a loader is given, the loader is called to get the data
+    the first time it is accessed, unload() drops the data again so it can be reloaded later
     """
 
-    def __init__(self, data, ndim_spatial: int, pixel_size=None, **kwargs):
+    def __init__(self, data, ndim_spatial: int, pixel_size=None, loader=None, shape=None,
+                 image_type: ImageType = ImageType.image, source=None, **kwargs):
+        """
+
+        Parameters
+        ----------
+        data : ndarray or None if a loader is given
+        ndim_spatial : int, number of spatial dimensions in data
+        pixel_size : float, size of pixels in physical units
+        loader : callable taking no arguments which returns the image data
+        shape : tuple, shape of the data if it is known before loading
+        image_type : ImageType, what the image represents e.g. ImageType.cross_correlation_volume
+        source : path of the file the data is read from, if any
+        kwargs : kwargs are passed to DataBlock object
+        """
         super().__init__(**kwargs)
+        if data is None and loader is None:
+            raise ValueError('an ImageBlock needs either data or a loader')
+        self.loader = loader
+        self._shape = shape
+        self._load_lock = threading.Lock()
+        self._statistics = None
         self.data = data
         self.ndim_spatial = ndim_spatial
         self.pixel_size = pixel_size
+        self.image_type = image_type
+        self.source = source
+
+    @property
+    def data(self):
+        return self.load()
+
+    @data.setter
+    def data(self, image):
+        self._data = self._data_setter(image)
+        # new data, statistics of the old data no longer apply
+        self._statistics = None
 
     def _data_setter(self, image: np.ndarray):
+        # images are stored as given, casting would read memory-mapped data into memory
+        if image is not None:
+            self._shape = image.shape
         return image
 
+    @property
+    def is_loaded(self):
+        return self._data is not None
+
+    def load(self):
+        """
+        Load data using the loader if not already loaded
+
+        Returns the image data
+        -------
+
+        """
+        with self._load_lock:
+            if self._data is None:
+                # reloaded data is the same data, statistics are kept
+                self._data = self._data_setter(self.loader())
+        return self._data
+
+    def unload(self):
+        """
+        Drop the image data, it will be reloaded by the loader on next access
+        """
+        if self.loader is None:
+            raise ValueError('cannot unload an ImageBlock without a loader, its data would be lost')
+        self._data = None
+
+    @property
+    def shape(self):
+        return self._shape
+
+    def statistics(self, max_samples=2 ** 20, percentiles=(0.5, 99.5), bins=256):
+        """
+        Intensity statistics estimated from a strided sample of the image, calculated once and cached
+
+        Only about max_samples voxels are read, so statistics of memory-mapped images don't need a pass over
+        the whole image (see array_helper.sampled_statistics)
+
+        Parameters
+        ----------
+        max_samples : int, approximate maximum number of voxels read
+        percentiles : (low, high) percentiles used as contrast limits
+        bins : int, number of bins of the histogram
+
+        Returns dict with 'contrast_limits', 'min', 'max', 'mean', 'std', 'histogram' and 'n_samples'
+        -------
+
+        """
+        key = (max_samples, tuple(percentiles), bins)
+        if self._statistics is None or self._statistics[0] != key:
+            self._statistics = key, sampled_statistics(self.data, max_samples, percentiles, bins)
+        return self._statistics[1]
+
+    @property
+    def contrast_limits(self):
+        """
+        (low, high) display limits from the 0.5th and 99.5th percentiles of a sample of the image
+        """
+        return self.statistics()['contrast_limits']
+
     @property
     def pixel_size(self):
         return self._pixel_size
 
     @pixel_size.setter
     def pixel_size(self, value):
-        self._pixel_size = float(value)
+        self._pixel_size = float(value) if value is not None else None
 
 
 class SphereBlock(DataBlock):
     def __init__(self, center: np.ndarray, radius: float = None, **kwargs):
         super().__init__(**kwargs)
-        # TODO: check if below works
+        self._edge_point = None
         self.data = center, radius
-        self.edge_point = None
 
-    def _data_setter(self, center: np.ndarray, radius: float = None):
+    def _data_setter(self, data):
+        center, radius = data
         self.center = center
-        self.radius = float(radius)
+        self.radius = radius
         return self.center, self.radius
 
     @property
@@ -412,7 +725,15 @@ class SphereBlock(DataBlock):
 
     @center.setter
     def center(self, point: np.ndarray):
-        return np.asarray(point).reshape(3)
+        self._center = np.asarray(point).reshape(3)
+
+    @property
+    def radius(self):
+        return self._radius
+
+    @radius.setter
+    def radius(self, value: float):
+        self._radius = float(value) if value is not None else None
 
     @property
     def edge_point(self):
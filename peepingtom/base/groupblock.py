@@ -1,6 +1,7 @@
 """
 GroupBlock objects are groups of DataBlock objects which are commonly viewed and manipulated together
 """
+import numpy as np
 import pandas as pd
 
 from .datablock import DataBlock, PointBlock, OrientationBlock
@@ -14,15 +15,17 @@ class GroupBlock(DataBlock):
 
 
 class Particles(GroupBlock):
-    def __init__(self, positions: PointBlock, orientations: OrientationBlock, properties: pd.DataFrame, **kwargs):
+    def __init__(self, positions: PointBlock, orientations: OrientationBlock, properties: pd.DataFrame = None,
+                 dtype=None, **kwargs):
         super().__init__(**kwargs)
+        self.dtype = dtype
         self.positions = positions
         self.orientations = orientations
         self.properties = properties
         self.data = self.positions
 
     def _data_setter(self, positions):
-        self._data = positions
+        return positions
 
     @property
     def positions(self):
@@ -31,7 +34,7 @@ class Particles(GroupBlock):
     @positions.setter
     def positions(self, positions):
         if not isinstance(positions, PointBlock):
-            positions = PointBlock(positions)
+            positions = PointBlock(positions, dtype=self.dtype)
         self._positions = positions
 
     @property
@@ -40,7 +43,9 @@ class Particles(GroupBlock):
 
     @orientations.setter
     def orientations(self, orientations):
-        if not isinstance(OrientationBlock):
+        if isinstance(orientations, np.ndarray):
+            orientations = OrientationBlock(orientations, dtype=self.dtype)
+        elif not isinstance(orientations, OrientationBlock):
             raise TypeError(f"""Expected type 'OrientationBlock' but got '{type(orientations)}' instead.
 Construct an OrientationBlock or instantiate your Particles using one of the 'from_*' factory methods of this class
 """)
@@ -0,0 +1,4 @@
+from .model import Model
+from .vesicle import Vesicle
+from .filament import Filament
+from .surface import Surface
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from .model import Model
+from ..datablock import LineBlock, _splev
+from ..groupblock import Particles
+from ...utils.helpers.geometry_helper import rotation_matrices_from_z_vectors, rotation_matrices_around_z
+from ...utils.mode_enums import ModelType
+
+
+class Filament(Model):
+    """
+    A helical filament following a backbone, from which particles can be derived on a helical lattice
+    """
+    model_type = ModelType.filament
+
+    def __init__(self, backbone, rise: float, twist: float, radius: float = 0, n_starts: int = 1,
+                 smoothing_parameter=None, **kwargs):
+        """
+
+        Parameters
+        ----------
+        backbone : LineBlock or (n, 3) array-like of ordered xyz points along the filament axis
+        rise : float, distance along the filament axis between consecutive subunits of one start
+        twist : float, rotation in degrees around the filament axis between consecutive subunits of one start
+        radius : float, distance of subunits from the filament axis
+        n_starts : int, number of helical starts, evenly distributed around the filament axis
+        smoothing_parameter : smoothing parameter for fitting a spline to the backbone
+        kwargs : kwargs are passed to Model
+        """
+        super().__init__(**kwargs)
+        if not isinstance(backbone, LineBlock):
+            backbone = LineBlock(backbone)
+        self.backbone = backbone
+        self.rise = float(rise)
+        self.twist = float(twist)
+        self.radius = float(radius)
+        self.n_starts = int(n_starts)
+        self.backbone.fit_spline('xyz', smoothing_parameter=smoothing_parameter)
+
+    def derive_particles(self):
+        """
+        Derive particles on a helical lattice along the backbone
+
+        Subunits are placed at a constant rise along the arc length of the backbone, particles are oriented with
+        their z axis along the filament axis and their x axis pointing away from it
+
+        Returns Particles with 'start' and 'subunit' properties
+        -------
+
+        """
+        arc_lengths = np.arange(0, self.backbone.spline_length, self.rise)
+        n_subunits = len(arc_lengths)
+        u = self.backbone._arc_length_to_u(arc_lengths)
+
+        # points on the filament axis and local frames with z along the axis
+        axis_points = np.asarray(_splev(u, tck=self.backbone._tck)).T
+        tangents = np.asarray(_splev(u, tck=self.backbone._tck, der=1)).T
+        frames = rotation_matrices_from_z_vectors(tangents)
+
+        # azimuth of every subunit of every start, starts are stacked along the first dimension
+        subunit = np.tile(np.arange(n_subunits), self.n_starts)
+        start = np.repeat(np.arange(self.n_starts), n_subunits)
+        azimuth = np.deg2rad(subunit * self.twist) + start * 2 * np.pi / self.n_starts
+
+        orientations = np.tile(frames, (self.n_starts, 1, 1)) @ rotation_matrices_around_z(azimuth)
+        positions = np.tile(axis_points, (self.n_starts, 1)) + self.radius * orientations[:, :, 0]
+
+        properties = pd.DataFrame({'start': start, 'subunit': subunit})
+        return Particles(positions, orientations, properties=properties)
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from .model import Model
+from ..groupblock import Particles
+from ...utils.helpers.geometry_helper import rotation_matrices_from_z_vectors
+from ...utils.mode_enums import ModelType
+
+
+def _subtriangle_centroids(n_subdivisions: int):
+    """
+    Barycentric coordinates of the centroids of all subtriangles of a triangle with edges divided
+    into n_subdivisions segments
+
+    Returns (n_subdivisions ** 2, 3) ndarray of barycentric coordinates
+    -------
+
+    """
+    i, j = np.meshgrid(np.arange(n_subdivisions), np.arange(n_subdivisions), indexing='ij')
+    i, j = i.ravel(), j.ravel()
+    # triangles pointing the same way as the parent triangle, then those pointing the other way
+    upward = i + j <= n_subdivisions - 1
+    downward = i + j <= n_subdivisions - 2
+    a = np.concatenate([i[upward] + 1 / 3, i[downward] + 2 / 3]) / n_subdivisions
+    b = np.concatenate([j[upward] + 1 / 3, j[downward] + 2 / 3]) / n_subdivisions
+    return np.column_stack([1 - a - b, a, b])
+
+
+class Surface(Model):
+    """
+    A triangulated surface from which particles can be derived evenly spread over its faces
+    """
+    model_type = ModelType.surface
+
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray, **kwargs):
+        """
+
+        Parameters
+        ----------
+        vertices : (n, 3) array-like of xyz vertex positions
+        faces : (m, 3) array-like of indices into vertices, faces are wound counterclockwise when viewed from
+                the side the normal points towards
+        kwargs : kwargs are passed to Model
+        """
+        super().__init__(**kwargs)
+        self.vertices = np.asarray(vertices, dtype=float)
+        self.faces = np.asarray(faces, dtype=int)
+
+    @property
+    def face_vertices(self):
+        """
+        (m, 3, 3) ndarray of the xyz positions of the vertices of each face
+        """
+        return self.vertices[self.faces]
+
+    @property
+    def face_normals(self):
+        """
+        (m, 3) ndarray of unnormalised face normals
+        """
+        v0, v1, v2 = np.moveaxis(self.face_vertices, 1, 0)
+        return np.cross(v1 - v0, v2 - v0)
+
+    def derive_particles(self, spacing: float):
+        """
+        Derive particles evenly spaced over the surface
+
+        Each face is subdivided such that no subtriangle edge is longer than spacing and a particle is placed at
+        the centroid of each subtriangle, particles are oriented with their z axis along the face normal
+
+        Parameters
+        ----------
+        spacing : float, maximum distance between neighbouring particles on the same face
+
+        Returns Particles with a 'face' property
+        -------
+
+        """
+        face_vertices = self.face_vertices
+        edge_lengths = np.linalg.norm(face_vertices - np.roll(face_vertices, 1, axis=1), axis=-1)
+        n_subdivisions = np.maximum(1, np.ceil(edge_lengths.max(axis=1) / spacing)).astype(int)
+        normals = self.face_normals
+
+        positions, orientations, face_idx = [], [], []
+        # faces with the same number of subdivisions share barycentric coordinates and are done in bulk
+        for n in np.unique(n_subdivisions):
+            faces = np.flatnonzero(n_subdivisions == n)
+            barycentric = _subtriangle_centroids(n)
+            positions.append(np.einsum('pv,fvd->fpd', barycentric, face_vertices[faces]).reshape(-1, 3))
+            face_idx.append(np.repeat(faces, len(barycentric)))
+            orientations.append(np.repeat(rotation_matrices_from_z_vectors(normals[faces]), len(barycentric), axis=0))
+
+        properties = pd.DataFrame({'face': np.concatenate(face_idx)})
+        return Particles(np.concatenate(positions), np.concatenate(orientations), properties=properties)
@@ -0,0 +1,61 @@
+import numpy as np
+
+from .model import Model
+from ..datablock import SphereBlock
+from ..groupblock import Particles
+from ...utils.helpers.geometry_helper import rotation_matrices_from_z_vectors
+from ...utils.mode_enums import ModelType
+
+
+class Vesicle(Model):
+    """
+    A spherical vesicle from which particles can be derived evenly spread over the surface
+    """
+    model_type = ModelType.vesicle
+
+    def __init__(self, center: np.ndarray, radius: float, **kwargs):
+        super().__init__(**kwargs)
+        self.sphere = SphereBlock(center, radius)
+
+    @property
+    def center(self):
+        return self.sphere.center
+
+    @property
+    def radius(self):
+        return self.sphere.radius
+
+    def derive_particles(self, spacing: float = None, n_particles: int = None):
+        """
+        Derive particles on the surface of the vesicle from a fibonacci lattice, which samples the sphere
+        approximately uniformly
+
+        Particles are oriented such that their z axis points along the outward normal of the sphere
+
+        Parameters
+        ----------
+        spacing : float, approximate distance between neighbouring particles
+        n_particles : int, number of particles, used only if spacing is not given
+
+        Returns Particles
+        -------
+
+        """
+        if spacing is not None:
+            # area occupied by each point in a hexagonal packing
+            area_per_particle = np.sqrt(3) / 2 * spacing ** 2
+            n_particles = max(1, int(round(4 * np.pi * self.radius ** 2 / area_per_particle)))
+        elif n_particles is None:
+            raise ValueError('one of spacing or n_particles must be provided')
+
+        # fibonacci lattice on the unit sphere
+        idx = np.arange(n_particles) + 0.5
+        polar = np.arccos(1 - 2 * idx / n_particles)
+        azimuth = np.pi * (1 + np.sqrt(5)) * idx
+        normals = np.column_stack([np.cos(azimuth) * np.sin(polar),
+                                   np.sin(azimuth) * np.sin(polar),
+                                   np.cos(polar)])
+
+        positions = self.center + self.radius * normals
+        orientations = rotation_matrices_from_z_vectors(normals)
+        return Particles(positions, orientations)
@@ -0,0 +1,159 @@
+"""
+Multi-frame micrographs (movies) with streaming frame sums
+"""
+import os
+import uuid
+
+import numpy as np
+
+from .datablock import ImageBlock
+from ..utils.caching import LRUCache
+from ..utils.mode_enums import ImageType
+from ..utils.instrumentation import count
+
+# frame sums of all movies, bounded so that quick-look sums of many movies fit in memory
+_sum_cache = LRUCache(max_bytes=int(os.environ.get('PEEPINGTOM_FRAME_SUM_CACHE_BYTES', 2 * 2 ** 30)))
+
+
+def get_frame_sum_cache():
+    """
+    process-wide LRUCache of frame sums, keyed by (movie, frames, average)
+    """
+    return _sum_cache
+
+
+def frame_indices(n_frames, frames=None):
+    """
+    indices of the selected frames of a movie with n_frames frames
+    frames can be None for all frames, a slice, an int or a sequence of indices
+    """
+    if frames is None:
+        return np.arange(n_frames)
+    return np.atleast_1d(np.arange(n_frames)[frames])
+
+
+def _runs(indices):
+    """
+    split sorted frame indices into slices of consecutive frames, which index memory-mapped data without copying
+    """
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    for run in np.split(indices, breaks):
+        if len(run):
+            yield slice(int(run[0]), int(run[-1]) + 1)
+
+
+def stream_frame_sum(data, frames=None, average=False, max_bytes=64 * 2 ** 20):
+    """
+    Sum frames of a (frame, y, x) stack in chunks of frames, so memory-mapped stacks are read chunk by chunk
+    and never held in memory at once
+
+    Parameters
+    ----------
+    data : (frame, y, x) array-like, e.g. a memory-mapped stack
+    frames : None for all frames, slice, int or sequence of frame indices
+    average : bool, return the mean instead of the sum of the frames
+    max_bytes : int, approximate size of the frames read at a time
+
+    Returns (y, x) float32 ndarray
+    -------
+
+    """
+    indices = np.unique(frame_indices(data.shape[0], frames))
+    frame_bytes = int(np.prod(data.shape[1:])) * data.dtype.itemsize
+    chunk_frames = max(1, int(max_bytes // max(frame_bytes, 1)))
+    total = np.zeros(data.shape[1:], dtype=np.float64)
+    for run in _runs(indices):
+        for start in range(run.start, run.stop, chunk_frames):
+            chunk = np.asarray(data[start:min(start + chunk_frames, run.stop)])
+            total += chunk.sum(axis=0, dtype=np.float64)
+    count('frames_summed', len(indices))
+    if average and len(indices):
+        total /= len(indices)
+    return total.astype(np.float32)
+
+
+class MultiFrameBlock(ImageBlock):
+    """
+    Stack of frames (frame, y, x) of a multi-frame micrograph
+
+    Like any ImageBlock a MultiFrameBlock can be lazy, movies read with read.read_movies are memory-mapped so
+    frames and frame sums are read from disk in chunks. Sums of frames are cached in a process-wide LRUCache
+    bounded by a byte budget (see get_frame_sum_cache), so sums shown for quality control are calculated once
+    """
+
+    def __init__(self, data, pixel_size=None, loader=None, shape=None, source=None, **kwargs):
+        """
+
+        Parameters
+        ----------
+        data : (frame, y, x) ndarray or None if a loader is given
+        pixel_size : float, size of pixels in physical units
+        loader : callable taking no arguments which returns the stack
+        shape : tuple, shape of the stack if it is known before loading
+        source : path of the file the stack is read from, if any
+        kwargs : kwargs are passed to ImageBlock object
+        """
+        super().__init__(data, ndim_spatial=2, pixel_size=pixel_size, loader=loader, shape=shape,
+                         image_type=ImageType.multi_frame_micrograph, source=source, **kwargs)
+        self._token = self._cache_token()
+
+    def _cache_token(self):
+        # movies read from files share sums across blocks of the same unchanged file
+        if self.source is not None and os.path.exists(self.source):
+            stat = os.stat(self.source)
+            return os.path.realpath(self.source), stat.st_mtime_ns, stat.st_size
+        return uuid.uuid4().hex
+
+    @property
+    def n_frames(self):
+        return (self.shape or self.data.shape)[0]
+
+    def frame(self, index):
+        """
+        Image of a single frame, only this frame is read from memory-mapped data
+
+        Returns (y, x) ndarray
+        -------
+
+        """
+        return np.asarray(self.data[index])
+
+    def sum_key(self, frames=None, average=False):
+        """
+        key of the sum of frames in the frame sum cache
+        """
+        indices = np.unique(frame_indices(self.n_frames, frames))
+        # all frames and runs of consecutive frames have short keys
+        if len(indices) and indices[-1] - indices[0] == len(indices) - 1:
+            frames_key = (int(indices[0]), int(indices[-1]) + 1)
+        else:
+            frames_key = tuple(indices.tolist())
+        return self._token, frames_key, bool(average)
+
+    def sum_frames(self, frames=None, average=False, max_bytes=64 * 2 ** 20):
+        """
+        Sum or average frames in streaming chunks, cached per selection of frames
+
+        Parameters
+        ----------
+        frames : None for all frames, slice, int or sequence of frame indices
+        average : bool, return the mean instead of the sum of the frames
+        max_bytes : int, approximate size of the frames read at a time
+
+        Returns (y, x) float32 ndarray, read-only as it is shared through the cache
+        -------
+
+        """
+        key = self.sum_key(frames, average)
+        result = _sum_cache.get(key)
+        if result is None:
+            result = stream_frame_sum(self.data, frames, average, max_bytes)
+            self.cache_sum(result, frames, average)
+        return result
+
+    def cache_sum(self, result, frames=None, average=False):
+        """
+        store a sum of frames calculated elsewhere (e.g. in a worker process) in the frame sum cache
+        """
+        result.flags.writeable = False
+        _sum_cache.put(self.sum_key(frames, average), result, result.nbytes)
@@ -0,0 +1,116 @@
+"""
+Transport of DataBlocks to worker processes through shared memory
+
+share_block copies the arrays of a block once into shared memory and returns a SharedBlock whose spec is a small
+picklable description, attach_block rebuilds a read-only block around the shared arrays in any process without
+copying them
+"""
+from .datablock import PointBlock, LineBlock, OrientationBlock, ImageBlock
+from .groupblock import Particles
+from ..utils.shared_memory import SharedArray
+
+_point_block_types = {cls.__name__: cls for cls in (PointBlock, LineBlock)}
+
+
+class SharedBlock:
+    """
+    Handle on the shared memory of an exported block
+
+    The shared memory is freed by release(), on leaving a with block, when the handle is garbage collected
+    or at interpreter exit, whichever comes first. Blocks attached before that stay valid until they are
+    garbage collected, blocks can't be attached after it
+    """
+    def __init__(self, block, directory=None):
+        """
+
+        Parameters
+        ----------
+        block : Particles, PointBlock, LineBlock, OrientationBlock or ImageBlock
+        directory : directory for the backing files, defaults to /dev/shm where available
+        """
+        self.directory = directory
+        self._arrays = []
+        self.spec = self._export(block)
+
+    def _share(self, array):
+        shared = SharedArray(array, directory=self.directory)
+        self._arrays.append(shared)
+        return shared.spec
+
+    def _export(self, block):
+        if isinstance(block, Particles):
+            return ('Particles', self._export(block.positions), self._export(block.orientations), block.properties)
+        if type(block).__name__ in _point_block_types:
+            # units travel with the block, transforms are small picklable objects
+            return (type(block).__name__, self._share(block.data), block.pixel_size, block.transform)
+        if isinstance(block, OrientationBlock):
+            return ('OrientationBlock', self._share(block.data))
+        if isinstance(block, ImageBlock):
+            # lazy images are loaded here, once, rather than in every worker
+            return ('ImageBlock', self._share(block.data), block.ndim_spatial, block.pixel_size, block.image_type)
+        raise TypeError(f'cannot share blocks of type {type(block)}')
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self._arrays)
+
+    @property
+    def released(self):
+        return all(array.released for array in self._arrays)
+
+    def release(self):
+        for array in self._arrays:
+            array.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def share_block(block, directory=None):
+    """
+    Copy the arrays of a block into shared memory
+
+    Parameters
+    ----------
+    block : Particles, PointBlock, LineBlock, OrientationBlock or ImageBlock
+    directory : directory for the backing files, defaults to /dev/shm where available
+
+    Returns SharedBlock, pass SharedBlock.spec to attach_block in a worker process
+    -------
+
+    """
+    return SharedBlock(block, directory=directory)
+
+
+def attach_block(spec):
+    """
+    Rebuild a block around shared arrays without copying them
+
+    Parameters
+    ----------
+    spec : SharedBlock.spec of an exported block
+
+    Returns block of the exported type whose arrays are read-only views of the shared memory
+    -------
+
+    """
+    kind, *args = spec
+    if kind == 'Particles':
+        positions, orientations, properties = args
+        positions = attach_block(positions)
+        return Particles(positions, attach_block(orientations), properties=properties, dtype=positions.data.dtype)
+    if kind in _point_block_types:
+        array, pixel_size, transform = args
+        data = SharedArray.attach(array)
+        return _point_block_types[kind](data, dtype=data.dtype, pixel_size=pixel_size, transform=transform)
+    if kind == 'OrientationBlock':
+        data = SharedArray.attach(args[0])
+        return OrientationBlock(data, dtype=data.dtype)
+    if kind == 'ImageBlock':
+        image, ndim_spatial, pixel_size, image_type = args
+        return ImageBlock(SharedArray.attach(image), ndim_spatial=ndim_spatial, pixel_size=pixel_size,
+                          image_type=image_type)
+    raise ValueError(f'unknown shared block type {kind}')
@@ -0,0 +1,160 @@
+"""
+Stacking of particles from multiple volumes into single arrays with an extra leading volume dimension
+"""
+import numpy as np
+import pandas as pd
+
+from .datablock import PointBlock, OrientationBlock, ImageBlock
+from .groupblock import Particles
+from ..utils.helpers.array_helper import get_float_dtype
+
+
+class ParticleStack:
+    """
+    Particles from a list of DataCrates concatenated once into shared buffers
+
+    positions and vectors are stored in a single (n, 2, m + 1) buffer in napari order: the first column is the
+    index of the volume and the others are (..., z, y, x), buffer[:, 0] holds positions and buffer[:, 1] holds
+    the direction of the z axis of each particle (with a volume component of 0)
+    orientations are stored in a single (n, m, m) buffer
+
+    positions and vectors are displayed in pixels of the first image of each volume, as in VolumeViewer
+    (see PointBlock.in_image). Blocks whose stored coordinates are already in those pixels are displayed from
+    the buffer itself, if any block has a transform or a different pixel size its converted positions are kept
+    in a separate display buffer. Directions of the vectors are calculated from the orientations when the stack
+    is built, call refresh() after changing orientations or coordinates to update vectors and displayed positions
+
+    particles of volume i occupy rows offsets[i]:offsets[i + 1], positions_of(i) and orientations_of(i)
+    return views into the buffers. If share is True, the Particles in the crates are rebound to these views
+    so per-volume analysis and stacked display use the same memory. Only blocks whose positions and orientations
+    already have the dtype of the buffers are rebound, so sharing never changes the dtype or units of a block
+    """
+    def __init__(self, crates, dtype=None, share=False):
+        """
+
+        Parameters
+        ----------
+        crates : list of DataCrate objects, particles of all Particles blocks in a crate are stacked in order
+        dtype : floating point dtype of the buffers, defaults to the value from array_helper.get_float_dtype
+        share : bool, rebind the positions and orientations of the stacked Particles with the dtype of the buffers
+                to views into the buffers
+        """
+        if dtype is None:
+            dtype = get_float_dtype()
+        self.dtype = np.dtype(dtype)
+        particles = [[block for block in crate if isinstance(block, Particles)] for crate in crates]
+        self._particles = particles
+        self._images = [next((block for block in crate if isinstance(block, ImageBlock)), None) for crate in crates]
+
+        counts = [sum(len(p.positions.data) for p in volume) for volume in particles]
+        self.offsets = np.concatenate([[0], np.cumsum(counts, dtype=int)])
+        n_particles = int(self.offsets[-1])
+
+        ndims = {p.positions.ndim_spatial for volume in particles for p in volume}
+        if len(ndims) > 1:
+            raise ValueError(f'cannot stack particles with different numbers of spatial dimensions {ndims}')
+        m = ndims.pop() if ndims else 3
+
+        self._buffer = np.zeros((n_particles, 2, m + 1), dtype=self.dtype)
+        self.orientations = np.empty((n_particles, m, m), dtype=self.dtype)
+        properties = []
+
+        # fill the buffers in place, one block at a time
+        for idx, volume in enumerate(particles):
+            start = self.offsets[idx]
+            for p in volume:
+                stop = start + len(p.positions.data)
+                self._buffer[start:stop, 0, 0] = idx
+                self._buffer[start:stop, 0, :0:-1] = p.positions.data
+                self.orientations[start:stop] = p.orientations.data
+                properties.append(pd.DataFrame(index=range(stop - start)) if p.properties is None
+                                  else p.properties.reset_index(drop=True))
+                if share and p.positions.data.dtype == self.dtype and p.orientations.data.dtype == self.dtype:
+                    p.positions = PointBlock(self._buffer[start:stop, 0, :0:-1], dtype=self.dtype,
+                                             pixel_size=p.positions.pixel_size, transform=p.positions.transform)
+                    p.orientations = OrientationBlock(self.orientations[start:stop], dtype=self.dtype)
+                start = stop
+
+        self.properties = pd.concat(properties, ignore_index=True) if properties else pd.DataFrame()
+        self._display = None
+        self.refresh()
+
+    def _fill_vectors(self):
+        # z axis of each particle is the last column of its rotation matrix, reversed into (..., z, y, x)
+        self._buffer[:, 1, 1:] = self.orientations[:, ::-1, -1]
+
+    def _fill_display(self):
+        """
+        fill the display buffer with positions in pixels of the image of each volume, if any block needs converting
+        """
+        converted = []
+        for idx, volume in enumerate(self._particles):
+            image = self._images[idx]
+            start = self.offsets[idx]
+            for p in volume:
+                stop = start + len(p.positions.data)
+                positions = p.positions.transformed if image is None else p.positions.in_image(image)
+                # the stored data is returned when no conversion is needed
+                if positions is not p.positions.data:
+                    converted.append((start, stop, positions))
+                start = stop
+        if not converted:
+            self._display = None
+            return
+        if self._display is None:
+            self._display = self._buffer.copy()
+        else:
+            self._display[...] = self._buffer
+        for start, stop, positions in converted:
+            self._display[start:stop, 0, :0:-1] = positions
+
+    def refresh(self):
+        """
+        update vectors and displayed positions after orientations, coordinates, transforms or pixel sizes of the
+        stacked blocks change, e.g. after editing shared orientations in place
+        """
+        self._fill_vectors()
+        self._fill_display()
+
+    @property
+    def _napari(self):
+        return self._buffer if self._display is None else self._display
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def n_volumes(self):
+        return len(self.offsets) - 1
+
+    @property
+    def positions(self):
+        """
+        (n, m + 1) view of positions as (volume, ..., z, y, x) in pixels of the image of each volume
+        """
+        return self._napari[:, 0]
+
+    @property
+    def vectors(self):
+        """
+        (n, 2, m + 1) napari vectors of the z axis of each particle, positions and directions as (volume, ..., z, y, x)
+        """
+        return self._napari
+
+    def volume_slice(self, idx):
+        return slice(self.offsets[idx], self.offsets[idx + 1])
+
+    def positions_of(self, idx):
+        """
+        (n, m) view of the stored positions of the particles of volume idx in (x, y, ...) order
+        """
+        return self._buffer[self.volume_slice(idx), 0, :0:-1]
+
+    def orientations_of(self, idx):
+        """
+        (n, m, m) view of the rotation matrices of the particles of volume idx
+        """
+        return self.orientations[self.volume_slice(idx)]
+
+    def properties_of(self, idx):
+        return self.properties.iloc[self.volume_slice(idx)]
@@ -5,7 +5,8 @@ import pytest
 import numpy as np
 from numpy.testing import assert_array_equal
 
-from ..datablock import DataBlock, PointBlock, LineBlock, OrientationBlock
+from ..datablock import DataBlock, PointBlock, LineBlock, OrientationBlock, ImageBlock
+from ...utils.helpers.array_helper import set_float_dtype
 
 
 def test_datablock():
@@ -138,3 +139,153 @@ def test_lineblock_evaluate_spline():
 
     assert block._tck is not None
     assert isinstance(block._tck, list)
+
+
+def test_lineblock_arc_length():
+    # test arc length lookup on a straight line of known length
+    line = np.column_stack([np.linspace(0, 10, 20), np.zeros(20), np.zeros(20)])
+    block = LineBlock(line)
+    block.fit_spline('xyz')
+
+    assert block._arc_length_lut is None
+    assert np.isclose(block.spline_length, 10)
+    assert block._arc_length_lut is not None
+
+    # lookup table is invalidated on refitting
+    block.fit_spline('xyz')
+    assert block._arc_length_lut is None
+
+
+def test_lineblock_evaluate_spline_at_spacing():
+    # test evaluation of points at a constant spacing along a curved spline
+    block = LineBlock(line_3d)
+    block.fit_spline('xyz')
+    spline = block.evaluate_spline_at_spacing(0.5)
+    assert spline.shape[0] == 3
+
+    spacings = np.linalg.norm(np.diff(spline, axis=1), axis=0)
+    assert np.allclose(spacings, 0.5, atol=0.01)
+
+    spline = block.evaluate_spline(50, equidistant=True)
+    spacings = np.linalg.norm(np.diff(spline, axis=1), axis=0)
+    assert np.allclose(spacings, spacings.mean(), atol=0.01)
+
+    with pytest.raises(ValueError):
+        block.evaluate_spline_at_spacing(0)
+
+
+def test_pointblock_named_dimension_views():
+    # test that named dimensions are returned as views where possible
+    block = PointBlock(points_3d)
+
+    assert np.shares_memory(block.x, block.data)
+    assert np.shares_memory(block.xyz, block.data)
+    assert np.shares_memory(block.zyx, block.data)
+    assert_array_equal(block.zyx, np.asarray(points_3d)[:, ::-1])
+
+    # evenly spaced combinations are strided slices, so still views
+    xz = block._get_named_dimension('xz')
+    assert_array_equal(xz, np.asarray(points_3d)[:, [0, 2]])
+    assert np.shares_memory(xz, block.data)
+    zx = block._get_named_dimension('zx')
+    assert_array_equal(zx, np.asarray(points_3d)[:, [2, 0]])
+    assert np.shares_memory(zx, block.data)
+
+    # unevenly spaced combinations are gathered into copies
+    yxz = block._get_named_dimension('yxz')
+    assert_array_equal(yxz, np.asarray(points_3d)[:, [1, 0, 2]])
+    assert not np.shares_memory(yxz, block.data)
+    xzy = block._get_named_dimension('xzy')
+    assert_array_equal(xzy, np.asarray(points_3d)[:, [0, 2, 1]])
+    assert not np.shares_memory(xzy, block.data)
+
+    # tuples contain views
+    x, y, z = block._get_named_dimension('xyz', as_type='tuple')
+    assert_array_equal(z, [3, 6])
+    assert np.shares_memory(z, block.data)
+
+
+def test_datablock_dtype():
+    # test that data is stored without copying if the dtype already matches
+    points = np.random.random((10, 3))
+    block = PointBlock(points)
+    assert block.data is points
+
+    # and cast if the dtype is given
+    block = PointBlock(points, dtype=np.float32)
+    assert block.data.dtype == np.float32
+    assert PointBlock(block.data, dtype=np.float32).data is block.data
+
+    matrices = np.tile(np.eye(3), (10, 1, 1))
+    block = OrientationBlock(matrices)
+    assert block.data is matrices
+    block = OrientationBlock(matrices, dtype=np.float32)
+    assert block.data.dtype == np.float32
+    assert block.data.flags['C_CONTIGUOUS']
+
+    # default dtype can be set
+    set_float_dtype(np.float32)
+    try:
+        assert PointBlock(points).data.dtype == np.float32
+        assert OrientationBlock(matrices).data.dtype == np.float32
+    finally:
+        set_float_dtype(np.float64)
+
+    with pytest.raises(ValueError):
+        set_float_dtype(int)
+
+
+def test_imageblock_lazy():
+    # test lazy loading and unloading of ImageBlock data
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return np.ones((4, 5, 6))
+
+    block = ImageBlock(None, ndim_spatial=3, loader=loader, shape=(4, 5, 6))
+    assert not block.is_loaded
+    assert block.shape == (4, 5, 6)
+    assert not calls
+
+    assert block.data.shape == (4, 5, 6)
+    assert block.is_loaded
+    block.data
+    assert len(calls) == 1
+
+    block.unload()
+    assert not block.is_loaded
+    block.load()
+    assert len(calls) == 2
+
+    # images without a loader cannot be unloaded
+    block = ImageBlock(np.ones((2, 2)), ndim_spatial=2)
+    assert block.shape == (2, 2)
+    with pytest.raises(ValueError):
+        block.unload()
+
+    with pytest.raises(ValueError):
+        ImageBlock(None, ndim_spatial=3)
+
+
+def test_imageblock_statistics():
+    # statistics come from a strided sample and are cached on the block
+    data = np.random.normal(size=(64, 64, 64)).astype(np.float32)
+    data[0, 0, 0] = np.nan
+    block = ImageBlock(data, ndim_spatial=3)
+    statistics = block.statistics(max_samples=2 ** 12)
+    assert statistics['n_samples'] <= 2 ** 12
+    assert abs(statistics['mean']) < 0.2 and abs(statistics['std'] - 1) < 0.2
+    low, high = block.statistics(max_samples=2 ** 12)['contrast_limits']
+    assert low < -1.5 and high > 1.5
+    counts, edges = statistics['histogram']
+    assert counts.sum() == statistics['n_samples'] and len(edges) == 257
+    assert block.statistics(max_samples=2 ** 12) is statistics
+
+    # statistics are kept when lazy data is reloaded and dropped when the data is replaced
+    block = ImageBlock(None, ndim_spatial=3, loader=lambda: data, shape=data.shape)
+    statistics = block.statistics()
+    block.unload()
+    assert block.statistics() is statistics
+    block.data = np.zeros((4, 4, 4))
+    assert block.contrast_limits == (0, 1)
@@ -0,0 +1,76 @@
+"""
+Tests for Model objects
+"""
+import pytest
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+from ..groupblock import Particles
+from ..models import Model, Vesicle, Filament, Surface
+
+
+def test_model():
+    # assert that Model class cannot be instantiated directly
+    with pytest.raises(TypeError):
+        model = Model()
+
+
+def test_vesicle_derive_particles():
+    vesicle = Vesicle(center=[10, 20, 30], radius=50)
+    particles = vesicle.derive_particles(n_particles=500)
+    assert isinstance(particles, Particles)
+    assert particles.positions.data.shape == (500, 3)
+    assert particles.orientations.data.shape == (500, 3, 3)
+
+    # all particles lie on the sphere
+    distances = np.linalg.norm(particles.positions.data - vesicle.center, axis=1)
+    assert_array_almost_equal(distances, 50)
+
+    # z axis of each particle points along the outward normal
+    normals = (particles.positions.data - vesicle.center) / 50
+    assert_array_almost_equal(particles.orientations.data[:, :, 2], normals)
+
+    # orientations are proper rotations
+    assert_array_almost_equal(np.linalg.det(particles.orientations.data), 1)
+
+    # number of particles from spacing scales with surface area
+    assert len(vesicle.derive_particles(spacing=5).positions.data) > 1000
+
+    with pytest.raises(ValueError):
+        vesicle.derive_particles()
+
+
+def test_filament_derive_particles():
+    backbone = np.column_stack([np.zeros(20), np.zeros(20), np.linspace(0, 100, 20)])
+    filament = Filament(backbone, rise=10, twist=90, radius=5, n_starts=2)
+    particles = filament.derive_particles()
+    assert isinstance(particles, Particles)
+    assert len(particles.positions.data) == 20
+
+    # all particles lie at the given radius from the axis
+    radial_distance = np.linalg.norm(particles.positions.data[:, :2], axis=1)
+    assert_array_almost_equal(radial_distance, 5)
+
+    # consecutive subunits of one start are separated by the rise along the axis
+    start = particles.properties['start'] == 0
+    assert_array_almost_equal(np.diff(particles.positions.data[start, 2]), 10, decimal=3)
+
+    # z axis of each particle points along the filament axis
+    assert_array_almost_equal(particles.orientations.data[:, :, 2], np.tile([0, 0, 1], (20, 1)), decimal=3)
+
+
+def test_surface_derive_particles():
+    # unit square made of two triangles in the xy plane
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]])
+    faces = np.array([[0, 1, 2], [0, 2, 3]])
+    surface = Surface(vertices, faces)
+
+    particles = surface.derive_particles(spacing=0.5)
+    assert isinstance(particles, Particles)
+    # longest edge is the diagonal, subdivided into 3 segments, giving 9 subtriangles per face
+    assert len(particles.positions.data) == 18
+    assert_array_almost_equal(particles.positions.data[:, 2], 0)
+    assert set(particles.properties['face']) == {0, 1}
+
+    # z axis of each particle points along the face normal
+    assert_array_almost_equal(particles.orientations.data[:, :, 2], np.tile([0, 0, 1], (18, 1)))
@@ -0,0 +1,35 @@
+import numpy as np
+from numpy.testing import assert_allclose
+
+from ..multiframe import MultiFrameBlock, stream_frame_sum, get_frame_sum_cache
+from ...utils.mode_enums import ImageType
+
+
+def test_stream_frame_sum():
+    stack = np.random.random((10, 6, 7)).astype(np.float32)
+    # a budget of one frame at a time
+    assert_allclose(stream_frame_sum(stack, max_bytes=1), stack.sum(axis=0), rtol=1e-5)
+    assert_allclose(stream_frame_sum(stack, frames=slice(2, 8), average=True), stack[2:8].mean(axis=0), rtol=1e-5)
+    assert_allclose(stream_frame_sum(stack, frames=[0, 1, 5, 9], max_bytes=1), stack[[0, 1, 5, 9]].sum(axis=0),
+                    rtol=1e-5)
+    assert stream_frame_sum(stack).dtype == np.float32
+
+
+def test_multi_frame_block():
+    stack = np.random.random((10, 6, 7)).astype(np.float32)
+    loads = []
+    movie = MultiFrameBlock(None, loader=lambda: loads.append(1) or stack, shape=stack.shape)
+    assert movie.image_type is ImageType.multi_frame_micrograph
+    assert movie.n_frames == 10 and not movie.is_loaded
+    assert_allclose(movie.frame(3), stack[3])
+
+    total = movie.sum_frames()
+    assert_allclose(total, stack.sum(axis=0), rtol=1e-5)
+    # sums are cached per selection of frames
+    assert movie.sum_frames() is total
+    assert movie.sum_key(slice(None)) == movie.sum_key()
+    assert movie.sum_key([0, 2]) not in get_frame_sum_cache()
+    assert movie.sum_frames([0, 2]) is movie.sum_frames([2, 0])
+    assert movie.sum_key([0, 2]) in get_frame_sum_cache()
+    assert not total.flags.writeable
+    assert len(loads) == 1
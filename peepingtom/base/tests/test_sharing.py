@@ -0,0 +1,59 @@
+"""
+Tests for sharing DataBlocks between processes
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_array_equal
+
+from ..datablock import LineBlock, ImageBlock
+from ..groupblock import Particles
+from ..sharing import share_block, attach_block
+from ..transforms import Shift, Binning
+
+
+def test_share_particles():
+    positions = np.random.random((10, 3))
+    properties = pd.DataFrame({'score': np.arange(10)})
+    particles = Particles(positions, np.tile(np.eye(3), (10, 1, 1)), properties=properties)
+    particles.positions.pixel_size = 4
+    particles.positions.transform = Shift(1).then(Binning(2))
+
+    with share_block(particles) as shared:
+        assert shared.nbytes == positions.nbytes + 10 * 9 * positions.itemsize
+        attached = attach_block(pickle.loads(pickle.dumps(shared.spec)))
+    assert shared.released
+
+    assert isinstance(attached, Particles)
+    assert_array_equal(attached.positions.data, positions)
+    assert_array_equal(attached.properties['score'], np.arange(10))
+    # units are carried through the spec
+    assert attached.positions.pixel_size == 4
+    assert_array_equal(attached.positions.transformed, particles.positions.transformed)
+    # read-only views of the shared memory
+    with pytest.raises(ValueError):
+        attached.positions.data[0, 0] = 1
+
+
+def test_share_blocks():
+    line = LineBlock(np.random.random((5, 3)))
+    image = ImageBlock(None, ndim_spatial=3, loader=lambda: np.ones((4, 4, 4), dtype=np.float32), shape=(4, 4, 4))
+    shared_line = share_block(line)
+    shared_image = share_block(image)
+
+    attached = attach_block(shared_line.spec)
+    assert isinstance(attached, LineBlock)
+    assert_array_equal(attached.data, line.data)
+
+    attached = attach_block(shared_image.spec)
+    assert attached.data.sum() == 64
+    assert not attached.data.flags.writeable
+
+    path = shared_image.spec[1]
+    del shared_image
+    # freed once the handle is garbage collected
+    assert not os.path.exists(path)
+    shared_line.release()
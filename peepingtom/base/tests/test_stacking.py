@@ -0,0 +1,102 @@
+"""
+Tests for ParticleStack
+"""
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+
+from ..datacrate import DataCrate
+from ..datablock import ImageBlock
+from ..groupblock import Particles
+from ..stacking import ParticleStack
+from ..transforms import Scale
+
+
+def _crate(n, offset):
+    positions = np.random.random((n, 3)) + offset
+    orientations = np.tile(np.eye(3), (n, 1, 1))
+    properties = pd.DataFrame({'score': np.arange(n) + offset})
+    return DataCrate([Particles(positions, orientations, properties=properties)])
+
+
+def test_particle_stack():
+    crates = [_crate(5, 0), _crate(3, 10), _crate(4, 20)]
+    originals = [crate[0].positions.data.copy() for crate in crates]
+    stack = ParticleStack(crates, share=True)
+
+    assert len(stack) == 12
+    assert stack.n_volumes == 3
+    assert_array_equal(stack.offsets, [0, 5, 8, 12])
+    assert stack.positions.shape == (12, 4)
+    assert stack.vectors.shape == (12, 2, 4)
+    assert_array_equal(stack.positions[:, 0], [0] * 5 + [1] * 3 + [2] * 4)
+    # napari order, zyx after the volume index
+    assert_array_equal(stack.positions[5:8, 1:], originals[1][:, ::-1])
+    # identity orientations point along z
+    assert_array_equal(stack.vectors[:, 1], np.tile([0, 1, 0, 0], (12, 1)))
+    assert_array_equal(stack.properties_of(2)['score'], np.arange(4) + 20)
+
+    for idx, crate in enumerate(crates):
+        particles = crate[0]
+        assert_array_equal(stack.positions_of(idx), originals[idx])
+        # per volume particles are views into the stacked buffers
+        assert np.shares_memory(particles.positions.data, stack.positions)
+        assert np.shares_memory(particles.orientations.data, stack.orientations)
+
+    crates[1][0].positions.data[0, 0] = -1
+    assert stack.positions[5, 3] == -1
+
+
+def test_particle_stack_keeps_units():
+    crate = _crate(5, 0)
+    crate[0].positions.pixel_size = 2
+    crate[0].positions.transform = Scale(3)
+    ParticleStack([crate], share=True)
+    assert crate[0].positions.pixel_size == 2
+    assert_array_equal(crate[0].positions.transformed, crate[0].positions.data * 3)
+
+
+def test_particle_stack_keeps_dtype():
+    crates = [_crate(5, 0), DataCrate([Particles(np.random.random((3, 3)), np.tile(np.eye(3), (3, 1, 1)),
+                                                  dtype=np.float32)])]
+    originals = [crate[0].positions.data for crate in crates]
+
+    # not shared by default
+    stack = ParticleStack(crates, dtype=np.float32)
+    assert crates[1][0].positions.data is originals[1]
+
+    # only blocks with the dtype of the stack are rebound
+    stack = ParticleStack(crates, dtype=np.float32, share=True)
+    assert crates[0][0].positions.data is originals[0]
+    assert crates[1][0].positions.data.dtype == np.float32
+    assert np.shares_memory(crates[1][0].positions.data, stack.positions)
+
+
+def test_particle_stack_display_units():
+    crates = [_crate(5, 0), _crate(3, 10)]
+    # picked at half the pixel size of the image of the first volume, transformed in the second
+    crates[0][0].positions.pixel_size = 5
+    crates[0].append(ImageBlock(np.zeros((4, 4, 4)), ndim_spatial=3, pixel_size=10))
+    crates[1][0].positions.transform = Scale(2)
+    stack = ParticleStack(crates, share=True)
+
+    assert_array_equal(stack.positions[:5, :0:-1], crates[0][0].positions.data / 2)
+    assert_array_equal(stack.vectors[5:, 0, :0:-1], crates[1][0].positions.data * 2)
+    # stored coordinates are unchanged and still shared
+    assert np.shares_memory(crates[1][0].positions.data, stack.positions_of(1))
+    assert not np.shares_memory(stack.positions, stack.positions_of(1))
+
+    crates[1][0].positions.data[0, 0] = 100
+    stack.refresh()
+    assert stack.positions[5, 3] == 200
+
+
+def test_particle_stack_refresh_vectors():
+    crate = _crate(3, 0)
+    stack = ParticleStack([crate], share=True)
+    # rotate the first particle by 90 degrees around y, its z axis points along x
+    crate[0].orientations.data[0] = [[0, 0, 1], [0, 1, 0], [-1, 0, 0]]
+    assert_array_equal(stack.vectors[0, 1], [0, 1, 0, 0])
+    stack.refresh()
+    assert_array_equal(stack.vectors[0, 1], [0, 0, 0, 1])
+    assert_array_equal(stack.vectors[1, 1], [0, 1, 0, 0])
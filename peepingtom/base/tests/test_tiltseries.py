@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from ..tiltseries import TiltSeriesBlock
+from ..datablock import PointBlock
+from ...utils.mode_enums import ImageType
+
+
+def _rotation_y(angle):
+    theta = np.deg2rad(angle)
+    return np.array([[np.cos(theta), 0, np.sin(theta)], [0, 1, 0], [-np.sin(theta), 0, np.cos(theta)]])
+
+
+def test_tilt_series_block():
+    stack = np.random.random((3, 20, 30)).astype(np.float32)
+    tilt_series = TiltSeriesBlock(stack, tilt_angles=[0, -30, 30], dose=[0, 3, 6])
+    assert tilt_series.image_type is ImageType.tilt_series
+    assert tilt_series.n_tilts == 3
+    assert_allclose(tilt_series.tilt(1), stack[1])
+    assert list(tilt_series.tilt_order()) == [0, 1, 2]
+    assert np.all(np.isnan(TiltSeriesBlock(stack, tilt_angles=[0, -30, 30]).dose))
+
+    # lazy stacks are only loaded when a tilt is requested
+    lazy = TiltSeriesBlock(None, tilt_angles=[0, -30, 30], loader=lambda: stack, shape=stack.shape)
+    assert not lazy.is_loaded
+    assert_allclose(lazy.tilt(2), stack[2])
+
+    with pytest.raises(ValueError):
+        TiltSeriesBlock(stack, tilt_angles=[0, 30])
+
+
+def test_project():
+    angles = [-60, -30, 0, 30, 60]
+    tilt_series = TiltSeriesBlock(None, tilt_angles=angles, shifts=np.arange(10).reshape(5, 2),
+                                  tilt_axis_angle=90, loader=lambda: None, shape=(5, 100, 120))
+    positions = np.random.uniform(0, 100, (20, 3))
+    tomogram_shape = (40, 100, 120)
+    projected = tilt_series.project(positions, tomogram_shape)
+    assert projected.shape == (5, 20, 2)
+
+    # oracle: rotate around y about the tomogram center, drop z, rotate the tilt axis onto x, shift to image center
+    centered = positions - np.array(tomogram_shape[::-1]) / 2
+    in_plane = np.array([[0, -1], [1, 0]])
+    for t, angle in enumerate(angles):
+        expected = (centered @ _rotation_y(angle).T)[:, :2] @ in_plane.T + [60, 50] + tilt_series.shifts[t]
+        assert_allclose(projected[t], expected, atol=1e-9)
+
+    # positions with a known pixel size are converted to the pixel size of the tilts
+    tilt_series.pixel_size = 4
+    block = PointBlock(positions * 2, pixel_size=2)
+    assert_allclose(tilt_series.project(block, tomogram_shape), projected, atol=1e-6)
+
+    # changes to the geometry are used by the next projection
+    tilt_series.tilt_axis_angle = 0
+    tilt_series.properties['tilt_angle'] = 0
+    expected = centered[:, :2] + [60, 50] + tilt_series.shifts[:, np.newaxis]
+    assert_allclose(tilt_series.project(positions, tomogram_shape), expected, atol=1e-9)
+
+
+def test_visible_and_patches():
+    stack = np.arange(2 * 10 * 12, dtype=np.float32).reshape(2, 10, 12)
+    tilt_series = TiltSeriesBlock(stack, tilt_angles=[0, 0], shifts=[[0, 0], [100, 0]])
+    positions = np.array([[6, 5, 0], [0.5, 0.5, 0]])
+    assert tilt_series.visible(positions).tolist() == [[True, True], [False, False]]
+    assert tilt_series.visible(positions, margin=1).tolist() == [[True, False], [False, False]]
+
+    patches = tilt_series.extract_patches(positions, 4, cval=-1)
+    assert patches.shape == (2, 2, 4, 4)
+    assert_allclose(patches[0, 0], stack[0, 3:7, 4:8])
+    # partially outside the image
+    assert_allclose(patches[0, 1, 2:, 2:], stack[0, :2, :2])
+    assert np.all(patches[0, 1, :2] == -1)
+    # completely outside the image
+    assert np.all(patches[1] == -1)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from ..transforms import Affine, Identity, Scale, Shift, Binning, ComposedTransform
+from ..datablock import PointBlock, ImageBlock
+
+
+def test_transforms():
+    points = np.random.random((10, 3))
+    assert_allclose(Identity()(points), points)
+    assert_allclose(Scale(2)(points), points * 2)
+    assert_allclose(Scale([1, 2, 3])(points), points * [1, 2, 3])
+    assert_allclose(Shift([1, 2, 3])(points), points + [1, 2, 3])
+    assert_allclose(Binning(2)(points), points / 2)
+
+    # pixel centers of a 4 pixel row binned by 2 land on the centers of the binned pixels
+    centers = np.array([[0.5], [2.5]])
+    assert_allclose(Binning(2, centered=True)(centers), [[0], [1]])
+
+    rotation = np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]])
+    affine = Affine(rotation, [1, 0, 0])
+    assert_allclose(affine(points), points @ rotation.T + [1, 0, 0])
+    assert_allclose(affine.inverse(affine(points)), points)
+    assert_allclose(Binning(4).inverse(Binning(4)(points)), points)
+
+    # float32 points stay float32
+    assert Scale(2)(points.astype(np.float32)).dtype == np.float32
+
+
+def test_composed_transform():
+    points = np.random.random((10, 3))
+    composed = Shift([1, 2, 3]).then(Binning(2), Affine(np.diag([1, 2, 3])))
+    assert isinstance(composed, ComposedTransform)
+    # nothing is combined until the transform is used
+    assert 'parameters' not in vars(composed)
+    expected = ((points + [1, 2, 3]) / 2) @ np.diag([1, 2, 3])
+    assert_allclose(composed(points), expected)
+    assert not composed.is_diagonal
+
+    # nested compositions are flattened
+    nested = composed.then(Scale(2))
+    assert len(nested.transforms) == 4
+    assert_allclose(nested(points), expected * 2)
+
+    # diagonal transforms stay diagonal
+    assert Binning(2).then(Shift(1), Scale([1, 2, 3])).is_diagonal
+
+
+def test_point_block_units():
+    points = np.random.random((10, 3)) * 100
+    block = PointBlock(points, pixel_size=2)
+    assert block.transformed is block.data
+
+    # bin 1 picks at 2 A/px shown over bin 2, 4 and 8 tomograms
+    for binning in (2, 4, 8):
+        image = ImageBlock(None, ndim_spatial=3, pixel_size=2 * binning, loader=lambda: None)
+        assert_allclose(block.in_image(image), points / binning, rtol=1e-6)
+    # the stored data is never rewritten
+    assert_allclose(block.data, points)
+
+    block.transform = Shift([1, 1, 1])
+    assert_allclose(block.in_pixel_size(4), (points + 1) / 2, rtol=1e-6)
+    # unknown pixel sizes leave coordinates in the pixels of the image
+    image = ImageBlock(None, ndim_spatial=3, loader=lambda: None)
+    assert_allclose(block.in_image(image), points + 1, rtol=1e-6)
+
+    with pytest.raises(ValueError):
+        PointBlock(points).in_pixel_size(4)
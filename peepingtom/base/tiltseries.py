@@ -0,0 +1,215 @@
+"""
+Tilt series as stacks of 2d images with per-tilt metadata and projection of 3d positions into each tilt
+"""
+import numpy as np
+import pandas as pd
+
+from .datablock import PointBlock, ImageBlock
+from .groupblock import Particles
+from ..utils.mode_enums import ImageType
+
+
+class TiltSeriesBlock(ImageBlock):
+    """
+    Stack of tilt images (tilt, y, x) with the tilt angle and accumulated dose of each tilt
+
+    Like any ImageBlock a TiltSeriesBlock can be lazy, tilt(i) returns a single tilt image which only reads that
+    tilt from memory-mapped data (see read.read_tilt_series), so single tilts are available without loading stacks
+
+    per-tilt metadata is stored in properties as a DataFrame with one row per tilt and the columns
+    'tilt_angle' (degrees), 'dose' (accumulated dose, NaN if unknown), 'shift_x' and 'shift_y' (pixels)
+
+    3d positions (xyz, relative to the center of the tomogram) are projected into each tilt by rotating them
+    around the y axis by the tilt angle, rotating the result in the image plane by tilt_axis_angle (degrees,
+    counterclockwise, the angle of the tilt axis from the y axis of the images), and adding the per-tilt shifts
+    and the center of the images
+    """
+
+    def __init__(self, data, tilt_angles, dose=None, shifts=None, tilt_axis_angle=0, pixel_size=None,
+                 loader=None, shape=None, source=None, **kwargs):
+        """
+
+        Parameters
+        ----------
+        data : (n_tilts, y, x) ndarray or None if a loader is given
+        tilt_angles : (n_tilts,) array of tilt angles in degrees, in the order of the stack
+        dose : (n_tilts,) array of the dose accumulated at each tilt, None if unknown
+        shifts : (n_tilts, 2) array of xy shifts of the tilt images in pixels, None for no shifts
+        tilt_axis_angle : float, angle of the tilt axis from the y axis of the images in degrees
+        pixel_size : float, size of pixels in physical units
+        loader : callable taking no arguments which returns the stack
+        shape : tuple, shape of the stack if it is known before loading
+        source : path of the file the stack is read from, if any
+        kwargs : kwargs are passed to ImageBlock object
+        """
+        super().__init__(data, ndim_spatial=2, pixel_size=pixel_size, loader=loader, shape=shape,
+                         image_type=ImageType.tilt_series, source=source, **kwargs)
+        tilt_angles = np.asarray(tilt_angles, dtype=float).reshape(-1)
+        n_tilts = len(tilt_angles)
+        if self.shape is not None and self.shape[0] != n_tilts:
+            raise ValueError(f'got {n_tilts} tilt angles for a stack of {self.shape[0]} tilts')
+        dose = np.full(n_tilts, np.nan) if dose is None else np.broadcast_to(np.asarray(dose, dtype=float), n_tilts)
+        shifts = np.zeros((n_tilts, 2)) if shifts is None else np.asarray(shifts, dtype=float).reshape(n_tilts, 2)
+        self.properties = pd.DataFrame({'tilt_angle': tilt_angles, 'dose': dose,
+                                        'shift_x': shifts[:, 0], 'shift_y': shifts[:, 1]})
+        self.tilt_axis_angle = float(tilt_axis_angle)
+
+    @property
+    def n_tilts(self):
+        return len(self.properties)
+
+    @property
+    def tilt_angles(self):
+        return self.properties['tilt_angle'].to_numpy()
+
+    @property
+    def dose(self):
+        return self.properties['dose'].to_numpy()
+
+    @property
+    def shifts(self):
+        return self.properties[['shift_x', 'shift_y']].to_numpy()
+
+    def tilt(self, index):
+        """
+        Image of a single tilt, only this tilt is read from memory-mapped data
+
+        Returns (y, x) ndarray
+        -------
+
+        """
+        return np.asarray(self.data[index])
+
+    def tilt_order(self):
+        """
+        Indices of the tilts in order of accumulated dose, i.e. in order of acquisition if the dose is known,
+        otherwise in order of tilt angle
+
+        Returns (n_tilts,) ndarray
+        -------
+
+        """
+        if np.all(np.isfinite(self.dose)):
+            return np.argsort(self.dose, kind='stable')
+        return np.argsort(self.tilt_angles, kind='stable')
+
+    def _projection_linear(self):
+        """
+        (n_tilts, 2, 3) matrices projecting xyz positions onto the xy plane of each tilt image
+        calculated on every call as tilt angles and tilt_axis_angle can change
+        """
+        theta = np.deg2rad(self.tilt_angles)
+        # rotation around y followed by dropping z
+        tilt = np.zeros((self.n_tilts, 2, 3))
+        tilt[:, 0, 0] = np.cos(theta)
+        tilt[:, 0, 2] = np.sin(theta)
+        tilt[:, 1, 1] = 1
+        psi = np.deg2rad(self.tilt_axis_angle)
+        in_plane = np.array([[np.cos(psi), -np.sin(psi)], [np.sin(psi), np.cos(psi)]])
+        return in_plane @ tilt
+
+    def projection_matrices(self, tomogram_shape=None):
+        """
+        Affine projection matrices P of every tilt, which map xyz positions p in tomogram voxels to xy
+        positions in pixels of each tilt image as P[:, :, :3] @ p + P[:, :, 3]
+
+        Parameters
+        ----------
+        tomogram_shape : zyx shape of the tomogram in voxels of the size of the tilt image pixels,
+                         defaults to the size of the tilt images in x and y with the center at z = 0
+
+        Returns (n_tilts, 2, 4) ndarray
+        -------
+
+        """
+        image_center = np.array(self.shape[:0:-1], dtype=float) / 2
+        if tomogram_shape is None:
+            tomogram_center = np.append(image_center, 0)
+        else:
+            tomogram_center = np.asarray(tomogram_shape, dtype=float)[::-1] / 2
+        linear = self._projection_linear()
+        offset = image_center + self.shifts - linear @ tomogram_center
+        return np.concatenate([linear, offset[:, :, np.newaxis]], axis=2)
+
+    def _positions(self, positions):
+        # positions of Particles or a PointBlock are converted to the pixel size of the tilts if possible
+        if isinstance(positions, Particles):
+            positions = positions.positions
+        if isinstance(positions, PointBlock):
+            if positions.pixel_size is None or self.pixel_size is None:
+                return positions.transformed
+            return positions.in_pixel_size(self.pixel_size)
+        return np.asarray(positions, dtype=float)
+
+    def project(self, positions, tomogram_shape=None):
+        """
+        Project 3d positions into every tilt in one vectorised operation
+
+        Parameters
+        ----------
+        positions : (n, 3) array of xyz positions in tomogram voxels of the size of the tilt image pixels,
+                    PointBlock or Particles, which are converted to the pixel size of the tilts if both are known
+        tomogram_shape : zyx shape of the tomogram, see projection_matrices
+
+        Returns (n_tilts, n, 2) ndarray of xy positions in pixels of each tilt image
+        -------
+
+        """
+        positions = self._positions(positions)
+        matrices = self.projection_matrices(tomogram_shape)
+        return np.einsum('tij,nj->tni', matrices[:, :, :3], positions) + matrices[:, np.newaxis, :, 3]
+
+    def visible(self, positions, tomogram_shape=None, margin=0):
+        """
+        Which positions project inside each tilt image
+
+        Parameters
+        ----------
+        positions : positions as accepted by project
+        tomogram_shape : zyx shape of the tomogram, see projection_matrices
+        margin : float, minimum distance in pixels from the edges of the images
+
+        Returns (n_tilts, n) boolean ndarray
+        -------
+
+        """
+        projected = self.project(positions, tomogram_shape)
+        size = np.array(self.shape[:0:-1], dtype=float)
+        return np.all((projected >= margin) & (projected < size - margin), axis=-1)
+
+    def extract_patches(self, positions, box_size, tomogram_shape=None, tilts=None, cval=0):
+        """
+        Extract 2d patches centered on the projections of positions in each tilt
+
+        Only the rows of the images covered by the patches are read from memory-mapped data
+
+        Parameters
+        ----------
+        positions : positions as accepted by project
+        box_size : int or tuple, size of the patches (yx)
+        tomogram_shape : zyx shape of the tomogram, see projection_matrices
+        tilts : indices of the tilts to extract from, defaults to all tilts
+        cval : value of pixels outside the images
+
+        Returns (n_tilts, n, y, x) float32 ndarray of patches
+        -------
+
+        """
+        box_shape = np.broadcast_to(np.asarray(box_size, dtype=int), 2)
+        if tilts is None:
+            tilts = np.arange(self.n_tilts)
+        tilts = np.asarray(tilts)
+        # nearest pixel to the center of each box, boxes are centered at size // 2
+        projected = self.project(positions, tomogram_shape)[tilts]
+        starts = np.floor(projected[..., ::-1]).astype(int) - box_shape // 2
+        image_shape = np.array(self.shape[1:])
+        patches = np.full((len(tilts), projected.shape[1], *box_shape), cval, dtype=np.float32)
+        data = self.data
+        for t, tilt in enumerate(tilts):
+            lower = np.clip(starts[t], 0, image_shape)
+            upper = np.clip(starts[t] + box_shape, 0, image_shape)
+            for n in np.flatnonzero(np.all(upper > lower, axis=-1)):
+                (y0, x0), (y1, x1) = lower[n], upper[n]
+                dy, dx = lower[n] - starts[t, n]
+                patches[t, n, dy:dy + y1 - y0, dx:dx + x1 - x0] = data[tilt, y0:y1, x0:x1]
+        return patches
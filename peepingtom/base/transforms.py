@@ -0,0 +1,183 @@
+"""
+Coordinate transforms which can be attached to PointBlock objects
+
+Transforms are affine maps x' = Ax + b of points in the (n, m) layout of PointBlock data. They are composed lazily:
+composing transforms only records them, the combined A and b are calculated once when the transform is first
+applied and points are then transformed in a single vectorised multiply-add
+"""
+from abc import ABC, abstractmethod
+from functools import cached_property
+
+import numpy as np
+
+
+def _as_matrix(linear, ndim):
+    # diagonal (scalar or (m,)) linear parts are expanded to (m, m) matrices
+    if linear.ndim == 2:
+        return linear
+    return np.diag(np.broadcast_to(linear, (ndim,)).astype(float))
+
+
+def _combine(first, second):
+    """
+    linear part and offset of applying the transform with parameters first, then second
+    """
+    (a1, b1), (a2, b2) = first, second
+    if a1.ndim < 2 and a2.ndim < 2:
+        # diagonal transforms compose elementwise
+        return a2 * a1, a2 * b1 + b2
+    ndim = a1.shape[0] if a1.ndim == 2 else a2.shape[0]
+    a1, a2 = _as_matrix(a1, ndim), _as_matrix(a2, ndim)
+    return a2 @ a1, a2 @ np.broadcast_to(b1, (ndim,)) + b2
+
+
+class Transform(ABC):
+    """
+    Base class for affine coordinate transforms
+
+    Transform objects are callables which map (n, m) arrays of points to transformed points,
+    subclasses implement _parameters which returns the linear part A and offset b of x' = Ax + b
+    A is a scalar or (m,) array for transforms which scale each axis independently or an (m, m) matrix
+    """
+
+    @abstractmethod
+    def _parameters(self):
+        pass
+
+    @cached_property
+    def parameters(self):
+        """
+        (linear part, offset) of the transform as arrays, calculated on first access
+        """
+        linear, offset = self._parameters()
+        return np.asarray(linear, dtype=float), np.asarray(offset, dtype=float)
+
+    @property
+    def is_diagonal(self):
+        return self.parameters[0].ndim < 2
+
+    def __call__(self, points):
+        """
+        Apply the transform to points
+
+        Parameters
+        ----------
+        points : (n, m) array of points
+
+        Returns (n, m) array of transformed points, floating point input keeps its dtype
+        -------
+
+        """
+        points = np.asarray(points)
+        dtype = points.dtype if points.dtype.kind == 'f' else np.dtype(float)
+        linear, offset = self.parameters
+        if linear.ndim == 2:
+            transformed = points @ linear.astype(dtype).T
+        else:
+            transformed = points * linear.astype(dtype)
+        if np.any(offset):
+            transformed += offset.astype(dtype)
+        return transformed
+
+    def then(self, *transforms):
+        """
+        Compose this transform with transforms applied after it, nothing is calculated until the result is applied
+
+        Returns ComposedTransform
+        -------
+
+        """
+        return ComposedTransform(self, *transforms)
+
+    @property
+    def inverse(self):
+        """
+        Transform which undoes this transform
+        """
+        linear, offset = self.parameters
+        if linear.ndim < 2:
+            return Affine(1 / linear, -offset / linear)
+        inverse = np.linalg.inv(linear)
+        return Affine(inverse, -inverse @ np.broadcast_to(offset, (len(linear),)))
+
+    def __repr__(self):
+        linear, offset = self.parameters
+        return f'{type(self).__name__}(linear={linear.tolist()}, offset={offset.tolist()})'
+
+
+class Affine(Transform):
+    """
+    Affine transform x' = Ax + b
+
+    linear can be a scalar, an (m,) array of scale factors per axis or an (m, m) matrix,
+    axes are in the order of the points (xyz for 3d PointBlock data)
+    """
+    def __init__(self, linear=1, offset=0):
+        self.linear = linear
+        self.offset = offset
+
+    def _parameters(self):
+        return self.linear, self.offset
+
+
+class Identity(Affine):
+    def __init__(self):
+        super().__init__()
+
+
+class Scale(Affine):
+    """
+    Scale points about the origin by a scalar or by a factor per axis
+    """
+    def __init__(self, factor):
+        super().__init__(linear=factor)
+
+    @classmethod
+    def between_pixel_sizes(cls, pixel_size_from, pixel_size_to):
+        """
+        Scale from coordinates in pixels of size pixel_size_from to pixels of size pixel_size_to
+        """
+        return cls(pixel_size_from / pixel_size_to)
+
+
+class Shift(Affine):
+    """
+    Shift points by a vector
+    """
+    def __init__(self, shift):
+        super().__init__(offset=shift)
+
+
+class Binning(Affine):
+    """
+    Convert coordinates in pixels of an image to pixels of the same image binned by factor
+
+    factor can be below 1 to convert from binned to unbinned pixels
+    if centered, coordinates are indices of pixel centers (the center of the first pixel is 0),
+    otherwise the corner of the first pixel is at 0 and coordinates are simply divided by factor
+    """
+    def __init__(self, factor, centered=False):
+        self.factor = factor
+        self.centered = centered
+        scale = 1 / np.asarray(factor, dtype=float)
+        super().__init__(linear=scale, offset=(scale - 1) / 2 if centered else 0)
+
+
+class ComposedTransform(Transform):
+    """
+    Transforms applied one after another, combined into one transform when first applied
+    """
+    def __init__(self, *transforms):
+        # flatten nested compositions so that each transform is combined only once
+        self.transforms = []
+        for transform in transforms:
+            if isinstance(transform, ComposedTransform):
+                self.transforms.extend(transform.transforms)
+            else:
+                self.transforms.append(transform)
+
+    def _parameters(self):
+        parameters = (np.asarray(1.), np.asarray(0.))
+        for transform in self.transforms:
+            parameters = _combine(parameters, transform.parameters)
+        return parameters
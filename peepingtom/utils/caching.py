@@ -0,0 +1,192 @@
+"""
+Caches with bounded residency for large data
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread safe mapping which evicts least recently used entries once a byte budget or number of entries is exceeded
+
+    Every entry has a size in bytes given when it is added, entries can be pinned to protect them from eviction
+    on_evict(key, value) is called for every entry evicted to make room for new ones
+    hits, misses and evictions are counted and reported by stats()
+    """
+    def __init__(self, max_bytes=None, max_items=None, on_evict=None):
+        """
+
+        Parameters
+        ----------
+        max_bytes : int, maximum total size of all entries in bytes, None for no limit
+        max_items : int, maximum number of entries, None for no limit
+        on_evict : callable on_evict(key, value) called when an entry is evicted
+        """
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._pinned = set()
+        self._lock = threading.RLock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def items(self):
+        """
+        list of (key, value, nbytes) tuples from least to most recently used, does not count as use
+        """
+        with self._lock:
+            return [(key, value, nbytes) for key, (value, nbytes) in self._entries.items()]
+
+    def get(self, key, default=None):
+        """
+        get the value for key and mark it as most recently used
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._touch(key)
+            return self._entries[key][0]
+
+    def put(self, key, value, nbytes=0):
+        """
+        add or replace an entry of size nbytes and evict other entries as necessary
+        """
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries[key][1]
+            self._entries[key] = (value, nbytes)
+            self._touch(key)
+            self.total_bytes += nbytes
+            evicted = self._evict(protect=key)
+        self._notify(evicted)
+
+    def pop(self, key, default=None):
+        """
+        remove an entry without calling on_evict and return its value
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value, nbytes = self._entries.pop(key)
+            self._pinned.discard(key)
+            self._forget(key)
+            self.total_bytes -= nbytes
+            return value
+
+    def pin(self, key):
+        """
+        protect key from eviction, key does not need to be in the cache yet
+        """
+        with self._lock:
+            self._pinned.add(key)
+
+    def unpin(self, key):
+        with self._lock:
+            self._pinned.discard(key)
+            evicted = self._evict()
+        self._notify(evicted)
+
+    def clear(self):
+        """
+        evict all entries, including pinned ones
+        """
+        with self._lock:
+            evicted = [(key, value) for key, (value, _) in self._entries.items()]
+            for key, _ in evicted:
+                self._forget(key)
+            self._entries.clear()
+            self._pinned.clear()
+            self.total_bytes = 0
+        self._notify(evicted)
+
+    def stats(self):
+        """
+        dict of hits, misses, hit_rate, evictions, entries and bytes
+        """
+        with self._lock:
+            n_requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / n_requests if n_requests else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+            }
+
+    def _touch(self, key):
+        # mark key as used
+        self._entries.move_to_end(key)
+
+    def _forget(self, key):
+        # drop any bookkeeping for a removed key
+        pass
+
+    def _over_budget(self):
+        over_bytes = self.max_bytes is not None and self.total_bytes > self.max_bytes
+        over_items = self.max_items is not None and len(self._entries) > self.max_items
+        return over_bytes or over_items
+
+    def _eviction_candidates(self):
+        """
+        keys in the order in which they should be evicted
+        """
+        return list(self._entries)
+
+    def _evict(self, protect=None):
+        # must be called with the lock held, returns evicted entries so callbacks can run outside the lock
+        evicted = []
+        for key in self._eviction_candidates():
+            if not self._over_budget():
+                break
+            if key in self._pinned or key == protect:
+                continue
+            value, nbytes = self._entries.pop(key)
+            self._forget(key)
+            self.total_bytes -= nbytes
+            self.evictions += 1
+            evicted.append((key, value))
+        return evicted
+
+    def _notify(self, evicted):
+        if self.on_evict is None:
+            return
+        for key, value in evicted:
+            self.on_evict(key, value)
+
+
+class LFUCache(LRUCache):
+    """
+    Like LRUCache, but evicts the least frequently used entries first, ties are broken by least recent use
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counts = {}
+
+    def _touch(self, key):
+        super()._touch(key)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _forget(self, key):
+        self._counts.pop(key, None)
+
+    def _eviction_candidates(self):
+        # entries are ordered by recency, sorting is stable so ties keep that order
+        return sorted(self._entries, key=lambda key: self._counts.get(key, 0))
@@ -1,3 +1,7 @@
 dynamo_table_coordinate_headings = ['x', 'y', 'z']
 dynamo_table_shift_headings = ['dx', 'dy', 'dz']
 dynamo_euler_angle_headings = ['tdrot', 'tilt', 'narot']
+# first 26 columns of a Dynamo table, in order
+dynamo_table_column_headings = ['tag', 'aligned_value', 'averaged_value', 'dx', 'dy', 'dz', 'tdrot', 'tilt', 'narot',
+                                'cc', 'cc2', 'cpu', 'ftype', 'ymintilt', 'ymaxtilt', 'xmintilt', 'xmaxtilt', 'fs1',
+                                'fs2', 'tomo', 'reg', 'class', 'annotation', 'x', 'y', 'z']
@@ -2,4 +2,4 @@ relion_coordinate_headings_2d = [f'rlnCoordinate{axis}' for axis in 'XY']
 relion_shift_headings_2d =  [f'rlnOrigin{axis}' for axis in 'XY']
 relion_coordinate_headings_3d = [f'rlnCoordinate{axis}' for axis in 'XYZ']
 relion_shift_headings_3d = [f'rlnOrigin{axis}' for axis in 'XYZ']
-relion_euler_angle_headings = [f'rlnAngle{angle}' for angle in ('Rot', 'Tilt', 'Phi')]
\ No newline at end of file
+relion_euler_angle_headings = [f'rlnAngle{angle}' for angle in ('Rot', 'Tilt', 'Psi')]
\ No newline at end of file
@@ -0,0 +1,126 @@
+import numpy as np
+
+# default floating point precision for data stored in DataBlock objects
+_float_dtype = np.dtype(np.float64)
+
+
+def get_float_dtype():
+    """
+    Get the default floating point dtype used for storing data in DataBlock objects
+
+    Returns numpy dtype
+    -------
+
+    """
+    return _float_dtype
+
+
+def set_float_dtype(dtype):
+    """
+    Set the default floating point dtype used for storing data in DataBlock objects
+    e.g. np.float32 halves the memory used by particle positions and orientations
+
+    Parameters
+    ----------
+    dtype : floating point dtype or str
+
+    """
+    global _float_dtype
+    dtype = np.dtype(dtype)
+    if not np.issubdtype(dtype, np.floating):
+        raise ValueError(f'dtype must be a floating point type, got {dtype}')
+    _float_dtype = dtype
+
+
+def as_float_array(data, dtype=None, contiguous=False):
+    """
+    Cast data as a floating point array without copying if it already has the requested dtype (and layout)
+
+    Parameters
+    ----------
+    data : array-like object
+    dtype : floating point dtype, defaults to the value from get_float_dtype
+    contiguous : bool, if True the returned array is guaranteed to be C contiguous
+
+    Returns ndarray
+    -------
+
+    """
+    if dtype is None:
+        dtype = _float_dtype
+    if contiguous:
+        return np.ascontiguousarray(data, dtype=dtype)
+    return np.asarray(data, dtype=dtype)
+
+
+def iter_chunks(shape, chunk_shape, halo=0):
+    """
+    Iterate over a grid of chunks covering an array of a given shape
+
+    Parameters
+    ----------
+    shape : tuple, shape of the array
+    chunk_shape : int or tuple, shape of each chunk, chunks at the end of an axis may be smaller
+    halo : int or tuple, number of elements added around each chunk, clipped at the edges of the array
+
+    Returns generator of (core, padded) tuples of slices, core is the region of the array covered by the chunk
+    and padded the same region extended by the halo
+    -------
+
+    """
+    ndim = len(shape)
+    chunk_shape = np.broadcast_to(chunk_shape, ndim)
+    halo = np.broadcast_to(halo, ndim)
+    starts = [range(0, size, step) for size, step in zip(shape, chunk_shape)]
+    for start in np.stack(np.meshgrid(*starts, indexing='ij'), axis=-1).reshape(-1, ndim):
+        stop = np.minimum(start + chunk_shape, shape)
+        core = tuple(slice(int(a), int(b)) for a, b in zip(start, stop))
+        padded = tuple(slice(int(max(a - h, 0)), int(min(b + h, size)))
+                       for a, b, h, size in zip(start, stop, halo, shape))
+        yield core, padded
+
+
+def strided_sample(data, max_samples=2 ** 20):
+    """
+    Sample an array on a regular grid with the same stride along every axis, so that at most about max_samples
+    elements are read, e.g. from memory-mapped data
+
+    Returns ndarray of the sampled elements with the dimensionality of data
+    -------
+
+    """
+    size = int(np.prod(data.shape))
+    stride = max(1, int(np.ceil((size / max_samples) ** (1 / max(data.ndim, 1)))))
+    return np.asarray(data[(slice(None, None, stride),) * data.ndim])
+
+
+def sampled_statistics(data, max_samples=2 ** 20, percentiles=(0.5, 99.5), bins=256):
+    """
+    Intensity statistics of an array estimated from a strided sample (see strided_sample)
+
+    Parameters
+    ----------
+    data : array-like
+    max_samples : int, approximate maximum number of elements read
+    percentiles : (low, high) percentiles used as contrast limits
+    bins : int, number of bins of the histogram
+
+    Returns dict with 'contrast_limits' (low, high), 'min', 'max', 'mean', 'std', 'histogram' (counts, bin edges)
+    and 'n_samples', non-finite values are ignored
+    -------
+
+    """
+    sample = strided_sample(data, max_samples).ravel()
+    if sample.dtype.kind in 'fc':
+        sample = sample[np.isfinite(sample)]
+    if sample.size == 0:
+        sample = np.zeros(1)
+    low, high = (float(value) for value in np.percentile(sample, percentiles))
+    if high <= low:
+        # constant images still need a valid range for display
+        high = low + 1
+    minimum, maximum = float(sample.min()), float(sample.max())
+    counts, edges = np.histogram(sample, bins=bins, range=(minimum, max(maximum, minimum + 1)))
+    return {'contrast_limits': (low, high), 'min': minimum, 'max': maximum,
+            'mean': float(sample.mean(dtype=np.float64)), 'std': float(sample.std(dtype=np.float64)),
+            'histogram': (counts, edges), 'n_samples': int(sample.size)}
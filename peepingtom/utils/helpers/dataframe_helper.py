@@ -8,6 +8,8 @@ from ..constants import relion_coordinate_headings_3d, relion_shift_headings_3d,
     dynamo_euler_angle_headings
 
 from ..exceptions import DataFrameError
+from .array_helper import get_float_dtype
+from ..instrumentation import instrument
 
 
 def _check_mode(mode):
@@ -16,7 +18,8 @@ def _check_mode(mode):
         raise ValueError(f'mode can only be one of {modes}; got {mode}')
 
 
-def df_to_xyz(df: pd.DataFrame, mode: str):
+@instrument()
+def df_to_xyz(df: pd.DataFrame, mode: str, dtype=None):
     """
 
     Parameters
@@ -25,6 +28,8 @@ def df_to_xyz(df: pd.DataFrame, mode: str):
 
     mode: one of 'relion', 'dynamo'
 
+    dtype: floating point dtype of the output, defaults to the value from array_helper.get_float_dtype
+
     Returns (n, 3) ndarray of xyz positions from the DataFrame
     -------
 
@@ -42,11 +47,18 @@ def df_to_xyz(df: pd.DataFrame, mode: str):
     if not columns_in_df(coord_columns[mode], df):
         raise DataFrameError("Could not get coordinates from DataFrame")
 
-    positions = df[coord_columns[mode]] + df.get(shift_columns[mode], 0)
+    if dtype is None:
+        dtype = get_float_dtype()
+    positions = df[coord_columns[mode]].to_numpy(dtype=dtype)
+
+    # add shifts in place, avoiding intermediate DataFrames
+    if columns_in_df(shift_columns[mode], df):
+        positions += df[shift_columns[mode]].to_numpy(dtype=dtype)
 
-    return positions.to_numpy()
+    return positions
 
 
+@instrument()
 def df_to_euler_angles(df: pd.DataFrame, mode: str):
     """
 
@@ -69,6 +81,7 @@ def df_to_euler_angles(df: pd.DataFrame, mode: str):
     return euler_angles.to_numpy()
 
 
+@instrument()
 def euler_angles_to_rotation_matrices(euler_angles: np.ndarray, mode: str):
     """
 
@@ -88,6 +101,49 @@ def euler_angles_to_rotation_matrices(euler_angles: np.ndarray, mode: str):
     return euler2matrix(euler_angles, **euler_kwargs[mode])
 
 
+@instrument()
+def rotation_matrices_to_euler_angles(rotation_matrices: np.ndarray, mode: str):
+    """
+    Inverse of euler_angles_to_rotation_matrices, computed in one vectorised pass
+
+    Parameters
+    ----------
+    rotation_matrices : (n, 3, 3) ndarray of rotation matrices which premultiply column vectors [x, y, z]
+
+    mode: one of 'relion' (intrinsic zyz) or 'dynamo' (intrinsic zxz)
+
+    Returns (n, 3) ndarray of euler angles in degrees, the second angle in [0, 180] and the others in [-180, 180]
+            where the second angle is 0 or 180 (gimbal lock) the third angle is set to 0
+    -------
+
+    """
+    _check_mode(mode)
+    rotation_matrices = np.asarray(rotation_matrices)
+    # angles can't be resolved more precisely than the input
+    dtype = rotation_matrices.dtype if np.issubdtype(rotation_matrices.dtype, np.floating) else np.dtype(float)
+    eps = np.sqrt(np.finfo(dtype).eps)
+    r = rotation_matrices.reshape(-1, 3, 3).astype(float)
+
+    # R = Rz(a) R2(b) Rz(c) with R2 = Ry for 'relion' and Rx for 'dynamo'
+    if mode == 'relion':
+        sin_a, cos_a = r[:, 1, 2], r[:, 0, 2]
+        sin_c, cos_c = r[:, 2, 1], -r[:, 2, 0]
+        # R = Rz(a) for b = 0 or Rz(a) Ry(180) for b = 180, with c = 0
+        gimbal_a = np.arctan2(-r[:, 0, 1], r[:, 1, 1])
+    else:
+        sin_a, cos_a = r[:, 0, 2], -r[:, 1, 2]
+        sin_c, cos_c = r[:, 2, 0], r[:, 2, 1]
+        gimbal_a = np.arctan2(r[:, 1, 0], r[:, 0, 0])
+    # each pair above is scaled by sin(b) >= 0
+    sin_b = np.hypot(sin_a, cos_a)
+    b = np.arctan2(sin_b, r[:, 2, 2])
+    gimbal = sin_b < eps
+    a = np.where(gimbal, gimbal_a, np.arctan2(sin_a, cos_a))
+    c = np.where(gimbal, 0, np.arctan2(sin_c, cos_c))
+    return np.rad2deg(np.stack([a, b, c], axis=1))
+
+
+@instrument()
 def df_to_rotation_matrices(df: pd.DataFrame, mode: str):
     """
 
@@ -104,6 +160,7 @@ def df_to_rotation_matrices(df: pd.DataFrame, mode: str):
     return rotation_matrices
 
 
+@instrument()
 def df_split_on_volume(df: pd.DataFrame):
     """
 
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+def normalise(vectors: np.ndarray):
+    """
+    Normalise vectors to unit length along the last axis
+
+    Parameters
+    ----------
+    vectors : (..., m) ndarray of vectors
+
+    Returns (..., m) ndarray of unit vectors
+    -------
+
+    """
+    vectors = np.asarray(vectors, dtype=float)
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def rotation_matrices_from_z_vectors(z_vectors: np.ndarray):
+    """
+    Construct rotation matrices which rotate the z axis onto each of a set of vectors
+
+    The rotation around each vector is fixed by choosing an x axis perpendicular to both the vector and a
+    reference axis, the reference is the x axis unless the vector is close to parallel with it
+
+    Parameters
+    ----------
+    z_vectors : (n, 3) ndarray of vectors, need not be normalised
+
+    Returns (n, 3, 3) ndarray of rotation matrices R which satisfy R @ [0, 0, 1] = z / |z|
+    -------
+
+    """
+    z = normalise(np.atleast_2d(z_vectors))
+
+    # choose a reference axis for each vector which is not close to parallel with it
+    reference = np.zeros_like(z)
+    parallel_to_x = np.abs(z[:, 0]) > 0.9
+    reference[~parallel_to_x, 0] = 1
+    reference[parallel_to_x, 1] = 1
+
+    y = normalise(np.cross(z, reference))
+    x = np.cross(y, z)
+
+    # stack basis vectors as columns of each matrix
+    return np.stack([x, y, z], axis=-1)
+
+
+def rotation_matrices_around_z(angles: np.ndarray):
+    """
+    Construct rotation matrices for rotations around the z axis
+
+    Parameters
+    ----------
+    angles : (n,) ndarray of angles in radians, positive angles rotate counterclockwise
+
+    Returns (n, 3, 3) ndarray of rotation matrices
+    -------
+
+    """
+    angles = np.atleast_1d(angles)
+    cos, sin = np.cos(angles), np.sin(angles)
+    matrices = np.zeros((len(angles), 3, 3))
+    matrices[:, 0, 0] = cos
+    matrices[:, 0, 1] = -sin
+    matrices[:, 1, 0] = sin
+    matrices[:, 1, 1] = cos
+    matrices[:, 2, 2] = 1
+    return matrices
@@ -0,0 +1,195 @@
+"""
+Opt-in timing, call counting and allocation estimates for hot paths
+
+Instrumentation is disabled by default, instrumented functions then only pay for one flag check per call.
+Enable it with enable() or by setting the environment variable PEEPINGTOM_INSTRUMENT=1
+
+    from peepingtom.utils import instrumentation
+    instrumentation.enable()
+    peeper = zip2peep(mrc_paths, star_paths)
+    print(instrumentation.format_report())
+    instrumentation.export('timings.json')
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+_enabled = os.environ.get('PEEPINGTOM_INSTRUMENT', '') not in ('', '0')
+_lock = threading.Lock()
+_timings = {}
+_counters = {}
+
+
+class _Timing:
+    __slots__ = ('calls', 'total', 'max', 'nbytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.nbytes = 0
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """
+    discard all recorded timings and counters
+    """
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+
+
+def estimate_nbytes(obj, _depth=0):
+    """
+    Estimate the number of bytes held by arrays in an object
+
+    Looks into ndarrays, DataFrames, objects with a 'data' attribute (e.g. DataBlocks) and containers of those
+
+    Parameters
+    ----------
+    obj : any object
+
+    Returns int, estimated number of bytes
+    -------
+
+    """
+    if _depth > 3:
+        return 0
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(index=False, deep=False).sum())
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(v, _depth + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(v, _depth + 1) for v in obj)
+    data = getattr(obj, 'data', None)
+    if data is not None and data is not obj:
+        return estimate_nbytes(data, _depth + 1)
+    return 0
+
+
+def _record(name, elapsed, nbytes=0):
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = _timings[name] = _Timing()
+        timing.calls += 1
+        timing.total += elapsed
+        timing.max = max(timing.max, elapsed)
+        timing.nbytes += nbytes
+
+
+@contextmanager
+def timer(name):
+    """
+    context manager which records the time spent in its body under name, if instrumentation is enabled
+    """
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    """
+    increment the counter name by n, if instrumentation is enabled
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def instrument(name=None):
+    """
+    Decorator recording calls, wall time and an estimate of the bytes returned by a function
+
+    Parameters
+    ----------
+    name : str, name under which timings are recorded, defaults to module.qualname of the function
+
+    """
+    def decorator(func):
+        timing_name = name or f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            _record(timing_name, time.perf_counter() - start, estimate_nbytes(result))
+            return result
+
+        return wrapper
+    return decorator
+
+
+def report():
+    """
+    Get recorded timings and counters
+
+    Returns dict {'timings': {name: {calls, total_s, mean_s, max_s, bytes}}, 'counters': {name: count}}
+    -------
+
+    """
+    with _lock:
+        timings = {
+            name: {
+                'calls': t.calls,
+                'total_s': t.total,
+                'mean_s': t.total / t.calls,
+                'max_s': t.max,
+                'bytes': t.nbytes,
+            }
+            for name, t in _timings.items()
+        }
+        counters = dict(_counters)
+    return {'timings': timings, 'counters': counters}
+
+
+def format_report():
+    """
+    Format recorded timings (sorted by total time) and counters as a table
+    """
+    data = report()
+    lines = [f"{'name':<60} {'calls':>8} {'total (s)':>10} {'mean (s)':>10} {'max (s)':>10} {'MB':>10}"]
+    for name, t in sorted(data['timings'].items(), key=lambda item: -item[1]['total_s']):
+        lines.append(f"{name:<60} {t['calls']:>8} {t['total_s']:>10.4f} {t['mean_s']:>10.4f} "
+                     f"{t['max_s']:>10.4f} {t['bytes'] / 1e6:>10.2f}")
+    for name, n in sorted(data['counters'].items()):
+        lines.append(f'{name:<60} {n:>8}')
+    return '\n'.join(lines)
+
+
+def export(path):
+    """
+    write the report to a json file
+    """
+    with open(path, 'w') as f:
+        json.dump(report(), f, indent=2)
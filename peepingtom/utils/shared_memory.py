@@ -0,0 +1,134 @@
+"""
+Sharing of large arrays with worker processes without pickling them
+
+Arrays are written once to memory-mapped .npy files in shared memory (/dev/shm where available), or shared by
+reference to the file they are already memory-mapped from, and worker processes attach to them by path,
+so the data is never copied through pipes
+"""
+import mmap
+import os
+import tempfile
+import uuid
+import weakref
+
+import numpy as np
+
+
+def _shared_directory():
+    # tmpfs backed files live in memory, fall back to the temporary directory elsewhere
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def _noop():
+    pass
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _file_backed_spec(array):
+    """
+    spec of the region of a file an array is memory-mapped from, None if it is not a contiguous file mapping
+    """
+    if not isinstance(array, np.memmap) or array.filename is None or not array.flags.c_contiguous:
+        return None
+    mapping = getattr(array, '_mmap', None)
+    if mapping is None:
+        return None
+    # np.memmap maps from the allocation granularity boundary below its offset, views share the mapping
+    start = array.offset - array.offset % mmap.ALLOCATIONGRANULARITY
+    base = np.frombuffer(mapping, dtype=np.uint8)
+    offset = start + array.ctypes.data - base.ctypes.data
+    return ('file', array.filename, int(offset), array.shape, array.dtype.str)
+
+
+class SharedArray:
+    """
+    Array in a memory-mapped file which other processes can attach to with SharedArray.attach(spec)
+
+    Arrays which are already memory-mapped from a file (e.g. mrc files opened with mrcfile.mmap) are shared
+    by reference to that file without copying. Other arrays are copied into a new file in shared memory,
+    which is removed by release(), when the SharedArray is garbage collected or at interpreter exit,
+    whichever comes first. SharedArray can be used as a context manager
+    """
+    def __init__(self, array, directory=None, copy=False):
+        """
+
+        Parameters
+        ----------
+        array : array-like object to share
+        directory : directory for the backing file, defaults to /dev/shm where available
+        copy : bool, copy arrays which are memory-mapped from a file rather than sharing the file
+        """
+        self._spec = None if copy else _file_backed_spec(array)
+        array = np.asarray(array)
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.nbytes = array.nbytes
+        if self._spec is not None:
+            self._finalizer = weakref.finalize(self, _noop)
+            return
+        mapped = self._create(directory)
+        mapped[...] = array
+        mapped.flush()
+
+    @classmethod
+    def empty(cls, shape, dtype, directory=None):
+        """
+        create an uninitialised shared array, attach it with writeable=True to fill it from other processes
+        """
+        shared = cls.__new__(cls)
+        shared._spec = None
+        shared.shape = tuple(int(size) for size in shape)
+        shared.dtype = np.dtype(dtype)
+        shared.nbytes = int(np.prod(shape)) * shared.dtype.itemsize
+        shared._create(directory)
+        return shared
+
+    def _create(self, directory):
+        if directory is None:
+            directory = _shared_directory()
+        path = os.path.join(directory, f'peepingtom-{os.getpid()}-{uuid.uuid4().hex}.npy')
+        self._finalizer = weakref.finalize(self, _remove, path)
+        self._spec = path
+        return np.lib.format.open_memmap(path, mode='w+', dtype=self.dtype, shape=self.shape)
+
+    @property
+    def spec(self):
+        """
+        picklable description of the shared array, pass it to SharedArray.attach in another process
+        """
+        return self._spec
+
+    @staticmethod
+    def attach(spec, writeable=False):
+        """
+        map a shared array into this process without copying, the returned array is read-only unless writeable
+        """
+        if isinstance(spec, tuple):
+            _, filename, offset, shape, dtype = spec
+            return np.memmap(filename, mode='r+' if writeable else 'r', dtype=dtype, offset=offset, shape=shape)
+        return np.load(spec, mmap_mode='r+' if writeable else 'r')
+
+    @property
+    def released(self):
+        return not self._finalizer.alive
+
+    def release(self):
+        """
+        remove the backing file, processes which already attached keep their mapping
+        files which were shared by reference are never removed
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
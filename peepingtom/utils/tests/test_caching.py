@@ -0,0 +1,44 @@
+from ..caching import LRUCache
+
+
+def test_lru_cache():
+    evicted = []
+    cache = LRUCache(max_bytes=100, on_evict=lambda key, value: evicted.append(key))
+    cache.put('a', 1, nbytes=40)
+    cache.put('b', 2, nbytes=40)
+    assert cache.total_bytes == 80
+
+    # touching 'a' makes 'b' the least recently used
+    assert cache.get('a') == 1
+    cache.put('c', 3, nbytes=40)
+    assert evicted == ['b']
+    assert 'b' not in cache
+    assert cache.keys() == ['a', 'c']
+    assert cache.total_bytes == 80
+
+    # replacing an entry updates its size
+    cache.put('a', 1, nbytes=10)
+    assert cache.total_bytes == 50
+
+    assert cache.pop('a') == 1
+    assert cache.get('a', 'missing') == 'missing'
+    assert evicted == ['b']
+
+
+def test_lru_cache_pinning():
+    evicted = []
+    cache = LRUCache(max_items=2, on_evict=lambda key, value: evicted.append(key))
+    cache.put('a', 1)
+    cache.pin('a')
+    cache.put('b', 2)
+    cache.put('c', 3)
+    assert evicted == ['b']
+    assert 'a' in cache
+
+    cache.unpin('a')
+    cache.put('d', 4)
+    assert evicted == ['b', 'a']
+
+    cache.clear()
+    assert len(cache) == 0
+    assert sorted(evicted) == ['a', 'b', 'c', 'd']
@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+
+from .. import instrumentation
+
+
+def test_instrumentation():
+    @instrumentation.instrument('ones')
+    def ones(n):
+        return np.ones(n)
+
+    instrumentation.reset()
+    instrumentation.disable()
+
+    # nothing is recorded when disabled
+    ones(10)
+    instrumentation.count('counter')
+    with instrumentation.timer('block'):
+        pass
+    assert instrumentation.report() == {'timings': {}, 'counters': {}}
+
+    instrumentation.enable()
+    try:
+        ones(10)
+        ones(20)
+        instrumentation.count('counter', 5)
+        with instrumentation.timer('block'):
+            pass
+    finally:
+        instrumentation.disable()
+
+    report = instrumentation.report()
+    assert report['timings']['ones']['calls'] == 2
+    assert report['timings']['ones']['bytes'] == 30 * 8
+    assert report['timings']['block']['calls'] == 1
+    assert report['counters']['counter'] == 5
+    assert 'ones' in instrumentation.format_report()
+
+    instrumentation.reset()
+    assert instrumentation.report() == {'timings': {}, 'counters': {}}
+
+
+def test_instrumentation_export(tmp_path):
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        instrumentation.count('counter')
+    finally:
+        instrumentation.disable()
+    path = tmp_path / 'report.json'
+    instrumentation.export(path)
+    with open(path) as f:
+        assert json.load(f)['counters'] == {'counter': 1}
+    instrumentation.reset()
+
+
+def test_estimate_nbytes():
+    arrays = [np.ones(10), (np.ones(5), {'a': np.ones(5)})]
+    assert instrumentation.estimate_nbytes(arrays) == 20 * 8
+    assert instrumentation.estimate_nbytes('string') == 0
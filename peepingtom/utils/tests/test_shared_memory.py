@@ -0,0 +1,44 @@
+import os
+import pickle
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ..shared_memory import SharedArray
+
+
+def test_shared_array():
+    data = np.random.random((10, 3))
+    shared = SharedArray(data)
+    attached = SharedArray.attach(pickle.loads(pickle.dumps(shared.spec)))
+    assert_array_equal(attached, data)
+    assert not attached.flags.writeable
+
+    with shared:
+        assert os.path.exists(shared.spec)
+    assert shared.released
+    assert not os.path.exists(shared.spec)
+    # mappings outlive the file
+    assert_array_equal(attached, data)
+
+
+def test_shared_array_file_backed(tmp_path):
+    data = np.arange(1000, dtype=np.float32).reshape(10, 10, 10)
+    path = str(tmp_path / 'data.npy')
+    np.save(path, data)
+    mapped = np.load(path, mmap_mode='r')
+
+    # views of memory-mapped files are shared by reference, not copied
+    shared = SharedArray(mapped[2:5])
+    assert isinstance(shared.spec, tuple)
+    assert_array_equal(SharedArray.attach(shared.spec), data[2:5])
+    shared.release()
+    assert os.path.exists(path)
+
+    assert isinstance(SharedArray(mapped, copy=True).spec, str)
+
+
+def test_shared_array_empty():
+    with SharedArray.empty((4, 3), np.float32) as shared:
+        SharedArray.attach(shared.spec, writeable=True)[1] = 5
+        assert_array_equal(SharedArray.attach(shared.spec)[1], [5, 5, 5])
@@ -1,15 +1,15 @@
 """
 Gui elements for interfacing peeper and napari
+
+magicgui, napari and Qt are imported when a widget is first created rather than with this module,
+image_slicer and MySlider are created on first access (PEP 562)
 """
 
 from enum import Enum
+from functools import lru_cache
 from math import floor, ceil
 
 import numpy as np
-import napari
-from magicgui import magicgui
-from magicgui._qt.widgets import QDoubleSlider, QDataComboBox
-from napari.layers import Layer, Image, Points
 
 colors = {
     'transparent': [0, 0, 0, 0],
@@ -23,17 +23,26 @@ conditions = {
 }
 
 
-class MySlider(QDoubleSlider):
-    def setMinimum(self, value: float):
-        """Set minimum position of slider in float units."""
-        super().setMinimum(int(value * self.PRECISION))
+@lru_cache(maxsize=None)
+def _slider_class():
+    from magicgui._qt.widgets import QDoubleSlider
+
+    class MySlider(QDoubleSlider):
+        def setMinimum(self, value: float):
+            """Set minimum position of slider in float units."""
+            super().setMinimum(int(value * self.PRECISION))
+
+    return MySlider
 
 
 def make_property_slider(layer, property_name=None, condition='>'):
+    from magicgui import magicgui
+    from napari.layers import Layer
+
     min_value = layer.properties[property_name].min()
     max_value = layer.properties[property_name].max()
     @magicgui(auto_call=True,
-              cutoff={'widget_type': MySlider, 'minimum': min_value, 'maximum': max_value, 'fixedWidth': 400})
+              cutoff={'widget_type': _slider_class(), 'minimum': min_value, 'maximum': max_value, 'fixedWidth': 400})
     def magic_slider(cutoff: float) -> Layer:
         sele = conditions[condition](layer.properties[property_name], cutoff)
         return [(layer.data[sele], {'name': 'result', 'size': 2 }, 'points')]
@@ -48,40 +57,68 @@ class Axis(Enum):
 
 zeros = []
 
-@magicgui(auto_call=True,
-          slice_coord={'widget_type': QDoubleSlider, 'fixedWidth': 400, 'maximum': 1},
-          mode={'choices': ['average', 'chunk']})
-def image_slicer(image: Image, slice_coord: float, slice_size: int, axis: Axis, mode = 'chunk') -> Image:
-    im_shape = image.data.shape
-
-    ax_range = im_shape[axis.value] - 1
-    ax_range_padded = ax_range - slice_size
-    slice_coord_real = int(floor(slice_coord * ax_range_padded + slice_size))
-    slice_from = slice_coord_real - floor(slice_size/2)
-    slice_to = slice_coord_real + ceil(slice_size/2)
-
-    global zeros
-    zeros[:] = 0
-    if mode == 'chunk':
-        if axis.value == 0:
-            zeros[slice_from:slice_to,:,:] = image.data[slice_from:slice_to,:,:]
-        elif axis.value == 1:
-            zeros[:,slice_from:slice_to,:] = image.data[:,slice_from:slice_to,:]
-        elif axis.value == 2:
-            zeros[:,:,slice_from:slice_to] = image.data[:,:,slice_from:slice_to]
-    elif mode == 'average':
-        if axis.value == 0:
-            zeros[slice_coord_real,:,:] = image.data[slice_from:slice_to,:,:].mean(axis=0)
-        elif axis.value == 1:
-            zeros[:,slice_coord_real,:] = image.data[:,slice_from:slice_to,:].mean(axis=1)
-        elif axis.value == 2:
-            zeros[:,:,slice_coord_real] = image.data[:,:,slice_from:slice_to].mean(axis=2)
-
-    return zeros
+
+@lru_cache(maxsize=None)
+def make_image_slicer():
+    from magicgui import magicgui
+    from magicgui._qt.widgets import QDoubleSlider
+    from napari.layers import Image
+
+    @magicgui(auto_call=True,
+              slice_coord={'widget_type': QDoubleSlider, 'fixedWidth': 400, 'maximum': 1},
+              mode={'choices': ['average', 'chunk']})
+    def image_slicer(image: Image, slice_coord: float, slice_size: int, axis: Axis, mode = 'chunk') -> Image:
+        im_shape = image.data.shape
+
+        ax_range = im_shape[axis.value] - 1
+        ax_range_padded = ax_range - slice_size
+        slice_coord_real = int(floor(slice_coord * ax_range_padded + slice_size))
+        slice_from = slice_coord_real - floor(slice_size/2)
+        slice_to = slice_coord_real + ceil(slice_size/2)
+
+        global zeros
+        zeros[:] = 0
+        if mode == 'chunk':
+            if axis.value == 0:
+                zeros[slice_from:slice_to,:,:] = image.data[slice_from:slice_to,:,:]
+            elif axis.value == 1:
+                zeros[:,slice_from:slice_to,:] = image.data[:,slice_from:slice_to,:]
+            elif axis.value == 2:
+                zeros[:,:,slice_from:slice_to] = image.data[:,:,slice_from:slice_to]
+        elif mode == 'average':
+            if axis.value == 0:
+                zeros[slice_coord_real,:,:] = image.data[slice_from:slice_to,:,:].mean(axis=0)
+            elif axis.value == 1:
+                zeros[:,slice_coord_real,:] = image.data[:,slice_from:slice_to,:].mean(axis=1)
+            elif axis.value == 2:
+                zeros[:,:,slice_coord_real] = image.data[:,:,slice_from:slice_to].mean(axis=2)
+
+        return zeros
+
+    return image_slicer
+
+
+# module attributes which need magicgui, created on first access
+_lazy_attributes = {
+    'image_slicer': make_image_slicer,
+    'MySlider': _slider_class,
+}
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    return _lazy_attributes[name]()
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
 
 
 def add_widgets(viewer):
-    widget = image_slicer.Gui()
+    from magicgui._qt.widgets import QDataComboBox
+
+    widget = make_image_slicer().Gui()
     viewer.window.add_dock_widget(widget)
     viewer.layers.events.changed.connect(lambda x: widget.refresh_choices('image'))
     layer_selection_widget = widget.findChild(QDataComboBox, 'image')
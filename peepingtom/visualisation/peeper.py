@@ -2,7 +2,12 @@
 main class that interfaces visualization, analysis and data manipulation
 """
 
+from peepingtom.base import ParticleStack
 from peepingtom.visualisation.viewable import Viewable, VolumeViewer
+from peepingtom.utils.instrumentation import instrument
+from peepingtom._io.loader import BackgroundLoader
+from peepingtom._io.navigator import VolumeNavigator
+from peepingtom._io.session import save_session
 
 
 class Peeper(Viewable):
@@ -10,61 +15,152 @@ class Peeper(Viewable):
     collect and display an arbitrary set of images and/or datasets
     expose the datasets to visualization and analysis tools
     """
-    def __init__(self, data_blocks):
+    def __init__(self, data_blocks, background=False, max_workers=4):
+        """
+        if background, data of lazy images is loaded on max_workers background threads
+        and image layers are added to the viewer as each of them finishes loading
+        """
         super().__init__()
         self.volumes = [VolumeViewer(db, parent=self) for db in data_blocks]
+        self.loader = None
+        self._load_worker = None
+        self.navigator = None
+        self._loop_kwargs = {}
+        self._stack = None
+        if background:
+            images = [image for volume in self.volumes for image in volume.images]
+            self.loader = BackgroundLoader(images, max_workers=max_workers)
 
     def _make_stack(self):
-        pass
-        # if self.images:
-            # image_4d = np.stack([img.data for img in self.images])
-            # self.stack_image = Image(image_4d, parent=self.parent, name='stack')
-        # if self.particles:
-            # coords_4d = []
-            # vectors_4d = []
-            # add_data_4d = {}
-            # for idx, prt in enumerate(self.particles):
-                # coords = prt.coords.coords
-                # vectors = prt.vectors.vectors
-                # properties = prt.coords.properties
-                # # get the length of coords as (n, 1) shape
-                # n_coords = coords.shape[0]
-                # shape = (n_coords, 1)
-                # # add a leading, incremental coordinate to points that indicates the index
-                # # of the 4th dimension in which to show that volume
-                # coords_4d.append(np.concatenate([np.ones(shape) * idx, coords], axis=1))
-                # # just zeros for vectors, cause they are projection vectors centered on the origin,
-                # # otherwise they would traverse the 4th dimension to another 3D slice
-                # vectors_4d.append(np.concatenate([np.zeros(shape), vectors], axis=1))
-                # # loop through properties to stack them
-                # for k, v in properties.items():
-                    # if k not in add_data_4d:
-                        # add_data_4d[k] = []
-                    # add_data_4d[k].append(v)
-            # # concatenate in one big array
-            # coords_4d = np.concatenate(coords_4d)
-            # vectors_4d = np.concatenate(vectors_4d)
-            # for k, v in add_data_4d.items():
-                # add_data_4d[k] = np.concatenate(v)
-            # self.stack_particles = Particles(coords_4d, vectors_4d, parent=self.parent, name='stack', properties=add_data_4d)
+        """
+        stack the particles of all volumes into shared 4D buffers, per-volume particles become views into them
+        """
+        self._stack = ParticleStack([volume.data_block for volume in self.volumes], share=True)
+        return self._stack
 
+    @property
+    def stack(self):
+        """
+        ParticleStack of the particles of all volumes, built once and reused
+        """
+        if self._stack is None:
+            self._make_stack()
+        return self._stack
+
+    def show_stack(self, viewer=None, point_kwargs={}, vector_kwargs={}):
+        """
+        show the particles of all volumes as single 4D points and vectors layers, the first dimension is the volume
+        """
+        self.peep(viewer=viewer)
+        pkwargs = {'size': 3}
+        vkwargs = {'length': 10}
+        pkwargs.update(point_kwargs)
+        vkwargs.update(vector_kwargs)
+
+        stack = self.stack
+        properties = {k: v.to_numpy() for k, v in stack.properties.items()}
+        self.layers.append(self.viewer.add_points(stack.positions, name='stack - particle positions',
+                                                  properties=properties, **pkwargs))
+        self.layers.append(self.viewer.add_vectors(stack.vectors, name='stack - particle orientations', **vkwargs))
+
+    @instrument()
     def show(self, volumes='all', viewer=None, point_kwargs={}, vector_kwargs={}, image_kwargs={}, stack=True):
-        super().show(viewer=viewer)
+        self.peep(viewer=viewer)
         if volumes == 'all':
             volumes = self.volumes
         for volume in volumes:
             volume.show(viewer=self.viewer, point_kwargs=point_kwargs,
-                        vector_kwargs=vector_kwargs, image_kwargs=image_kwargs)
+                        vector_kwargs=vector_kwargs, image_kwargs=image_kwargs, load_images=self.loader is None)
+        if self.loader is not None:
+            self._start_load_worker()
+
+    def _start_load_worker(self):
+        """
+        start a napari worker which passes images to the main thread as they finish loading
+        """
+        if self._load_worker is not None:
+            return
+        from napari.qt.threading import create_worker
+        self._load_worker = create_worker(self.loader.as_completed)
+        self._load_worker.yielded.connect(self._on_image_loaded)
+        self._load_worker.start()
+
+    def _on_image_loaded(self, image):
+        # runs in the main thread, so it is safe to add layers
+        for volume in self.volumes:
+            if volume.viewer is not None and any(image is i for i in volume.images):
+                volume.show_image(image)
+
+    @property
+    def loading_progress(self):
+        """
+        tuple of (number of loaded images, total number of images to load in the background)
+        """
+        if self.loader is None:
+            return 0, 0
+        return self.loader.progress
+
+    def cancel_loading(self):
+        """
+        cancel loading of images which have not started loading yet
+        """
+        if self.loader is not None:
+            self.loader.cancel()
+        if self._load_worker is not None:
+            self._load_worker.quit()
 
     def hide(self, volumes='all'):
         if volumes == 'all':
             volumes = self.volumes
+            # stacked layers belong to the Peeper itself
+            super().hide()
         for volume in volumes:
             volume.hide()
 
-    def loop_volumes():
-        pass
+    def loop_volumes(self, start=0, prefetch=2, max_bytes=None, max_resident=None, viewer=None, **show_kwargs):
+        """
+        show one volume at a time, use the 'n' and 'p' keys in the viewer or next_volume and previous_volume
+        to move through the volumes
+
+        images of the next and previous `prefetch` volumes are loaded in the background, at most max_resident
+        volumes (or max_bytes of image data) are kept in memory and lazy images of other volumes are unloaded
+        show_kwargs are passed to VolumeViewer.show
+        """
+        if self.navigator is not None:
+            self.navigator.close()
+        self.navigator = VolumeNavigator([volume.data_block for volume in self.volumes], prefetch=prefetch,
+                                         max_bytes=max_bytes, max_resident=max_resident)
+        self._loop_kwargs = show_kwargs
+
+        self.peep(viewer=viewer)
+        self.hide()
+        self.viewer.bind_key('n', lambda viewer: self.next_volume(), overwrite=True)
+        self.viewer.bind_key('p', lambda viewer: self.previous_volume(), overwrite=True)
+        self._show_navigated(self.navigator.go_to(start))
+
+    def next_volume(self):
+        self._show_navigated(self.navigator.next())
+
+    def previous_volume(self):
+        self._show_navigated(self.navigator.previous())
+
+    def _show_navigated(self, crate):
+        # only the current volume is shown, so evicted images are not referenced by any layer
+        for volume in self.volumes:
+            if volume.data_block is crate:
+                current = volume
+            else:
+                volume.hide()
+        current.show(viewer=self.viewer, **self._loop_kwargs)
+
+    def save_session(self, directory, copy_images=False, overwrite=False):
+        """
+        save the data of all volumes to a session directory, which can be reopened with session2peep
+        """
+        return save_session([volume.data_block for volume in self.volumes], directory, copy_images=copy_images,
+                            overwrite=overwrite)
 
+    @instrument()
     def update(self):
         for volume in self.volumes:
             volume.update()
@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+# modules of the data, io and analysis layers which must import without the visualisation stack
+headless_modules = ['peepingtom', 'peepingtom.base', 'peepingtom._io.read', 'peepingtom._io.write',
+                    'peepingtom._io.session', 'peepingtom._io.topeep', 'peepingtom.analysis.classification',
+                    'peepingtom.analysis.frame_sums', 'peepingtom.visualisation.viewable',
+                    'peepingtom.visualisation.gui.gui']
+gui_modules = ['napari', 'magicgui', 'qtpy', 'PyQt5', 'PySide2', 'vispy']
+
+
+def test_headless_imports():
+    # run in a fresh interpreter, this process may already have imported anything
+    code = (f'import importlib, sys\n'
+            f'for name in {headless_modules!r}: importlib.import_module(name)\n'
+            f'import peepingtom\n'
+            f'peepingtom.zip2peep, peepingtom.Particles, peepingtom.write_star\n'
+            f'print(",".join(m for m in {gui_modules!r} if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+def test_gui_lazy_attributes():
+    # image_slicer needs magicgui, it is created on access rather than on import
+    code = ('import peepingtom.visualisation.gui.gui as gui\n'
+            'assert {"image_slicer", "MySlider"} <= set(dir(gui))\n'
+            'try:\n'
+            '    gui.not_there\n'
+            'except AttributeError:\n'
+            '    print("ok")\n')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'ok'
@@ -1,12 +1,14 @@
 """
 Viewable interfaces data classes to napari
+
+napari is imported on first use rather than with this module, so data can be prepared for display without it
 """
 
 import numpy as np
-import napari
-from napari.components.layerlist import LayerList
 
-from ..base import PointBlock, LineBlock, OrientationBlock, ImageBlock
+from ..base import Particles, ImageBlock, MultiFrameBlock
+from ..utils.helpers.array_helper import sampled_statistics
+from ..utils.instrumentation import instrument
 
 
 class Viewable:
@@ -17,13 +19,23 @@ class Viewable:
         self.viewer = viewer
         self.parent = parent
         self.name = name
-        self.layers = LayerList()
+        self._layers = None
+
+    @property
+    def layers(self):
+        # created on first use so that napari is only imported when something is displayed
+        if self._layers is None:
+            from napari.components.layerlist import LayerList
+            self._layers = LayerList()
+        return self._layers
 
     def peep(self, viewer=None):
         """
         creates a new napari viewer if not present or given
         peeps the contents of the Viewable
         """
+        import napari
+
         # create a new viewer if necessary
         if viewer is not None:
             self.viewer = viewer
@@ -48,6 +60,7 @@ class Viewable:
                 self.viewer.layers.remove(l)
                 self.layers.remove(l)
 
+    @instrument()
     def update(self, **kwargs):
         """
         reload data in the viewer
@@ -63,6 +76,8 @@ class VolumeViewer(Viewable):
     def __init__(self, data_block, **kwargs):
         super().__init__(**kwargs)
         self.data_block = data_block
+        self._image_kwargs = {}
+        self._image_layers = {}
 
     @property
     def particles(self):
@@ -70,11 +85,25 @@ class VolumeViewer(Viewable):
 
     @property
     def particle_positions(self):
-        return [p.coords for p in self.particles]
+        # in pixels of the first image if there is one (see PointBlock.in_image), napari expects zyx
+        images = self.images
+        if not images:
+            return [p.positions.transformed[:, ::-1] for p in self.particles]
+        return [p.positions.in_image(images[0])[:, ::-1] for p in self.particles]
 
     @property
     def particle_vectors(self):
-        return [p.ori_as_vectors() for p in self.particles]
+        # z axis of each particle in zyx order
+        vectors = []
+        for p in self.particles:
+            z = p.orientations._calculate_matrix_product(p.orientations._unit_vector('z'))
+            vectors.append(z[:, ::-1])
+        return vectors
+
+    @property
+    def particle_properties(self):
+        return [{} if p.properties is None else {k: v.to_numpy() for k, v in p.properties.items()}
+                for p in self.particles]
 
     @property
     def particle_vectors_napari(self):
@@ -85,7 +114,7 @@ class VolumeViewer(Viewable):
 
     @property
     def images(self):
-        return [i for i in self.data_block if isinstance(i, Image)]
+        return [i for i in self.data_block if isinstance(i, ImageBlock)]
 
     @property
     def image_data(self):
@@ -93,10 +122,16 @@ class VolumeViewer(Viewable):
 
     @property
     def image_shapes(self):
-        return [i.shape for i in self.image_data]
+        # shape is known without loading lazy images
+        return [i.shape for i in self.images]
 
-    def show(self, viewer=None, point_kwargs={}, vector_kwargs={}, image_kwargs={}):
-        super().show(viewer=viewer)
+    @instrument()
+    def show(self, viewer=None, point_kwargs={}, vector_kwargs={}, image_kwargs={}, load_images=True):
+        """
+        show particles and images in napari
+        if load_images is False, lazy images which are not loaded yet are skipped and can be added with show_image
+        """
+        self.peep(viewer=viewer)
 
         pkwargs = {'size': 3}
         vkwargs = {'length': 10}
@@ -106,10 +141,10 @@ class VolumeViewer(Viewable):
         vkwargs.update(vector_kwargs)
         ikwargs.update(image_kwargs)
 
-        for particles in self.particles:
-            layer = self.viewer.add_points(particles.coords,
+        for positions, properties in zip(self.particle_positions, self.particle_properties):
+            layer = self.viewer.add_points(positions,
                                            name=f'{self.name} - particle positions',
-                                           properties=particles.prop_as_dict(),
+                                           properties=properties,
                                            **pkwargs)
             self.layers.append(layer)
 
@@ -119,8 +154,29 @@ class VolumeViewer(Viewable):
                                             **vkwargs)
             self.layers.append(layer)
 
+        self._image_kwargs = ikwargs
         for image in self.images:
-            layer = self.viewer.add_image(image.data,
-                                          name=f'{self.name} - image',
-                                          **ikwargs)
-            self.layers.append(layer)
+            if image.is_loaded or load_images:
+                self.show_image(image)
+
+    def show_image(self, image):
+        """
+        add an image layer for one of the images of this volume, unless it is already shown
+        """
+        layer = self._image_layers.get(id(image))
+        if layer is not None and layer in self.layers:
+            return
+        # movies are shown as their cached frame sums rather than as whole stacks
+        if isinstance(image, MultiFrameBlock):
+            data = image.sum_frames()
+            contrast_limits = sampled_statistics(data)['contrast_limits']
+        else:
+            data = image.data
+            contrast_limits = image.contrast_limits
+        # contrast limits from a cached sample, so napari doesn't scan the whole image to find them
+        kwargs = {'contrast_limits': contrast_limits, **self._image_kwargs}
+        layer = self.viewer.add_image(data,
+                                      name=f'{self.name} - image',
+                                      **kwargs)
+        self._image_layers[id(image)] = layer
+        self.layers.append(layer)